@@ -54,73 +54,16 @@ def _capture_student_code():
         del frame
 
 # ============================================================
-# AST ANALYZER - DO NOT MODIFY
+# AST ANALYZER - PROVIDED BY THE GRADING RUNTIME
 # ============================================================
-class CodeAnalyzer(ast.NodeVisitor):
-    def __init__(self):
-        self.has_for_loop = False
-        self.has_while_loop = False
-        self.has_if_statement = False
-        self.has_modulo_check = False
-        self.has_even_check = False  # % 2 == 0
-        self.has_odd_check = False   # % 2 != 0 or % 2 == 1
-        self.has_accumulator = False
-        self.assigns = []
-        self.function_calls = []
-        self.comparisons = []
-        
-    def visit_For(self, node):
-        self.has_for_loop = True
-        self.generic_visit(node)
-        
-    def visit_While(self, node):
-        self.has_while_loop = True
-        self.generic_visit(node)
-        
-    def visit_If(self, node):
-        self.has_if_statement = True
-        self.generic_visit(node)
-        
-    def visit_Assign(self, node):
-        for target in node.targets:
-            if isinstance(target, ast.Name):
-                self.assigns.append(target.id)
-        self.generic_visit(node)
-        
-    def visit_AugAssign(self, node):
-        if isinstance(node.target, ast.Name):
-            self.has_accumulator = True
-        self.generic_visit(node)
-        
-    def visit_Compare(self, node):
-        # Check for modulo operations in comparisons
-        if isinstance(node.left, ast.BinOp) and isinstance(node.left.op, ast.Mod):
-            self.has_modulo_check = True
-            # Check if it's % 2 == 0 (even check)
-            if isinstance(node.left.right, ast.Constant) and node.left.right.value == 2:
-                for i, (op, comparator) in enumerate(zip(node.ops, node.comparators)):
-                    if isinstance(comparator, ast.Constant):
-                        if isinstance(op, ast.Eq) and comparator.value == 0:
-                            self.has_even_check = True
-                        elif isinstance(op, ast.NotEq) and comparator.value == 0:
-                            self.has_odd_check = True
-                        elif isinstance(op, ast.Eq) and comparator.value == 1:
-                            self.has_odd_check = True
-        self.comparisons.append(ast.dump(node))
-        self.generic_visit(node)
-        
-    def visit_Call(self, node):
-        if isinstance(node.func, ast.Name):
-            self.function_calls.append(node.func.id)
-        self.generic_visit(node)
-
+# The former CodeAnalyzer lives in grader/runtime.py as CodeFacts,
+# which is prepended to every grading script. analyze() walks the
+# tree once and caches the result, so every criterion below is a
+# table lookup (facts.has('For'), facts.has_mod_compare(2), ...).
 def analyze_code(source_code):
     """Parse and analyze student code using AST."""
     try:
-        tree = ast.parse(source_code)
-        analyzer = CodeAnalyzer()
-        analyzer.visit(tree)
-        return analyzer
+        return analyze(source_code)
     except SyntaxError as e:
         return None
 
@@ -151,7 +94,7 @@ def grade_student_code(student_code_str, student_vars):
     
     # --- CRITERION 1: Initialization (2 pts) ---
     # Check if required variable is initialized
-    if 'total' in analysis.assigns or 'result' in analysis.assigns or 'sum' in analysis.assigns:
+    if any(analysis.assigns_name(v) for v in ('total', 'result', 'sum')):
         breakdown['initialization'] = RUBRIC['initialization']
         score += RUBRIC['initialization']
     else:
@@ -160,10 +103,10 @@ def grade_student_code(student_code_str, student_vars):
     
     # --- CRITERION 2: Loop Structure (3 pts) ---
     # Check for proper loop usage
-    if analysis.has_for_loop:
+    if analysis.has('For'):
         breakdown['loop_structure'] = RUBRIC['loop_structure']
         score += RUBRIC['loop_structure']
-    elif analysis.has_while_loop:
+    elif analysis.has('While'):
         # While loop is acceptable but less preferred
         breakdown['loop_structure'] = RUBRIC['loop_structure'] - 1
         score += RUBRIC['loop_structure'] - 1
@@ -174,10 +117,10 @@ def grade_student_code(student_code_str, student_vars):
     
     # --- CRITERION 3: Condition Logic (3 pts) ---
     # Check for correct conditional check
-    if analysis.has_even_check:
+    if analysis.has_mod_compare(2, 'Eq', 0):
         breakdown['condition_logic'] = RUBRIC['condition_logic']
         score += RUBRIC['condition_logic']
-    elif analysis.has_modulo_check:
+    elif analysis.mod_checks:
         # Has modulo but not correct pattern - partial credit
         breakdown['condition_logic'] = 1
         score += 1
@@ -187,7 +130,7 @@ def grade_student_code(student_code_str, student_vars):
         errors.append("missing_condition")
     
     # --- CRITERION 4: Accumulator Pattern (2 pts) ---
-    if analysis.has_accumulator:
+    if analysis.aug_assigns:
         breakdown['accumulator'] = RUBRIC['accumulator']
         score += RUBRIC['accumulator']
     else:
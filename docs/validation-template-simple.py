@@ -6,9 +6,9 @@
 #   __STUDENT_CODE__ = student's source code (string)
 #   All variables created by student code
 #   __exec_error__ = error message if student code crashed
+#   analyze(code)    = CodeFacts fact table (grader/runtime.py)
 # ============================================================
 
-import ast
 import json
 
 score = 0
@@ -23,23 +23,15 @@ if '__exec_error__' in dir():
 # AST ANALYSIS - Check code structure
 # ============================================================
 try:
-    tree = ast.parse(__STUDENT_CODE__)
-    
-    # Find all node types
-    has_for = any(isinstance(n, ast.For) for n in ast.walk(tree))
-    has_while = any(isinstance(n, ast.While) for n in ast.walk(tree))
-    has_if = any(isinstance(n, ast.If) for n in ast.walk(tree))
-    
-    # Check for modulo with proper comparison
-    has_even_check = False
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Compare):
-            if isinstance(node.left, ast.BinOp) and isinstance(node.left.op, ast.Mod):
-                # Check if % 2 == 0
-                if isinstance(node.left.right, ast.Constant) and node.left.right.value == 2:
-                    for op, comp in zip(node.ops, node.comparators):
-                        if isinstance(op, ast.Eq) and isinstance(comp, ast.Constant) and comp.value == 0:
-                            has_even_check = True
+    # Single traversal; every check below is a table lookup
+    facts = analyze(__STUDENT_CODE__)
+
+    has_for = facts.has('For')
+    has_while = facts.has('While')
+    has_if = facts.has_if
+
+    # Check for modulo with proper comparison (% 2 == 0)
+    has_even_check = facts.has_mod_compare(2, 'Eq', 0)
 
     # CRITERION 1: Loop (3 pts)
     if has_for:
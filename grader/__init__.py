@@ -0,0 +1,54 @@
+"""
+Apollo grading runtime (Python side).
+
+`runtime.py` is the code that runs inside the sandbox next to the
+student's program; it is also importable here so local tools and
+tests use exactly the same logic.
+"""
+
+import base64
+import os
+
+from .canonical import cache_key, fingerprint
+from .runtime import (
+    CodeFacts, analyze, classify_validation, compile_artifact, compile_rubric, emit_rubric, grade_rubric,
+    load_validation, prepare_validations, read_final_frame, read_frames, run_exam, run_question, run_references,
+    run_students,
+)
+
+RUNTIME_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runtime.py')
+
+
+def runtime_source() -> str:
+    """Source text of runtime.py, as prepended to Judge0 scripts."""
+    with open(RUNTIME_PATH, encoding='utf-8') as f:
+        return f.read()
+
+
+def combined_source(student_code: str, validation_code: str, execute_student: bool = True) -> str:
+    """The script buildCombinedCode() in src/lib/rubricGrader.ts sends to Judge0."""
+    encoded = base64.b64encode(student_code.encode('utf-8')).decode('ascii')
+    execute = """
+# Execute student code (output bounded, see run_student_program)
+__exec_error__ = run_student_program(__STUDENT_CODE__, globals())
+""" if execute_student else ""
+    return f"""{runtime_source()}
+
+import base64
+
+# Store student code as string (for AST analysis)
+__STUDENT_CODE__ = base64.b64decode("{encoded}").decode('utf-8')
+__exec_error__ = None
+{execute}
+# === VALIDATION CODE (runs directly, not via exec) ===
+{validation_code}
+"""
+
+
+__all__ = [
+    'CodeFacts', 'analyze', 'classify_validation', 'compile_artifact', 'compile_rubric', 'emit_rubric',
+    'grade_rubric', 'load_validation', 'prepare_validations', 'read_final_frame', 'read_frames',
+    'run_exam', 'run_question', 'run_references', 'run_students',
+    'cache_key', 'fingerprint',
+    'runtime_source', 'combined_source', 'RUNTIME_PATH',
+]
@@ -0,0 +1,229 @@
+"""
+Canonical fingerprints of student code for grade cache keys.
+
+Two answers that differ only in comments, blank lines, quote style or
+the names of function locals get the same fingerprint:
+
+    def tambah(a, b):          def tambah(x, y):
+        # jumlahkan                return x + y
+        return a + b
+
+Only safe where the grade cannot depend on what is normalized away.
+A declarative rubric only sees CodeFacts, which ignore formatting, and
+every name the rubric mentions is kept verbatim, so renaming cannot
+change any of its answers. A rubric with functional "tests" runs the
+student's functions, where names show up in keyword calls, error
+messages and introspection, so its answers keep all their names and
+only formatting is normalized. Free-form validation code may read
+__STUDENT_CODE__ as text or inspect any name, so it always gets the
+raw hash (see cache_key()).
+
+Renaming is deliberately conservative. Within each top-level function
+(or method) the names bound in its own body, its parameters included,
+are renamed consistently to _l0, _l1, ... across the function and
+everything nested in it. Names that are global/nonlocal, imported,
+def/class names, passed as keyword arguments anywhere in the answer, or
+the subject of dynamic lookups (locals(), eval, ...) are left alone, and
+module-level names are never renamed.
+"""
+
+import ast
+import hashlib
+import json
+import re
+import sys
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Union
+
+FINGERPRINT_VERSION = 2
+
+_PLACEHOLDER = re.compile(r'^_l\d+$')
+_DYNAMIC_CALLS = frozenset(('locals', 'vars', 'eval', 'exec', 'globals', 'dir', '__import__'))
+_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+_NAMED_CHECK_KEYS = ('function', 'calls', 'method', 'assigns')
+
+
+class _Unsafe(Exception):
+    """The tree uses a construct the renamer does not handle: keep all names."""
+
+
+# ============================================================
+# SCOPE ANALYSIS
+# ============================================================
+
+def _own_nodes(function: ast.AST) -> Iterable[ast.AST]:
+    """Nodes of `function`'s own scope (nested defs, lambdas and classes excluded)."""
+    stack = list(ast.iter_child_nodes(function))
+    while stack:
+        node = stack.pop()
+        yield node
+        if isinstance(node, _FUNCTIONS + (ast.Lambda, ast.ClassDef)):
+            continue
+        stack.extend(ast.iter_child_nodes(node))
+
+
+def _renamable_locals(function: ast.AST, keep: FrozenSet[str]) -> Set[str]:
+    args = function.args
+    params = [a.arg for a in getattr(args, 'posonlyargs', []) + args.args + args.kwonlyargs]
+    params += [a.arg for a in (args.vararg, args.kwarg) if a is not None]
+
+    bound = set(params)
+    for node in _own_nodes(function):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            bound.add(node.id)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            bound.add(node.name)
+
+    # Anything the whole region treats specially stays as written
+    pinned = set(keep)
+    for node in ast.walk(function):
+        if isinstance(node, (ast.Global, ast.Nonlocal)):
+            pinned.update(node.names)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            pinned.update((alias.asname or alias.name).split('.')[0] for alias in node.names)
+        elif isinstance(node, _FUNCTIONS):
+            pinned.add(node.name)
+        elif isinstance(node, ast.ClassDef):
+            return set()  # class bodies turn names into attributes
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+              and node.func.id in _DYNAMIC_CALLS):
+            return set()
+        elif type(node).__name__.startswith('Match'):
+            raise _Unsafe('match statement')
+    return bound - pinned
+
+
+class _Renamer(ast.NodeTransformer):
+    def __init__(self, mapping: Dict[str, str]):
+        self.mapping = mapping
+
+    def visit_Name(self, node: ast.Name) -> ast.Name:
+        node.id = self.mapping.get(node.id, node.id)
+        return node
+
+    def visit_arg(self, node: ast.arg) -> ast.arg:
+        node.arg = self.mapping.get(node.arg, node.arg)
+        node.annotation = self.visit(node.annotation) if node.annotation else None
+        return node
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> ast.ExceptHandler:
+        if node.name:
+            node.name = self.mapping.get(node.name, node.name)
+        self.generic_visit(node)
+        return node
+
+
+def _rename_function(function: ast.AST, keep: FrozenSet[str]) -> None:
+    names = _renamable_locals(function, keep)
+    if not names:
+        return
+    # Number in order of first appearance so the result does not depend on the names
+    order = []
+    for node in ast.walk(function):
+        name = (node.id if isinstance(node, ast.Name)
+                else node.arg if isinstance(node, ast.arg) else None)
+        if name in names and name not in order:
+            order.append(name)
+    mapping = {name: '_l%d' % i for i, name in enumerate(order)}
+    # Defaults, annotations and decorators belong to the enclosing scope
+    args = function.args
+    for arg in getattr(args, 'posonlyargs', []) + args.args + args.kwonlyargs + [args.vararg, args.kwarg]:
+        if arg is not None:
+            arg.arg = mapping.get(arg.arg, arg.arg)
+    renamer = _Renamer(mapping)
+    for statement in function.body:
+        renamer.visit(statement)
+
+
+def _outermost_functions(tree: ast.AST) -> Iterable[ast.AST]:
+    """Functions that are not nested inside another function or lambda."""
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, _FUNCTIONS):
+                yield child
+            elif not isinstance(child, ast.Lambda):
+                stack.append(child)
+
+
+# ============================================================
+# PUBLIC API
+# ============================================================
+
+def canonical_dump(source: str, keep: Iterable[str] = (), rename: bool = True) -> str:
+    """
+    Normalized AST text of `source` (raises SyntaxError).
+    Names in `keep` are never renamed; with rename=False no name is.
+    """
+    tree = ast.parse(source)
+    # f(a=1) only reaches a parameter that is still called `a`
+    keep = frozenset(keep) | {n.arg for n in ast.walk(tree) if isinstance(n, ast.keyword) and n.arg}
+    identifiers = {n.id for n in ast.walk(tree) if isinstance(n, ast.Name)}
+    identifiers |= {n.arg for n in ast.walk(tree) if isinstance(n, ast.arg)}
+    if rename and not any(_PLACEHOLDER.match(name) for name in identifiers | keep):
+        try:
+            for function in list(_outermost_functions(tree)):
+                _rename_function(function, keep)
+        except _Unsafe:
+            tree = ast.parse(source)
+    return ast.dump(tree, annotate_fields=False, include_attributes=False)
+
+
+def fingerprint(source: str, keep: Iterable[str] = (), rename: bool = True) -> str:
+    """Stable hex digest of canonical_dump() (raises SyntaxError)."""
+    header = 'v%d:py%d.%d:' % ((FINGERPRINT_VERSION,) + sys.version_info[:2])
+    return hashlib.sha256((header + canonical_dump(source, keep, rename)).encode('utf-8')).hexdigest()
+
+
+def _load(spec: Union[Dict, str]) -> Dict:
+    return json.loads(spec) if isinstance(spec, str) else spec
+
+
+def runs_student_code(spec: Union[Dict, str]) -> bool:
+    """True when a rubric spec has functional "tests", which call the student's functions."""
+    return any('tests' in criterion for criterion in _load(spec).get('criteria', ()))
+
+
+def rubric_names(spec: Union[Dict, str]) -> FrozenSet[str]:
+    """Every identifier a declarative rubric spec mentions (function, calls, method, assigns, tests)."""
+    spec = _load(spec)
+    names = set()
+
+    def collect(check):
+        if not isinstance(check, dict):
+            return
+        for key in _NAMED_CHECK_KEYS:
+            if isinstance(check.get(key), str):
+                names.add(check[key])
+        for key in ('all', 'any'):
+            for sub in check.get(key) or ():
+                collect(sub)
+        collect(check.get('not'))
+
+    for criterion in spec.get('criteria', ()):
+        if isinstance(criterion.get('tests'), dict) and isinstance(criterion['tests'].get('function'), str):
+            names.add(criterion['tests']['function'])
+        collect(criterion.get('check'))
+        for partial in criterion.get('partial', ()):
+            collect(partial.get('check'))
+    return frozenset(names)
+
+
+def raw_key(student_code: str) -> str:
+    return 'raw:' + hashlib.sha256(student_code.encode('utf-8')).hexdigest()
+
+
+def cache_key(student_code: str, rubric: Optional[Union[Dict, str]] = None) -> str:
+    """
+    Grade cache key for an answer: 'ast:<fingerprint>' when the question
+    is graded by a declarative `rubric`, otherwise (free-form validation,
+    or code that does not parse) 'raw:<sha256>'. Locals are only renamed
+    when the rubric does not run the student's code.
+    """
+    if rubric is None:
+        return raw_key(student_code)
+    try:
+        rubric = _load(rubric)
+        return 'ast:' + fingerprint(student_code, rubric_names(rubric), not runs_student_code(rubric))
+    except (SyntaxError, ValueError, RecursionError):
+        return raw_key(student_code)
@@ -0,0 +1,249 @@
+"""
+Local sandboxed execution of Python sources (a Judge0 stand-in).
+
+Each task runs in a fresh interpreter with per-task limits:
+  - CPU seconds        (RLIMIT_CPU, reported as Time Limit Exceeded)
+  - wall-clock seconds (process group killed on expiry, also when the
+                         task closed its stdout/stderr and keeps running)
+  - address space      (RLIMIT_AS)
+  - stdout/stderr caps (process killed once the cap is exceeded)
+Results use Judge0's submission shape so callers cannot tell the
+difference (see executeCode in src/lib/rubricGrader.ts).
+
+These are resource limits only: a task can read and write whatever the
+server's user can and open network connections. Run the pool as an
+unprivileged user in a container or VM without network access.
+
+POSIX only: relies on `resource`, process groups and os.wait4.
+"""
+
+import os
+import resource
+import select
+import selectors
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# Judge0 status ids (https://ce.judge0.com/#statuses-and-languages-status-get)
+STATUS_ACCEPTED = {'id': 3, 'description': 'Accepted'}
+STATUS_TIME_LIMIT = {'id': 5, 'description': 'Time Limit Exceeded'}
+STATUS_SIGSEGV = {'id': 7, 'description': 'Runtime Error (SIGSEGV)'}
+STATUS_SIGXFSZ = {'id': 8, 'description': 'Runtime Error (SIGXFSZ)'}
+STATUS_NZEC = {'id': 11, 'description': 'Runtime Error (NZEC)'}
+STATUS_OTHER = {'id': 12, 'description': 'Runtime Error (Other)'}
+STATUS_INTERNAL = {'id': 13, 'description': 'Internal Error'}
+
+_READ_CHUNK = 65536
+
+
+@dataclass
+class ExecutionLimits:
+    cpu_time: float = 5.0          # seconds of CPU (Judge0 cpu_time_limit)
+    wall_time: float = 10.0        # seconds of wall clock (Judge0 wall_time_limit)
+    memory_kb: int = 256 * 1024    # address space cap (Judge0 memory_limit, KB)
+    max_output_bytes: int = 1024 * 1024  # per stream
+
+    def merged(self, overrides: Dict) -> 'ExecutionLimits':
+        """Apply Judge0-style per-submission overrides, never above these limits."""
+        return ExecutionLimits(
+            cpu_time=min(float(overrides.get('cpu_time_limit') or self.cpu_time), self.cpu_time),
+            wall_time=min(float(overrides.get('wall_time_limit') or self.wall_time), self.wall_time),
+            memory_kb=min(int(overrides.get('memory_limit') or self.memory_kb), self.memory_kb),
+            max_output_bytes=self.max_output_bytes,
+        )
+
+
+def _rlimits(limits: ExecutionLimits):
+    """(resource, soft, hard) for every limit a task runs under."""
+    cpu = max(1, int(limits.cpu_time + 0.999))
+    memory = limits.memory_kb * 1024
+    return [
+        (resource.RLIMIT_CPU, cpu, cpu + 1),
+        (resource.RLIMIT_AS, memory, memory),
+        (resource.RLIMIT_CORE, 0, 0),
+        (resource.RLIMIT_FSIZE, limits.max_output_bytes, limits.max_output_bytes),
+    ]
+
+
+def _limit_child(limits: ExecutionLimits):
+    """For a forked, single-threaded child (forkserver): own process group plus hard resource limits."""
+    def apply():
+        os.setsid()
+        for which, soft, hard in _rlimits(limits):
+            resource.setrlimit(which, (soft, hard))
+    return apply
+
+
+# Applies the limits, then becomes the task's interpreter. Popen's preexec_fn
+# is not safe in threaded callers (GradingPool runs tasks on threads), so the
+# limits are set after exec, in a fresh single-threaded process.
+_LIMIT_WRAPPER = (
+    "import os, resource, sys\n"
+    "args = [int(a) for a in sys.argv[1:-2]]\n"
+    "for i in range(0, len(args), 3):\n"
+    "    resource.setrlimit(args[i], (args[i + 1], args[i + 2]))\n"
+    "os.execv(sys.argv[-2], [sys.argv[-2], '-I', '-B', sys.argv[-1]])\n"
+)
+
+
+def _limited_command(path: str, limits: ExecutionLimits):
+    numbers = [str(n) for limit in _rlimits(limits) for n in limit]
+    return [sys.executable, '-I', '-S', '-B', '-c', _LIMIT_WRAPPER] + numbers + [sys.executable, path]
+
+
+def _kill_group(pid: int) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _status_for(returncode: int, timed_out: bool, output_exceeded: bool) -> Dict:
+    if timed_out or returncode == -signal.SIGXCPU:
+        return STATUS_TIME_LIMIT
+    if output_exceeded or returncode == -signal.SIGXFSZ:
+        return STATUS_SIGXFSZ
+    if returncode == 0:
+        return STATUS_ACCEPTED
+    if returncode == -signal.SIGSEGV:
+        return STATUS_SIGSEGV
+    if returncode > 0:
+        return STATUS_NZEC
+    return STATUS_OTHER
+
+
+def _decode(data: bytes) -> Optional[str]:
+    return data.decode('utf-8', errors='replace') if data else None
+
+
+def run_source(source: str, stdin: str = '', limits: Optional[ExecutionLimits] = None) -> Dict:
+    """
+    Execute `source` in a fresh, limited Python process (blocking).
+    Returns a Judge0-shaped dict: stdout, stderr, status, time, memory, ...
+    """
+    limits = limits or ExecutionLimits()
+    with tempfile.TemporaryDirectory(prefix='apollo-grade-') as workdir:
+        path = os.path.join(workdir, 'main.py')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(source)
+
+        started = time.monotonic()
+        try:
+            proc = subprocess.Popen(
+                _limited_command(path, limits),
+                cwd=workdir,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                env={'PYTHONIOENCODING': 'utf-8', 'PATH': os.environ.get('PATH', '')},
+                start_new_session=True,
+            )
+        except OSError as e:
+            return _result(None, str(e), STATUS_INTERNAL, 0.0, 0)
+
+        try:
+            proc.stdin.write(stdin.encode('utf-8'))
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        stdout, stderr, timed_out, output_exceeded = _collect(
+            proc.pid, proc.stdout, proc.stderr, limits, started)
+        returncode, usage, overran = _reap(proc.pid, started + limits.wall_time)
+        proc.returncode = returncode
+        timed_out = timed_out or overran
+
+    return _finish(stdout, stderr, returncode, timed_out, output_exceeded, usage)
+
+
+def _collect(pid: int, stdout, stderr, limits: ExecutionLimits, started: float):
+    """Read both pipes until EOF, the wall deadline, or an output cap."""
+    buffers = {stdout: bytearray(), stderr: bytearray()}
+    timed_out = output_exceeded = False
+    deadline = started + limits.wall_time
+
+    with selectors.DefaultSelector() as selector:
+        for pipe in buffers:
+            selector.register(pipe, selectors.EVENT_READ)
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            for key, _ in selector.select(remaining):
+                chunk = os.read(key.fd, _READ_CHUNK)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                    continue
+                buffer = buffers[key.fileobj]
+                buffer += chunk
+                if len(buffer) > limits.max_output_bytes:
+                    del buffer[limits.max_output_bytes:]
+                    output_exceeded = True
+            if output_exceeded:
+                break
+
+    if timed_out or output_exceeded:
+        _kill_group(pid)
+    for pipe in buffers:
+        pipe.close()
+    return bytes(buffers[stdout]), bytes(buffers[stderr]), timed_out, output_exceeded
+
+
+def _exits_by(pid: int, deadline: float) -> bool:
+    """Wait until the child has exited (leaving it unreaped) or `deadline` passes."""
+    try:
+        pidfd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        pidfd = None
+    if pidfd is not None:
+        try:
+            return bool(select.select([pidfd], [], [], max(deadline - time.monotonic(), 0))[0])
+        finally:
+            os.close(pidfd)
+    delay = 0.001
+    while os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.05)
+    return True
+
+
+def _reap(pid: int, deadline: float):
+    """
+    Wait for the child ourselves to get its rusage (CPU time, peak RSS).
+    Pipes at EOF do not mean it exited: past `deadline` its process group
+    is killed and the third value is True.
+    """
+    overran = not _exits_by(pid, deadline)
+    if overran:
+        _kill_group(pid)
+    _, wait_status, usage = os.wait4(pid, 0)
+    returncode = (-os.WTERMSIG(wait_status) if os.WIFSIGNALED(wait_status)
+                  else os.WEXITSTATUS(wait_status))
+    return returncode, usage, overran
+
+
+def _finish(stdout: bytes, stderr: bytes, returncode: int, timed_out: bool,
+            output_exceeded: bool, usage) -> Dict:
+    status = _status_for(returncode, timed_out, output_exceeded)
+    cpu_seconds = usage.ru_utime + usage.ru_stime
+    return _result(_decode(stdout), _decode(stderr), status, cpu_seconds, usage.ru_maxrss)
+
+
+def _result(stdout: Optional[str], stderr: Optional[str], status: Dict,
+            cpu_seconds: float, memory_kb: int) -> Dict:
+    return {
+        'stdout': stdout,
+        'stderr': stderr,
+        'compile_output': None,
+        'message': None if status is STATUS_ACCEPTED else status['description'],
+        'status': dict(status),
+        'time': '%.3f' % cpu_seconds,
+        'memory': memory_kb,
+    }
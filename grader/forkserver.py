@@ -0,0 +1,397 @@
+"""
+Forkserver execution mode: warm interpreters for the local grading pool.
+
+A zygote process imports the grading runtime once, then forks a
+copy-on-write child per submission, so interpreter startup and the
+runtime's imports are paid once per server instead of once per grade.
+
+    zygote --fork--> supervisor --fork--> task (limits, student code)
+
+The supervisor does for the task what executor.run_source() does for a
+subprocess: feeds stdin, collects output under the wall-clock and output
+caps, and reaps it for rusage. Results are the same Judge0-shaped dicts.
+
+Two request kinds:
+  run    a buildCombinedCode() script; its leading copy of runtime.py is
+         not executed again, the preloaded runtime is used instead
+  grade  student code + validation; validation is compiled once in the
+         zygote (cached by hash) and every forked child inherits it
+
+    python -m grader.pool --forkserver
+    python -m grader.forkserver --measure 50     # per-grade overhead report
+
+POSIX only.
+"""
+
+import argparse
+import builtins
+import hashlib
+import json
+import os
+import shutil
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from .executor import (
+    STATUS_INTERNAL, ExecutionLimits, _collect, _finish, _limit_child, _reap, _result, run_source,
+)
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MAX_CACHED_VALIDATIONS = 256
+READY = b'ready\n'
+
+_HEADER = struct.Struct('>I')
+
+
+# ============================================================
+# WIRE FORMAT - length-prefixed JSON frames over a unix socket
+# ============================================================
+
+def _send(sock: socket.socket, payload: Dict) -> None:
+    data = json.dumps(payload).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('forkserver connection closed')
+        data += chunk
+    return bytes(data)
+
+
+def _recv(sock: socket.socket) -> Dict:
+    (size,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return json.loads(_recv_exactly(sock, size).decode('utf-8'))
+
+
+# ============================================================
+# ZYGOTE - preloads the runtime, forks one supervisor per request
+# ============================================================
+
+def serve(path: str) -> None:
+    """Zygote main loop (runs in its own process, single-threaded)."""
+    from . import runtime, runtime_source
+    import base64  # noqa: F401  (every combined script imports it)
+
+    prelude = runtime_source()
+    validations: 'OrderedDict[str, object]' = OrderedDict()
+    parent = os.getppid()
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(128)
+    listener.settimeout(1.0)
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # supervisors are reaped by the kernel
+    sys.stdout.buffer.write(READY)
+    sys.stdout.flush()
+
+    while os.getppid() == parent:
+        try:
+            conn, _ = listener.accept()
+        except socket.timeout:
+            continue
+        conn.settimeout(None)
+        try:
+            request = _recv(conn)
+            validation = _compiled_validation(validations, request) if request['op'] == 'grade' else None
+            pid = os.fork()
+        except Exception as e:
+            _reply_internal_error(conn, e)
+            continue
+        if pid == 0:
+            listener.close()
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            status = 1
+            try:
+                try:
+                    result = _supervise(conn, request, validation, runtime, prelude)
+                except Exception:
+                    result = _result(None, traceback.format_exc(), STATUS_INTERNAL, 0.0, 0)
+                _send(conn, result)
+                status = 0
+            finally:
+                os._exit(status)
+        conn.close()
+
+
+def _compiled_validation(cache: 'OrderedDict[str, object]', request: Dict):
+    """Code object for the request's validation (or the SyntaxError it raised)."""
+    source = request['validation']
+    key = hashlib.sha256(source.encode('utf-8')).hexdigest()
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    try:
+        compiled = compile(source, '<validation>', 'exec')
+    except SyntaxError as e:
+        compiled = e
+    cache[key] = compiled
+    while len(cache) > MAX_CACHED_VALIDATIONS:
+        cache.popitem(last=False)
+    return compiled
+
+
+def _reply_internal_error(conn: socket.socket, error: Exception) -> None:
+    try:
+        _send(conn, _result(None, '%s: %s' % (type(error).__name__, error), STATUS_INTERNAL, 0.0, 0))
+    except OSError:
+        pass
+    finally:
+        conn.close()
+
+
+# ============================================================
+# SUPERVISOR + TASK
+# ============================================================
+
+def _supervise(conn: socket.socket, request: Dict, validation, runtime, prelude: str) -> Dict:
+    """Fork the task with limits and collect it, like executor.run_source()."""
+    limits = ExecutionLimits(**request.get('limits', {}))
+    stdin_r, stdin_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    workdir = tempfile.mkdtemp(prefix='apollo-grade-')
+    started = time.monotonic()
+
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            conn.close()
+            os.chdir(workdir)
+            for fd, target in ((stdin_r, 0), (stdout_w, 1), (stderr_w, 2)):
+                os.dup2(fd, target)
+            _close_inherited_fds()
+            _limit_child(limits)()
+            status = _run_task(request, validation, runtime, prelude)
+        finally:
+            os._exit(status)
+
+    for fd in (stdin_r, stdout_w, stderr_w):
+        os.close(fd)
+    try:
+        with os.fdopen(stdin_w, 'wb', 0) as stdin:
+            try:
+                stdin.write(request.get('stdin', '').encode('utf-8'))
+            except BrokenPipeError:
+                pass  # the task exited without reading its input
+        stdout, stderr, timed_out, output_exceeded = _collect(
+            pid, os.fdopen(stdout_r, 'rb', 0), os.fdopen(stderr_r, 'rb', 0), limits, started)
+        returncode, usage, overran = _reap(pid, started + limits.wall_time)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return _finish(stdout, stderr, returncode, timed_out or overran, output_exceeded, usage)
+
+
+def _close_inherited_fds() -> None:
+    """The task keeps only stdin/stdout/stderr (no zygote sockets or pipes)."""
+    try:
+        fds = [int(fd) for fd in os.listdir('/proc/self/fd')]
+    except OSError:
+        fds = list(range(3, 256))
+    for fd in fds:
+        if fd > 2:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _rebind_stdio() -> None:
+    sys.stdin = sys.__stdin__ = open(0, 'r', encoding='utf-8', closefd=False)
+    sys.stdout = sys.__stdout__ = open(1, 'w', encoding='utf-8', closefd=False)
+    sys.stderr = sys.__stderr__ = open(2, 'w', encoding='utf-8', errors='backslashreplace',
+                                       closefd=False)
+
+
+def _run_task(request: Dict, validation, runtime, prelude: str) -> int:
+    """Task process body; returns the exit status a standalone script would have."""
+    _rebind_stdio()
+    if request['op'] == 'grade':
+        namespace = runtime.fresh_namespace(request['code'], request.get('question_id', ''))
+        try:
+            namespace['__exec_error__'] = runtime.run_student_program(request['code'], namespace)
+        except SystemExit as e:
+            namespace['__exec_error__'] = str(e)
+        return _exec_main(validation, namespace)
+
+    source = request['source']
+    namespace = {'__name__': '__main__', '__builtins__': builtins}
+    if source.startswith(prelude):
+        # The runtime is already imported: start from its globals and only
+        # compile the rest, padded so tracebacks keep the script's line numbers.
+        namespace.update({k: v for k, v in vars(runtime).items() if not k.startswith('__')})
+        source = '\n' * prelude.count('\n') + source[len(prelude):]
+    try:
+        code = compile(source, 'main.py', 'exec')
+    except SyntaxError as e:
+        code = e
+    return _exec_main(code, namespace)
+
+
+def _exec_main(code, namespace: Dict) -> int:
+    try:
+        if isinstance(code, SyntaxError):
+            raise code
+        exec(code, namespace)
+        status = 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            status = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+    return status & 0xff
+
+
+# ============================================================
+# CLIENT
+# ============================================================
+
+class ForkServer:
+    """
+    Handle on a running zygote. Thread-safe: every request uses its own
+    connection, and `run_source` can be passed to GradingPool as its runner.
+    """
+
+    def __init__(self):
+        self._dir = tempfile.mkdtemp(prefix='apollo-forkserver-')
+        self.path = os.path.join(self._dir, 'zygote.sock')
+        bootstrap = ('import sys; sys.path.insert(0, %r); '
+                     'from grader.forkserver import serve; serve(%r)' % (PACKAGE_ROOT, self.path))
+        self._proc = subprocess.Popen(
+            [sys.executable, '-I', '-B', '-c', bootstrap],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            env={'PYTHONIOENCODING': 'utf-8', 'PATH': os.environ.get('PATH', '')},
+        )
+        if self._proc.stdout.readline() != READY:
+            self.close()
+            raise RuntimeError('forkserver failed to start')
+
+    def run_source(self, source: str, stdin: str = '', limits: Optional[ExecutionLimits] = None) -> Dict:
+        """Same contract as executor.run_source(), served by a forked child."""
+        return self._request({'op': 'run', 'source': source, 'stdin': stdin}, limits)
+
+    def grade(self, student_code: str, validation: str, question_id: str = '',
+              stdin: str = '', limits: Optional[ExecutionLimits] = None) -> Dict:
+        """Run the student code then `validation`, as in a buildCombinedCode() script."""
+        return self._request({'op': 'grade', 'code': student_code, 'validation': validation,
+                              'question_id': question_id, 'stdin': stdin}, limits)
+
+    def _request(self, payload: Dict, limits: Optional[ExecutionLimits]) -> Dict:
+        payload['limits'] = vars(limits or ExecutionLimits())
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.connect(self.path)
+                _send(sock, payload)
+                return _recv(sock)
+        except (OSError, ValueError) as e:
+            return _result(None, 'forkserver: %s' % e, STATUS_INTERNAL, 0.0, 0)
+
+    def close(self) -> None:
+        if self._proc.poll() is None:
+            self._proc.terminate()
+            self._proc.wait(timeout=5)
+        self._proc.stdout.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def __enter__(self) -> 'ForkServer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ============================================================
+# OVERHEAD MEASUREMENT
+# ============================================================
+
+SAMPLE_ANSWER = "def tambah(a, b):\n    return a + b\nprint(tambah(3, 5))"
+SAMPLE_VALIDATION = "grade_rubric(%s, __STUDENT_CODE__, '__RUBRIC__')" % json.dumps(json.dumps({
+    "criteria": [
+        {"name": "function", "points": 5, "check": {"function": "tambah", "params": 2}},
+        {"name": "return", "points": 5, "check": {"return": True}},
+    ],
+}))
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _timed(grade: Callable[[], Dict], samples: int) -> Dict[str, float]:
+    durations = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        result = grade()
+        durations.append((time.perf_counter() - started) * 1000)
+        if result['status']['id'] != 3 or '__RUBRIC__' not in (result['stdout'] or ''):
+            raise RuntimeError('sample grade failed: %r' % result)
+    durations.sort()
+    return {
+        'mean_ms': sum(durations) / len(durations),
+        'p50_ms': _percentile(durations, 0.50),
+        'p95_ms': _percentile(durations, 0.95),
+    }
+
+
+def measure(samples: int = 30) -> Dict[str, Dict[str, float]]:
+    """Wall time per grade of the same rubric script: fresh interpreter vs forkserver."""
+    from . import combined_source
+
+    script = combined_source(SAMPLE_ANSWER, SAMPLE_VALIDATION)
+    report = {'subprocess': _timed(lambda: run_source(script), samples)}
+    with ForkServer() as server:
+        report['forkserver_run'] = _timed(lambda: server.run_source(script), samples)
+        report['forkserver_grade'] = _timed(
+            lambda: server.grade(SAMPLE_ANSWER, SAMPLE_VALIDATION, 'Q2'), samples)
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, float]], samples: int) -> None:
+    print(f"Per-grade overhead ({samples} grades each, ms)")
+    print(f"  {'mode':<18}{'mean':>9}{'p50':>9}{'p95':>9}")
+    for mode, stats in report.items():
+        print(f"  {mode:<18}{stats['mean_ms']:>9.2f}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}")
+    before = report['subprocess']['mean_ms']
+    for mode in ('forkserver_run', 'forkserver_grade'):
+        after = report[mode]['mean_ms']
+        print(f"  {mode}: saves {before - after:.2f} ms per grade ({before / after:.1f}x faster)")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Forkserver execution mode for the local grading pool')
+    parser.add_argument('--measure', type=int, metavar='N', default=30,
+                        help='grades per mode for the overhead report (default 30)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+    report = measure(args.measure)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args.measure)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Minimal asyncio HTTP/1.1 server for the local grading services.
+
+Only what the Judge0-compatible backend and the static grading service
+need: JSON request/response bodies, query strings, path parameters and
+keep-alive connections. Standard library only.
+"""
+
+import asyncio
+import json
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+REASONS = {
+    200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 413: 'Payload Too Large', 422: 'Unprocessable Entity',
+    500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+
+class Request:
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+        self.params: Dict[str, str] = {}
+
+    def json(self) -> Any:
+        return json.loads(self.body.decode('utf-8')) if self.body else None
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+Handler = Callable[[Request], Awaitable[Tuple[int, Any]]]
+
+
+class Router:
+    """Maps (method, '/path/{param}') to async handlers returning (status, json_body)."""
+
+    def __init__(self):
+        self.routes: List[Tuple[str, 're.Pattern', Handler]] = []
+
+    def add(self, method: str, pattern: str, handler: Handler) -> None:
+        regex = re.compile('^' + re.sub(r'\{(\w+)\}', r'(?P<\1>[^/]+)', pattern) + '$')
+        self.routes.append((method, regex, handler))
+
+    def resolve(self, request: Request) -> Handler:
+        allowed = False
+        for method, regex, handler in self.routes:
+            match = regex.match(request.path)
+            if not match:
+                continue
+            if method == request.method:
+                request.params = match.groupdict()
+                return handler
+            allowed = True
+        if allowed:
+            raise HTTPError(405, 'method not allowed')
+        raise HTTPError(404, 'not found')
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _version = request_line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(400, 'bad request line')
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length', '0') or 0)
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, 'request body too large')
+    body = await reader.readexactly(length) if length else b''
+    return Request(method.upper(), target, headers, body)
+
+
+def _encode_response(status: int, payload: Any, keep_alive: bool) -> bytes:
+    body = json.dumps(payload).encode('utf-8')
+    head = (
+        'HTTP/1.1 %d %s\r\n'
+        'Content-Type: application/json\r\n'
+        'Content-Length: %d\r\n'
+        'Connection: %s\r\n\r\n'
+    ) % (status, REASONS.get(status, 'OK'), len(body), 'keep-alive' if keep_alive else 'close')
+    return head.encode('latin-1') + body
+
+
+async def _serve_connection(router: Router, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                keep_alive = request.headers.get('connection', '').lower() != 'close'
+                status, payload = await router.resolve(request)(request)
+            except HTTPError as e:
+                keep_alive = False
+                status, payload = e.status, {'error': e.message}
+            except (ValueError, KeyError, TypeError) as e:
+                keep_alive = False
+                status, payload = 400, {'error': str(e)}
+            except Exception as e:  # handler bug: report it, keep the server up
+                keep_alive = False
+                status, payload = 500, {'error': '%s: %s' % (type(e).__name__, e)}
+            writer.write(_encode_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(router: Router, host: str, port: int) -> asyncio.AbstractServer:
+    return await asyncio.start_server(
+        lambda r, w: _serve_connection(router, r, w), host, port
+    )
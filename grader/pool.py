@@ -0,0 +1,413 @@
+"""
+Local grading backend: a Judge0-compatible API over a pool of
+sandboxed Python worker processes running on this machine.
+
+    python -m grader.pool --port 2358 --workers 8 [--forkserver]
+    JUDGE0_URL=http://127.0.0.1:2358 npm run dev
+
+Implements the subset of Judge0 the app uses:
+    POST /submissions?wait=true|false[&base64_encoded=true]
+    GET  /submissions/{token}
+    POST /submissions/batch            {"submissions": [...]}
+    GET  /submissions/batch?tokens=a,b
+    GET  /about
+`language_id` is accepted and ignored: every submission is Python.
+
+For load tests it can also behave like a busy remote Judge0 (see LOAD
+SIMULATION): a bounded queue, extra latency and injected failures.
+
+    python -m grader.pool --workers 4 --queue-limit 20 --latency lognormal:300,0.5 \
+        --faults http503=0.02,internal=0.01,timeout=0.01 --seed 7
+"""
+
+import argparse
+import asyncio
+import base64
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .executor import STATUS_INTERNAL, STATUS_TIME_LIMIT, ExecutionLimits, run_source
+from .forkserver import ForkServer
+from .httpd import HTTPError, Request, Router, start_server
+
+STATUS_IN_QUEUE = {'id': 1, 'description': 'In Queue'}
+STATUS_PROCESSING = {'id': 2, 'description': 'Processing'}
+
+MAX_STORED_RESULTS = 10000
+
+Runner = Callable[[str, str, ExecutionLimits], Dict]
+
+
+# ============================================================
+# LOAD SIMULATION
+# ============================================================
+
+class Latency:
+    """
+    Extra milliseconds per submission, as network and queueing time of a
+    remote Judge0: 'fixed:MS', 'uniform:LOW,HIGH', 'normal:MEAN,SD',
+    'lognormal:MEDIAN,SIGMA' or 'exp:MEAN'. Samples are never negative.
+    """
+
+    KINDS = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2, 'exp': 1}
+
+    def __init__(self, spec: str, rng: Optional[random.Random] = None):
+        kind, _, args = spec.partition(':')
+        try:
+            self.args = [float(a) for a in args.split(',')] if args else []
+        except ValueError:
+            raise ValueError('latency %r: arguments must be numbers' % spec)
+        if self.KINDS.get(kind) != len(self.args):
+            raise ValueError('latency %r: use fixed:MS, uniform:LOW,HIGH, normal:MEAN,SD, '
+                             'lognormal:MEDIAN,SIGMA or exp:MEAN' % spec)
+        self.kind = kind
+        self.spec = spec
+        self.rng = rng or random.Random()
+
+    def sample(self) -> float:
+        rng, args = self.rng, self.args
+        if self.kind == 'fixed':
+            value = args[0]
+        elif self.kind == 'uniform':
+            value = rng.uniform(*args)
+        elif self.kind == 'normal':
+            value = rng.gauss(*args)
+        elif self.kind == 'lognormal':
+            value = rng.lognormvariate(math.log(args[0]), args[1]) if args[0] > 0 else 0.0
+        else:
+            value = rng.expovariate(1 / args[0]) if args[0] > 0 else 0.0
+        return max(0.0, value)
+
+
+class Faults:
+    """
+    Injected failures with a probability each, e.g. 'http503=0.02,timeout=0.01':
+      http500, http503  the request fails (per POST, a batch fails as a whole)
+      internal          the submission ends in Judge0's Internal Error (13)
+      timeout           the submission holds a worker for the wall-time limit,
+                        then ends in Time Limit Exceeded (5)
+    """
+
+    HTTP = ('http500', 'http503')
+    RESULT = ('internal', 'timeout')
+
+    def __init__(self, spec: str, rng: Optional[random.Random] = None):
+        self.rates: Dict[str, float] = {}
+        for part in filter(None, spec.split(',')):
+            kind, _, rate = part.partition('=')
+            kind = kind.strip()
+            if kind not in self.HTTP + self.RESULT:
+                raise ValueError('fault %r: use %s' % (kind, ', '.join(self.HTTP + self.RESULT)))
+            self.rates[kind] = float(rate)
+        self.spec = spec
+        self.rng = rng or random.Random()
+
+    def draw(self, kinds: Tuple[str, ...]) -> Optional[str]:
+        """One roll: a fault among `kinds`, or None."""
+        roll = self.rng.random()
+        for kind in kinds:
+            roll -= self.rates.get(kind, 0.0)
+            if roll < 0:
+                return kind
+        return None
+
+
+def _fault_result(status: Dict, message: str, seconds: float) -> Dict:
+    return {'stdout': None, 'stderr': None, 'compile_output': None, 'message': message,
+            'status': dict(status), 'time': '%.3f' % seconds, 'memory': 0}
+
+
+# ============================================================
+# POOL
+# ============================================================
+
+class GradingPool:
+    """
+    Runs submissions on at most `workers` concurrent worker processes.
+
+    Every submission gets a fresh interpreter with the per-task limits
+    in `limits`; `runner` can be swapped for a warmer execution mode.
+
+    With `queue_limit` set, at most `workers + queue_limit` submissions
+    are pending at once; more are refused with 503 "queue is full", as
+    Judge0 does past its MAX_QUEUE_SIZE. `latency` delays every
+    submission before it takes a worker, `faults` injects failures.
+    """
+
+    def __init__(self, workers: int, limits: ExecutionLimits, runner: Runner = run_source,
+                 queue_limit: Optional[int] = None, latency: Optional[Latency] = None,
+                 faults: Optional[Faults] = None):
+        self.workers = workers
+        self.limits = limits
+        self.runner = runner
+        self.queue_limit = queue_limit
+        self.latency = latency
+        self.faults = faults
+        self.pending = 0
+        self.counters = {'accepted': 0, 'rejected': 0, 'peak_pending': 0}
+        self.injected: Dict[str, int] = {}
+        self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='grade')
+        # Only the newest MAX_STORED_RESULTS are kept: a submission still
+        # running may lose its token, and its result is then dropped
+        self._results: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._results_lock = threading.Lock()
+
+    def check_capacity(self, count: int = 1) -> None:
+        """Refuse `count` more submissions if they would overflow the queue."""
+        if self.queue_limit is not None and self.pending + count > self.workers + self.queue_limit:
+            self.counters['rejected'] += count
+            raise HTTPError(503, 'queue is full')
+
+    def admit(self, count: int = 1) -> None:
+        self.check_capacity(count)
+        self.pending += count
+        self.counters['accepted'] += count
+        self.counters['peak_pending'] = max(self.counters['peak_pending'], self.pending)
+
+    def inject_http_fault(self) -> None:
+        """Fail the current request if an http500/http503 fault is drawn."""
+        fault = self.faults.draw(Faults.HTTP) if self.faults else None
+        if fault:
+            self.injected[fault] = self.injected.get(fault, 0) + 1
+            raise HTTPError(int(fault[4:]), 'injected failure')
+
+    async def execute(self, source: str, stdin: str = '', overrides: Optional[Dict] = None) -> Dict:
+        """Run one submission and wait for it (Judge0 wait=true)."""
+        self.admit()
+        return await self._run(source, stdin, overrides)
+
+    async def _run(self, source: str, stdin: str, overrides: Optional[Dict]) -> Dict:
+        """Run an admitted submission."""
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency.sample() / 1000)
+            limits = self.limits.merged(overrides or {})
+            loop = asyncio.get_running_loop()
+            fault = self.faults.draw(Faults.RESULT) if self.faults else None
+            if fault:
+                self.injected[fault] = self.injected.get(fault, 0) + 1
+            if fault == 'internal':
+                return _fault_result(STATUS_INTERNAL, 'injected failure', 0.0)
+            if fault == 'timeout':
+                await loop.run_in_executor(self._threads, time.sleep, limits.wall_time)
+                return _fault_result(STATUS_TIME_LIMIT, 'Time limit exceeded', limits.cpu_time)
+            return await loop.run_in_executor(self._threads, self.runner, source, stdin, limits)
+        finally:
+            self.pending -= 1
+
+    def submit(self, source: str, stdin: str = '', overrides: Optional[Dict] = None) -> str:
+        """Queue a submission and return its token (Judge0 wait=false)."""
+        self.admit()
+        token = self.remember({'status': dict(STATUS_IN_QUEUE), 'stdout': None, 'stderr': None,
+                               'compile_output': None, 'message': None, 'time': None, 'memory': None})
+
+        async def run():
+            self.update(token, {'status': dict(STATUS_PROCESSING)})
+            self.update(token, await self._run(source, stdin, overrides), replace=True)
+
+        asyncio.get_running_loop().create_task(run())
+        return token
+
+    def stats(self) -> Dict:
+        return dict(self.counters, pending=self.pending, queued=max(0, self.pending - self.workers),
+                    injected=dict(self.injected))
+
+    def result(self, token: str) -> Optional[Dict]:
+        """A copy of the stored result, None for unknown or evicted tokens."""
+        with self._results_lock:
+            result = self._results.get(token)
+            return dict(result) if result is not None else None
+
+    def remember(self, result: Dict) -> str:
+        """Store a result under a new token for GET /submissions/{token}; returns the token."""
+        token = str(uuid.uuid4())
+        result['token'] = token
+        with self._results_lock:
+            self._results[token] = result
+            while len(self._results) > MAX_STORED_RESULTS:
+                self._results.popitem(last=False)
+        return token
+
+    def update(self, token: str, fields: Dict, replace: bool = False) -> bool:
+        """
+        Update (or with `replace`, overwrite) the stored result of `token`.
+        False when the token was evicted meanwhile: it is not stored again.
+        """
+        with self._results_lock:
+            if token not in self._results:
+                return False
+            if replace:
+                self._results[token] = dict(fields, token=token)
+                self._results.move_to_end(token)
+            else:
+                self._results[token].update(fields)
+            return True
+
+    def shutdown(self) -> None:
+        self._threads.shutdown(wait=False)
+
+
+# ============================================================
+# JUDGE0-COMPATIBLE HTTP API
+# ============================================================
+
+def _wants_base64(request: Request) -> bool:
+    return request.query.get('base64_encoded', 'false').lower() == 'true'
+
+
+def _decode_field(value: Optional[str], encoded: bool) -> str:
+    if not value:
+        return ''
+    return base64.b64decode(value).decode('utf-8') if encoded else value
+
+
+def _encode_result(result: Dict, encoded: bool, fields: Optional[str] = None) -> Dict:
+    result = dict(result)
+    if encoded:
+        for key in ('stdout', 'stderr', 'compile_output', 'message'):
+            if result.get(key):
+                result[key] = base64.b64encode(result[key].encode('utf-8')).decode('ascii')
+    if fields and fields != '*':
+        wanted = set(fields.split(','))
+        result = {k: v for k, v in result.items() if k in wanted}
+    return result
+
+
+def _parse_submission(body: Any, encoded: bool) -> Tuple[str, str, Dict]:
+    if not isinstance(body, dict) or 'source_code' not in body:
+        raise HTTPError(422, 'source_code is required')
+    source = _decode_field(body.get('source_code'), encoded)
+    stdin = _decode_field(body.get('stdin'), encoded)
+    return source, stdin, body
+
+
+def build_router(pool: GradingPool) -> Router:
+    router = Router()
+
+    async def create_submission(request: Request):
+        encoded = _wants_base64(request)
+        source, stdin, overrides = _parse_submission(request.json(), encoded)
+        pool.inject_http_fault()
+        if request.query.get('wait', 'false').lower() == 'true':
+            result = await pool.execute(source, stdin, overrides)
+            pool.remember(result)
+            return 201, _encode_result(result, encoded, request.query.get('fields'))
+        return 201, {'token': pool.submit(source, stdin, overrides)}
+
+    async def get_submission(request: Request):
+        result = pool.result(request.params['token'])
+        if result is None:
+            raise HTTPError(404, 'submission not found')
+        return 200, _encode_result(result, _wants_base64(request), request.query.get('fields'))
+
+    async def create_batch(request: Request):
+        encoded = _wants_base64(request)
+        body = request.json() or {}
+        submissions = body.get('submissions') if isinstance(body, dict) else None
+        if not isinstance(submissions, list):
+            raise HTTPError(422, 'submissions must be a list')
+        parsed = [_parse_submission(submission, encoded) for submission in submissions]
+        pool.inject_http_fault()
+        pool.check_capacity(len(parsed))
+        return 201, [{'token': pool.submit(source, stdin, overrides)} for source, stdin, overrides in parsed]
+
+    async def get_batch(request: Request):
+        encoded = _wants_base64(request)
+        fields = request.query.get('fields')
+        tokens = [t for t in request.query.get('tokens', '').split(',') if t]
+        submissions = []
+        for token in tokens:
+            result = pool.result(token)
+            submissions.append(_encode_result(result, encoded, fields) if result else None)
+        return 200, {'submissions': submissions}
+
+    async def about(request: Request):
+        return 200, {
+            'version': 'apollo-local',
+            'workers': pool.workers,
+            'limits': vars(pool.limits),
+            'queue_limit': pool.queue_limit,
+            'latency': pool.latency.spec if pool.latency else None,
+            'faults': pool.faults.rates if pool.faults else {},
+            'stats': pool.stats(),
+        }
+
+    router.add('POST', '/submissions', create_submission)
+    router.add('POST', '/submissions/batch', create_batch)
+    router.add('GET', '/submissions/batch', get_batch)
+    router.add('GET', '/submissions/{token}', get_submission)
+    router.add('GET', '/about', about)
+    return router
+
+
+async def serve(host: str, port: int, pool: GradingPool) -> None:
+    server = await start_server(build_router(pool), host, port)
+    print(f"[grader.pool] Judge0-compatible API on http://{host}:{port} "
+          f"({pool.workers} workers, cpu={pool.limits.cpu_time}s, "
+          f"wall={pool.limits.wall_time}s, mem={pool.limits.memory_kb}KB)")
+    if pool.queue_limit is not None or pool.latency or pool.faults:
+        print(f"[grader.pool] simulating load: queue limit {pool.queue_limit}, "
+              f"latency {pool.latency.spec if pool.latency else 'none'}, "
+              f"faults {pool.faults.spec if pool.faults else 'none'}")
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Local Judge0-compatible grading backend')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2358)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--cpu-time', type=float, default=5.0, help='CPU seconds per task')
+    parser.add_argument('--wall-time', type=float, default=10.0, help='wall-clock seconds per task')
+    parser.add_argument('--memory-mb', type=int, default=256, help='address space cap per task')
+    parser.add_argument('--max-output-kb', type=int, default=1024, help='stdout/stderr cap per task')
+    parser.add_argument('--forkserver', action='store_true',
+                        help='fork tasks from a warm interpreter with the runtime preloaded')
+    parser.add_argument('--queue-limit', type=int, help='pending submissions past the workers before 503')
+    parser.add_argument('--latency', help='extra delay per submission, e.g. fixed:200 or lognormal:300,0.5 (ms)')
+    parser.add_argument('--faults', help='failure rates, e.g. http503=0.02,internal=0.01,timeout=0.01')
+    parser.add_argument('--seed', type=int, help='seed for latency and faults')
+    return parser.parse_args(argv)
+
+
+def limits_from_args(args: argparse.Namespace) -> ExecutionLimits:
+    return ExecutionLimits(
+        cpu_time=args.cpu_time,
+        wall_time=args.wall_time,
+        memory_kb=args.memory_mb * 1024,
+        max_output_bytes=args.max_output_kb * 1024,
+    )
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    try:
+        latency = Latency(args.latency, rng) if args.latency else None
+        faults = Faults(args.faults, rng) if args.faults else None
+    except ValueError as e:
+        raise SystemExit(str(e))
+    forkserver = ForkServer() if args.forkserver else None
+    pool = GradingPool(args.workers, limits_from_args(args),
+                       runner=forkserver.run_source if forkserver else run_source,
+                       queue_limit=args.queue_limit, latency=latency, faults=faults)
+    try:
+        asyncio.run(serve(args.host, args.port, pool))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown()
+        if forkserver:
+            forkserver.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+"""
+Grading stored exam questions outside the web app.
+
+Python side of getQuestionGradingSpec(), buildExamCode() and
+gradeJobOutput() in src/lib/rubricGrader.ts: tools that grade answers
+to questions as stored in the `exams` table (scripts/regrade_exam.py)
+run the same script the app sends to Judge0, here in the local sandbox
+(grader/executor.py), and build the same GradeResult dicts from it.
+
+    grade_answers(questions, answers) -> {question id: GradeResult}
+    grade_question_for_students(question, {key: code}) -> {key: GradeResult}
+    fill_expected_outputs(questions) -> (questions as saved, {question id: problem})
+"""
+
+import base64
+import hashlib
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import runtime_source
+from .canonical import cache_key
+from .executor import ExecutionLimits, run_source
+from .runtime import RESULT_MARKER, read_final_frame, read_frames
+
+DEFAULT_RUBRIC_MARKER = '__RUBRIC__'
+BATCH_MARKER = '__BATCH__'
+REFERENCE_MARKER = '__REFERENCE__'
+STUDENT_BATCH_SIZE = 50
+
+Runner = Callable[[str, str, ExecutionLimits], Dict]
+
+
+# ============================================================
+# QUESTION -> JOB
+# ============================================================
+
+def rubric_validation(spec: Dict, marker: str = DEFAULT_RUBRIC_MARKER) -> str:
+    """buildRubricValidation(): validation code for a declarative rubric."""
+    namespace = ', globals()' if any('tests' in c for c in spec.get('criteria', ())) else ''
+    return 'grade_rubric(%s, __STUDENT_CODE__, %s%s)' % (json.dumps(json.dumps(spec)), json.dumps(marker), namespace)
+
+
+def standalone_validation(spec: Dict, marker: str = DEFAULT_RUBRIC_MARKER) -> str:
+    """
+    rubric_validation() with the grading runtime in front, for graders that
+    only prepend the plain header (gradeWithRubric() in the Express backend,
+    backend/src/lib/rubricGrader.ts): stored as validationCode next to the rubric.
+    """
+    return '%s\n\n%s\n' % (runtime_source(), rubric_validation(spec, marker))
+
+
+def validation_code(question: Dict) -> str:
+    """getValidationCode(): a declarative rubric wins over validationCode."""
+    if question.get('rubric'):
+        return rubric_validation(question['rubric'], question.get('gradingFormat') or DEFAULT_RUBRIC_MARKER)
+    return question.get('validationCode') or ''
+
+
+def grading_type(question: Dict) -> str:
+    return 'rubric' if question.get('gradingType') == 'rubric' or question.get('rubric') else 'assertion'
+
+
+def _current_artifact(question: Dict, validation: str) -> Optional[Dict]:
+    artifact = question.get('validationArtifact')
+    if not artifact or artifact.get('sourceHash') != hashlib.sha256(validation.encode('utf-8')).hexdigest():
+        return None
+    return {key: artifact[key] for key in ('format', 'magic', 'python', 'code')}
+
+
+def grading_job(question: Dict, student_code: str) -> Optional[Dict]:
+    """The run_question() job the app would build for this answer, or None if there is nothing to grade."""
+    validation = validation_code(question)
+    if not validation:
+        return None
+    return {
+        'id': question['id'],
+        'code': student_code,
+        'validation': validation,
+        'static': question.get('staticGrading') is True,
+        'artifact': _current_artifact(question, validation),
+        'output_budget': question.get('outputBudget') or None,
+        'step_budget': question.get('stepBudget') or None,
+        'memory_limit': question.get('memoryLimit') or None,
+    }
+
+
+def exam_script(jobs: List[Dict]) -> str:
+    """buildExamCode(): grade every job in one script, one __BATCH__ frame at the end."""
+    payload = base64.b64encode(json.dumps(jobs).encode('utf-8')).decode('ascii')
+    return '%s\n\nrun_exam(decode_payload("%s"))\nfinish()\n' % (runtime_source(), payload)
+
+
+def student_batch_script(question: Dict, answers: List[Dict]) -> str:
+    """One script grading many answers [{key, code}] to `question` with run_students()."""
+    job = grading_job(question, '')
+    payload = {'validation': job['validation'], 'question_id': question['id'], 'static': job['static'],
+               'artifact': job['artifact'], 'output_budget': job['output_budget'],
+               'step_budget': job['step_budget'], 'memory_limit': job['memory_limit'], 'answers': answers}
+    encoded = base64.b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+    # Passed straight in: a global would show every answer to the others
+    return '%s\n\nrun_students(**decode_payload("%s"))\nfinish()\n' % (runtime_source(), encoded)
+
+
+# ============================================================
+# EXPECTED OUTPUTS - what the app fills in at exam save
+# ============================================================
+
+def functional_tests(question: Dict) -> List[Dict]:
+    """functionalTests(): the "tests" of every rubric criterion that has them."""
+    rubric = question.get('rubric') or {}
+    return [criterion['tests'] for criterion in rubric.get('criteria', ()) if 'tests' in criterion]
+
+
+def _has_expected(tests: Dict) -> bool:
+    return isinstance(tests.get('expected'), list) and len(tests['expected']) == len(tests.get('inputs') or ())
+
+
+def _with_expected(question: Dict, expected: List) -> Dict:
+    outputs = iter(expected)
+    criteria = [dict(c, tests=dict(c['tests'], expected=next(outputs))) if 'tests' in c else c
+                for c in question['rubric']['criteria']]
+    return dict(question, rubric=dict(question['rubric'], criteria=criteria))
+
+
+def fill_expected_outputs(questions: List[Dict], limits: Optional[ExecutionLimits] = None,
+                          runner: Runner = run_source) -> Tuple[List[Dict], Dict[str, str]]:
+    """
+    fillExpectedOutputs(): the questions as the app saves them, functional
+    tests of those with a referenceSolution getting `expected` from it
+    (every reference runs once, in one sandbox run), and {question id:
+    problem} for questions that still cannot be graded. `questions` is
+    not modified.
+    """
+    problems = {q['id']: 'functional tests need expected outputs or a reference solution'
+                for q in questions if not q.get('referenceSolution')
+                and not all(_has_expected(tests) for tests in functional_tests(q))}
+    referenced = [q for q in questions if q.get('referenceSolution') and functional_tests(q)]
+    if not referenced:
+        return list(questions), problems
+
+    payload = [{'code': q['referenceSolution'],
+                'tests': [{key: t[key] for key in ('function', 'inputs', 'time_limit') if key in t}
+                          for t in functional_tests(q)]} for q in referenced]
+    encoded = base64.b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+    execution = runner('%s\n\nrun_references(decode_payload("%s"))\nfinish()\n' % (runtime_source(), encoded),
+                       '', limits or ExecutionLimits())
+    outputs = read_final_frame(execution.get('stdout') or '', REFERENCE_MARKER) \
+        if execution['status']['id'] == 3 else None
+    if not isinstance(outputs, list) or len(outputs) != len(referenced):
+        # Like the app: outputs stored by a previous save are kept
+        failure = (execution.get('stderr') or execution['status']['description']).strip().splitlines()[-1:]
+        for q in referenced:
+            if not all(_has_expected(tests) for tests in functional_tests(q)):
+                problems[q['id']] = 'reference solutions could not be run: %s' % ''.join(failure)
+        return list(questions), problems
+
+    filled = {}
+    for question, output in zip(referenced, outputs):
+        if output.get('error'):
+            problems[question['id']] = 'reference solution failed: %s' % output['error']
+        else:
+            filled[question['id']] = _with_expected(question, output['expected'])
+    return [filled.get(q['id'], q) for q in questions], problems
+
+
+# ============================================================
+# OUTPUT -> GradeResult
+# ============================================================
+
+def parse_rubric_output(stdout: Optional[str], marker: str = DEFAULT_RUBRIC_MARKER) -> Optional[Dict]:
+    """parseRubricOutput(): the last `marker` line of stdout."""
+    index = stdout.rfind(marker) if stdout else -1
+    if index == -1:
+        return None
+    try:
+        parsed = json.loads(stdout[index + len(marker):].split('\n')[0].strip())
+    except ValueError:
+        return None
+    result = {
+        'score': parsed.get('score') if isinstance(parsed.get('score'), (int, float)) else 0,
+        'maxScore': parsed.get('max_score') if isinstance(parsed.get('max_score'), (int, float)) else 0,
+        'breakdown': parsed.get('breakdown') or {},
+        'errors': parsed.get('errors') if isinstance(parsed.get('errors'), list) else [],
+    }
+    if isinstance(parsed.get('tests'), dict):
+        result['tests'] = parsed['tests']
+    return result
+
+
+def run_failure_grade(question: Dict, execution: Dict) -> Dict:
+    """toRubricGrade()/toAssertionGrade() for a run that did not finish (Judge0 status other than 3)."""
+    points = question['points']
+    status = execution['status']
+    if grading_type(question) == 'assertion':
+        return {'questionId': question['id'], 'score': 0, 'maxScore': points,
+                'breakdown': {'all_tests': 0}, 'errors': ['assertion_failed'],
+                'status': 'timeout' if status['id'] == 5 else 'graded' if status['id'] in (3, 11) else 'error'}
+    return {
+        'questionId': question['id'], 'score': 0, 'maxScore': points, 'breakdown': {},
+        'errors': [execution.get('stderr') or execution.get('compile_output') or status['description']],
+        'status': 'timeout' if status['id'] == 5 else 'error',
+    }
+
+
+LIMIT_ERRORS = ('output_limit_exceeded', 'step_budget_exceeded', 'memory_limit_exceeded')
+
+
+def cacheable(grade: Dict) -> bool:
+    """
+    storeGrades(): only 'graded' results are cached; errors and timeouts may
+    come from the sandbox, and so may grades that hit a resource limit or
+    have functional-test cases stopped by one ("limited").
+    """
+    return (grade['status'] == 'graded'
+            and not any(error in LIMIT_ERRORS for error in grade['errors'])
+            and not any(counts.get('limited') for counts in grade.get('tests', {}).values()))
+
+
+def error_grade(question: Dict, message: str) -> Dict:
+    """toErrorGrade()"""
+    return {'questionId': question['id'], 'score': 0, 'maxScore': question['points'],
+            'breakdown': {}, 'errors': [message], 'status': 'error'}
+
+
+def ungraded(question: Dict) -> Dict:
+    """What the submit route stores for a question without validation."""
+    return {'questionId': question['id'], 'score': 0, 'maxScore': question['points'],
+            'breakdown': {}, 'errors': ['no_validation_code'], 'status': 'graded'}
+
+
+def grade_result(question: Dict, output: Dict, sandbox_kb: Optional[int] = None) -> Dict:
+    """gradeJobOutput(): one run_question() result as the app's GradeResult."""
+    question_id, points = question['id'], question['points']
+    stderr = output.get('stderr') or None
+    if grading_type(question) == 'assertion':
+        passed = output['ok'] and not stderr
+        grade = {'questionId': question_id, 'score': points if passed else 0, 'maxScore': points,
+                 'breakdown': {'all_tests': points if passed else 0},
+                 'errors': [] if passed else ['assertion_failed'], 'status': 'graded'}
+    elif not output['ok']:
+        grade = run_failure_grade(question, {'status': {'id': 11, 'description': 'Runtime Error (NZEC)'},
+                                             'stderr': stderr})
+    else:
+        rubric = parse_rubric_output(output['stdout'], question.get('gradingFormat') or DEFAULT_RUBRIC_MARKER)
+        if rubric is None:
+            # No rubric line: errors fail, silence passes (simple pass/fail)
+            grade = {'questionId': question_id, 'score': 0 if stderr else points, 'maxScore': points,
+                     'breakdown': {} if stderr else {'passed': points},
+                     'errors': ['assertion_failed'] if stderr else [], 'status': 'graded'}
+        else:
+            grade = {'questionId': question_id, 'score': rubric['score'],
+                     'maxScore': rubric['maxScore'] or points, 'breakdown': rubric['breakdown'],
+                     'errors': rubric['errors'], 'status': 'graded'}
+            if 'tests' in rubric:
+                grade['tests'] = rubric['tests']
+
+    for flag, error in (('output_exceeded', 'output_limit_exceeded'),
+                        ('step_budget_exceeded', 'step_budget_exceeded'),
+                        ('memory_exceeded', 'memory_limit_exceeded')):
+        if output.get(flag):
+            grade['errors'] = grade['errors'] + [error]
+    if output.get('timings'):
+        grade['timings'] = output['timings']
+    if sandbox_kb or output.get('peak_memory') is not None:
+        grade['memory'] = {'sandboxKb': sandbox_kb or None, 'peakBytes': output.get('peak_memory')}
+    return grade
+
+
+# ============================================================
+# GRADING
+# ============================================================
+
+def _run_jobs(questions: List[Dict], jobs: List[Dict], limits: ExecutionLimits, runner: Runner) -> Optional[List[Dict]]:
+    execution = runner(exam_script(jobs), '', limits)
+    if execution['status']['id'] != 3:
+        return [run_failure_grade(question, execution) for question in questions] if len(jobs) == 1 else None
+    outputs = read_final_frame(execution.get('stdout') or '', BATCH_MARKER)
+    if not isinstance(outputs, list) or len(outputs) != len(jobs):
+        return [error_grade(questions[0], 'Grading produced no result')] if len(jobs) == 1 else None
+    return [grade_result(question, output, execution.get('memory'))
+            for question, output in zip(questions, outputs)]
+
+
+def grade_answers(questions: List[Dict], answers: Dict[str, str],
+                  limits: Optional[ExecutionLimits] = None, runner: Runner = run_source) -> Dict[str, Dict]:
+    """
+    Grade `answers` (question id -> code) to `questions` like the submit
+    route does: one run for every question, each question on its own if
+    that run fails as a whole.
+    """
+    limits = limits or ExecutionLimits()
+    results = {}
+    graded, jobs = [], []
+    for question in questions:
+        job = grading_job(question, answers.get(question['id']) or '')
+        if job is None:
+            results[question['id']] = ungraded(question)
+        else:
+            graded.append(question)
+            jobs.append(job)
+
+    batch = _run_jobs(graded, jobs, limits, runner) if jobs else []
+    if batch is None:
+        batch = [_run_jobs([question], [job], limits, runner)[0] for question, job in zip(graded, jobs)]
+    for question, grade in zip(graded, batch):
+        results[question['id']] = grade
+    return results
+
+
+def grade_question_for_students(question: Dict, answers: Dict[str, str], limits: Optional[ExecutionLimits] = None,
+                                runner: Runner = run_source, batch_size: int = STUDENT_BATCH_SIZE) -> Dict[str, Dict]:
+    """
+    Grade many students' answers (key -> code) to one question,
+    `batch_size` distinct answers per run: validation is compiled once
+    per run and answers sharing a cache_key() (identical up to what the
+    question's rubric cannot see) are graded once. Results stream back
+    one frame per answer, so when a run hits a limit the answers already
+    graded are kept and only the rest are graded on their own.
+    """
+    limits = limits or ExecutionLimits()
+    if grading_job(question, '') is None:
+        return {key: ungraded(question) for key in answers}
+
+    keys = {key: cache_key(code, question.get('rubric') or None) for key, code in answers.items()}
+    codes: Dict[str, str] = {}
+    for key, code in answers.items():
+        codes.setdefault(keys[key], code)
+    distinct = list(codes.items())
+    graded: Dict[str, Dict] = {}
+    for start in range(0, len(distinct), batch_size):
+        chunk = distinct[start:start + batch_size]
+        execution = runner(student_batch_script(question, [{'key': str(i), 'code': code}
+                                                           for i, (_, code) in enumerate(chunk)]), '', limits)
+        outputs = {}
+        for output in read_frames(execution.get('stdout') or '', RESULT_MARKER):
+            if isinstance(output, dict):
+                outputs[str(output.get('key'))] = output
+        for i, (code_key, code) in enumerate(chunk):
+            output = outputs.get(str(i))
+            graded[code_key] = (grade_result(question, output, execution.get('memory')) if output is not None
+                                else grade_answers([question], {question['id']: code}, limits, runner)[question['id']])
+    return {key: dict(graded[keys[key]]) for key in answers}
@@ -0,0 +1,1489 @@
+# ============================================================
+# APOLLO GRADING RUNTIME
+# ============================================================
+# Shared helpers for validation code. This file is prepended to
+# every grading script sent to Judge0, so it must stay
+# self-contained: standard library only, Python 3.8 compatible,
+# and no top-level side effects besides definitions.
+#
+# AVAILABLE TO VALIDATION CODE:
+#   analyze(source)  -> CodeFacts (cached per source string)
+#   CodeFacts        -> fact table built from ONE ast.walk
+#   grade_rubric(spec, source) -> grade a declarative rubric and
+#                                 print the __RUBRIC__ line
+#   grade_rubric(spec, source, marker, globals())
+#                              -> same, for rubrics with functional
+#                                 tests (see FUNCTIONAL TESTS)
+#   emit_rubric(result)        -> print a hand-built result
+#
+# STATIC VALIDATION:
+#   classify_validation(source) tells whether validation only
+#   inspects __STUDENT_CODE__; if so the student program need not run.
+#
+# PRECOMPILED VALIDATION:
+#   prepare_validations(sources) runs once per exam save: it
+#   syntax-checks, classifies and compiles every validation into a
+#   marshal'd artifact. load_validation(source, artifact) uses the
+#   artifact when this interpreter can load it, else compiles source.
+#
+# BATCH MODE:
+#   run_exam(jobs) grades several questions in one execution,
+#   each in its own namespace, and writes one __BATCH__ frame.
+#   run_students(validation, answers) grades many students' answers
+#   to ONE question, compiling validation once and writing one
+#   __RESULT__ frame per student as soon as it is graded. Modules,
+#   builtins and limits an answer changes are put back before the next.
+#
+# RESULT FRAMES:
+#   Results travel in length-prefixed frames, not in plain prints,
+#   and student output never reaches them (see write_frame()).
+#
+# STEP BUDGET AND MEMORY:
+#   The student phase's peak memory is measured (tracemalloc). Opt-in
+#   per question, StudentTracer stops the student's code past a number
+#   of executed lines or a memory cap.
+#
+# PHASE TIMINGS:
+#   Every result carries `timings` (ms per phase), see run_question().
+#
+# BOUNDED OUTPUT:
+#   Output is captured in BoundedOutput: only the last `tail`
+#   characters are kept, and printing more than `budget` bytes stops
+#   the program (OutputLimitExceeded).
+# ============================================================
+
+import ast
+import base64
+import builtins
+import collections
+import copy
+import functools
+import io
+import json
+import marshal
+import math
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+
+
+# ============================================================
+# FACT TABLE - one traversal, O(1) queries
+# ============================================================
+class CodeFacts:
+    """
+    Facts about a student's program, collected in a single pass.
+
+    Every rubric check (function exists, calls print, has a loop,
+    uses `% 2 == 0`, ...) is answered from the tables below instead
+    of walking the tree again.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.nodes = {}          # node type name -> [nodes]
+        self.functions = {}      # function name -> [arity, ...]
+        self.calls = {}          # called function name -> count
+        self.method_calls = {}   # called attribute name -> count
+        self.binops = {}         # operator name ('Mult', 'Mod') -> count
+        self.compare_ops = {}    # comparison operator name -> count
+        self.mod_checks = set()  # (divisor, op, value) for `x % d <op> v`
+        self.assigns = set()     # names bound by =, +=, : annotations
+        self.aug_assigns = set() # names updated with +=, -=, ...
+        self.loops = 0
+        self.returns = 0
+
+        handlers = _FACT_HANDLERS
+        nodes = self.nodes
+        for node in ast.walk(tree):
+            kind = type(node).__name__
+            bucket = nodes.get(kind)
+            if bucket is None:
+                nodes[kind] = [node]
+            else:
+                bucket.append(node)
+            handler = handlers.get(kind)
+            if handler is not None:
+                handler(self, node)
+
+    # --- collectors (called once per matching node) ---
+    def _on_function(self, node):
+        arity = len(node.args.args) + len(getattr(node.args, 'posonlyargs', []))
+        self.functions.setdefault(node.name, []).append(arity)
+
+    def _on_call(self, node):
+        func = node.func
+        if isinstance(func, ast.Name):
+            self.calls[func.id] = self.calls.get(func.id, 0) + 1
+        elif isinstance(func, ast.Attribute):
+            self.method_calls[func.attr] = self.method_calls.get(func.attr, 0) + 1
+
+    def _on_binop(self, node):
+        op = type(node.op).__name__
+        self.binops[op] = self.binops.get(op, 0) + 1
+
+    def _on_compare(self, node):
+        for op in node.ops:
+            name = type(op).__name__
+            self.compare_ops[name] = self.compare_ops.get(name, 0) + 1
+        left = node.left
+        if (isinstance(left, ast.BinOp) and isinstance(left.op, ast.Mod)
+                and isinstance(left.right, ast.Constant)):
+            for op, comparator in zip(node.ops, node.comparators):
+                if isinstance(comparator, ast.Constant):
+                    self.mod_checks.add(
+                        (left.right.value, type(op).__name__, comparator.value)
+                    )
+
+    def _on_assign(self, node):
+        for target in node.targets:
+            for name in _target_names(target):
+                self.assigns.add(name)
+
+    def _on_ann_assign(self, node):
+        for name in _target_names(node.target):
+            self.assigns.add(name)
+
+    def _on_aug_assign(self, node):
+        for name in _target_names(node.target):
+            self.assigns.add(name)
+            self.aug_assigns.add(name)
+
+    def _on_loop(self, node):
+        self.loops += 1
+
+    def _on_return(self, node):
+        self.returns += 1
+
+    # --- queries ---
+    def has(self, *kinds):
+        """True if any node of the given type names exists, e.g. has('For', 'While')."""
+        return any(kind in self.nodes for kind in kinds)
+
+    def count(self, kind):
+        return len(self.nodes.get(kind, ()))
+
+    def has_function(self, name, params=None):
+        """Function `name` is defined (with exactly `params` positional params if given)."""
+        arities = self.functions.get(name)
+        if not arities:
+            return False
+        return params is None or params in arities
+
+    def calls_name(self, name):
+        """`name(...)` is called as a plain function, e.g. calls_name('print')."""
+        return name in self.calls
+
+    def calls_method(self, name):
+        """`obj.name(...)` is called on some object, e.g. calls_method('append')."""
+        return name in self.method_calls
+
+    def has_binop(self, op):
+        return op in self.binops
+
+    def assigns_name(self, name):
+        return name in self.assigns
+
+    def has_mod_compare(self, divisor, op='Eq', value=0):
+        """`x % divisor <op> value` appears somewhere, e.g. (2, 'Eq', 0) for even checks."""
+        return (divisor, op, value) in self.mod_checks
+
+    @property
+    def has_loop(self):
+        return self.loops > 0
+
+    @property
+    def has_return(self):
+        return self.returns > 0
+
+    @property
+    def has_if(self):
+        return 'If' in self.nodes
+
+
+def _target_names(target):
+    """Yield plain names bound by an assignment target (handles tuple unpacking)."""
+    if isinstance(target, ast.Name):
+        yield target.id
+    elif isinstance(target, (ast.Tuple, ast.List)):
+        for element in target.elts:
+            for name in _target_names(element):
+                yield name
+    elif isinstance(target, ast.Starred):
+        for name in _target_names(target.value):
+            yield name
+
+
+_FACT_HANDLERS = {
+    'FunctionDef': CodeFacts._on_function,
+    'AsyncFunctionDef': CodeFacts._on_function,
+    'Call': CodeFacts._on_call,
+    'BinOp': CodeFacts._on_binop,
+    'Compare': CodeFacts._on_compare,
+    'Assign': CodeFacts._on_assign,
+    'AnnAssign': CodeFacts._on_ann_assign,
+    'AugAssign': CodeFacts._on_aug_assign,
+    'For': CodeFacts._on_loop,
+    'AsyncFor': CodeFacts._on_loop,
+    'While': CodeFacts._on_loop,
+    'Return': CodeFacts._on_return,
+}
+
+_FACTS_CACHE = {}
+_FACTS_CACHE_SIZE = 32
+
+# Seconds spent per phase that is not timed where it runs (see PHASE TIMINGS)
+_PHASE_SECONDS = {}
+
+
+def analyze(source):
+    """
+    Parse `source` once and return its CodeFacts.
+    Raises SyntaxError like ast.parse. Results are cached per source
+    string, so several criteria (or validation snippets) share one walk.
+    """
+    facts = _FACTS_CACHE.get(source)
+    if facts is None:
+        started = time.perf_counter()
+        try:
+            facts = CodeFacts(ast.parse(source))
+        finally:
+            _PHASE_SECONDS['parse'] = _PHASE_SECONDS.get('parse', 0.0) + time.perf_counter() - started
+        if len(_FACTS_CACHE) >= _FACTS_CACHE_SIZE:
+            _FACTS_CACHE.clear()
+        _FACTS_CACHE[source] = facts
+    return facts
+
+
+# ============================================================
+# DECLARATIVE RUBRICS
+# ============================================================
+# A rubric spec is plain data stored on the question:
+#
+#   {"max_score": 10, "criteria": [
+#       {"name": "fungsi", "points": 5,
+#        "check": {"function": "tambah", "params": 2},
+#        "error": "Fungsi tambah dengan 2 parameter tidak ditemukan"},
+#       {"name": "loop", "points": 3, "check": {"node": "For"},
+#        "partial": [{"check": {"node": "While"}, "points": 2,
+#                     "error": "used_while_instead_of_for"}],
+#        "error": "missing_loop"}
+#   ]}
+#
+# CHECKS (one key each, combinable with all/any/not):
+#   {"function": name, "params": n}   {"calls": name}
+#   {"method": name}                  {"binop": "Mult"}
+#   {"node": "If" | [kinds]}          {"loop": true}
+#   {"return": true}                  {"assigns": name}
+#   {"mod_compare": [2, "Eq", 0]}
+#   {"all": [checks]}  {"any": [checks]}  {"not": check}
+#
+# A criterion may carry "tests" instead of "check": it then calls the
+# student's function (see FUNCTIONAL TESTS).
+#
+# compile_rubric() turns the spec into predicates over CodeFacts,
+# so grading is one traversal plus one lookup per criterion.
+# ============================================================
+RUBRIC_MARKER = '__RUBRIC__'
+
+
+def _check_function(spec):
+    name, params = spec['function'], spec.get('params')
+    return lambda facts: facts.has_function(name, params)
+
+
+def _check_node(spec):
+    kinds = spec['node']
+    kinds = (kinds,) if isinstance(kinds, str) else tuple(kinds)
+    return lambda facts: facts.has(*kinds)
+
+
+def _check_mod_compare(spec):
+    pattern = tuple(spec['mod_compare'])
+    return lambda facts: pattern in facts.mod_checks
+
+
+def _check_all(spec):
+    parts = [compile_check(part) for part in spec['all']]
+    return lambda facts: all(part(facts) for part in parts)
+
+
+def _check_any(spec):
+    parts = [compile_check(part) for part in spec['any']]
+    return lambda facts: any(part(facts) for part in parts)
+
+
+def _check_not(spec):
+    inner = compile_check(spec['not'])
+    return lambda facts: not inner(facts)
+
+
+_CHECK_COMPILERS = {
+    'function': _check_function,
+    'calls': lambda spec: (lambda facts, n=spec['calls']: facts.calls_name(n)),
+    'method': lambda spec: (lambda facts, n=spec['method']: facts.calls_method(n)),
+    'binop': lambda spec: (lambda facts, op=spec['binop']: facts.has_binop(op)),
+    'node': _check_node,
+    'loop': lambda spec: (lambda facts, want=bool(spec['loop']): facts.has_loop == want),
+    'return': lambda spec: (lambda facts, want=bool(spec['return']): facts.has_return == want),
+    'assigns': lambda spec: (lambda facts, n=spec['assigns']: facts.assigns_name(n)),
+    'mod_compare': _check_mod_compare,
+    'all': _check_all,
+    'any': _check_any,
+    'not': _check_not,
+}
+
+
+def compile_check(spec):
+    """Compile one check spec into a predicate `facts -> bool`."""
+    if not isinstance(spec, dict):
+        raise ValueError('rubric check must be an object, got %r' % (spec,))
+    kinds = [key for key in spec if key in _CHECK_COMPILERS]
+    if len(kinds) != 1:
+        raise ValueError('rubric check needs exactly one of %s: %r'
+                         % (sorted(_CHECK_COMPILERS), spec))
+    return _CHECK_COMPILERS[kinds[0]](spec)
+
+
+class CompiledRubric:
+    """A rubric spec compiled into predicates; grade() needs one analyze()."""
+
+    def __init__(self, spec):
+        criteria = spec.get('criteria')
+        if not criteria:
+            raise ValueError('rubric spec has no criteria')
+        self.criteria = []
+        self.has_tests = False
+        for criterion in criteria:
+            name = criterion['name']
+            if 'tests' in criterion:
+                self.has_tests = True
+                self.criteria.append((
+                    name,
+                    CompiledTests(criterion['tests']),
+                    criterion['points'],
+                    criterion.get('error', 'failed_' + name),
+                    None,
+                ))
+                continue
+            partial = [
+                (compile_check(p['check']), p['points'], p.get('error'))
+                for p in criterion.get('partial', ())
+            ]
+            self.criteria.append((
+                name,
+                compile_check(criterion['check']),
+                criterion['points'],
+                criterion.get('error', 'missing_' + name),
+                partial,
+            ))
+        self.max_score = spec.get('max_score', sum(c[2] for c in self.criteria))
+
+    def grade(self, source, namespace=None):
+        """
+        Grade `source`; returns the __RUBRIC__ payload dict. Rubrics with
+        functional tests also need `namespace`, where the program ran.
+        """
+        if self.has_tests and namespace is None:
+            raise ValueError('rubric has functional tests: pass the namespace the program ran in')
+        score = 0
+        breakdown = {}
+        errors = []
+        tests = {}
+        try:
+            facts = analyze(source)
+        except SyntaxError as e:
+            return {
+                "score": 0,
+                "max_score": self.max_score,
+                "breakdown": {c[0]: 0 for c in self.criteria},
+                "errors": ['Syntax error: %s' % e],
+            }
+
+        for name, check, points, error, partial in self.criteria:
+            if partial is None:
+                counts, failure = check.run(namespace)
+                tests[name] = counts
+                breakdown[name] = check.points(points, counts)
+                score += breakdown[name]
+                if counts['passed'] < counts['total']:
+                    errors.append('%s (%d/%d passed%s)' % (
+                        error, counts['passed'], counts['total'], '; ' + failure if failure else ''))
+                continue
+            if check(facts):
+                breakdown[name] = points
+                score += points
+                continue
+            awarded = 0
+            for partial_check, partial_points, partial_error in partial:
+                if partial_check(facts):
+                    awarded = partial_points
+                    errors.append(partial_error or error)
+                    break
+            else:
+                errors.append(error)
+            breakdown[name] = awarded
+            score += awarded
+
+        result = {
+            "score": score,
+            "max_score": self.max_score,
+            "breakdown": breakdown,
+            "errors": errors,
+        }
+        if tests:
+            result["tests"] = tests
+        return result
+
+
+RUBRIC_CACHE_SIZE = 256  # compiled specs kept by long-lived graders (pool, static service)
+
+
+@functools.lru_cache(maxsize=RUBRIC_CACHE_SIZE)
+def _compile_rubric_json(text):
+    return CompiledRubric(json.loads(text))
+
+
+def compile_rubric(spec):
+    """
+    Compile (and memoize the RUBRIC_CACHE_SIZE most recent) a rubric spec.
+    `spec` may be a dict or its JSON text; invalid specs raise ValueError
+    at compile time.
+    """
+    return _compile_rubric_json(spec if isinstance(spec, str) else json.dumps(spec, sort_keys=True))
+
+
+def emit_rubric(result, marker=RUBRIC_MARKER):
+    """Print the result in the format parseRubricOutput() expects."""
+    print(marker + json.dumps(result))
+
+
+def grade_rubric(spec, source, marker=RUBRIC_MARKER, namespace=None):
+    """Validation code for declarative questions: grade and emit in one call."""
+    result = compile_rubric(spec).grade(source, namespace)
+    emit_rubric(result, marker)
+    return result
+
+
+# ============================================================
+# FUNCTIONAL TESTS - call the student's function on many inputs
+# ============================================================
+# A rubric criterion with "tests" instead of "check":
+#
+#   {"name": "hasil", "points": 6, "tests": {
+#       "function": "tambah",
+#       "inputs": [[3, 5], [-1, 1], [0.1, 0.2]],    # argument lists
+#       "expected": [8, 0, 0.3],  # or computed from a reference solution
+#       "tolerance": 1e-9,      # floats: math.isclose, relative and absolute
+#       "time_limit": 1.0,      # seconds per case
+#       "max_failures": 3}}     # stop after that many failures (0 = never)
+#
+# Every case runs in the one grading execution, so hundreds of cases
+# cost one sandbox run. The criterion earns points * passed // total;
+# the payload's "tests" entry has the counts per criterion. The
+# program must have run, so validation passes its namespace:
+#   grade_rubric(spec, __STUDENT_CODE__, marker, globals())
+#
+# run_references() computes "expected" once, at exam save, by calling
+# the question's reference solution on the same inputs.
+# ============================================================
+TEST_TOLERANCE = 1e-9
+TEST_TIME_LIMIT = 1.0
+TEST_REPR_LIMIT = 80
+REFERENCE_MARKER = '__REFERENCE__'
+REFERENCE_FILENAME = '<reference>'
+
+
+class TestTimeLimitExceeded(BaseException):
+    """A test case ran past its time limit (raised from SIGALRM)."""
+
+
+def _on_test_alarm(signum, frame):
+    raise TestTimeLimitExceeded()
+
+
+class _CaseTimer:
+    """
+    Context manager for a run of test cases: installs the SIGALRM handler
+    (main thread only) and discards what the called code prints, bounded
+    by OUTPUT_BUDGET. call() runs one case under `time_limit` seconds.
+    """
+
+    def __init__(self, time_limit):
+        self.time_limit = time_limit
+        self.timed = bool(time_limit) and hasattr(signal, 'setitimer')
+        self._saved_handler = None
+        self._saved_streams = None
+
+    def __enter__(self):
+        if self.timed:
+            try:
+                self._saved_handler = signal.signal(signal.SIGALRM, _on_test_alarm)
+            except ValueError:
+                # Not the main thread: cases run without a time limit
+                self.timed = False
+        self._saved_streams = sys.stdout, sys.stderr
+        sys.stdout = sys.stderr = BoundedOutput(0, OUTPUT_BUDGET)
+        return self
+
+    def __exit__(self, *exc_info):
+        sys.stdout, sys.stderr = self._saved_streams
+        if self.timed:
+            signal.signal(signal.SIGALRM, self._saved_handler)
+        return False
+
+    def call(self, function, args):
+        if self.timed:
+            signal.setitimer(signal.ITIMER_REAL, self.time_limit)
+        try:
+            # A fresh copy: the spec is shared by every answer graded in this run
+            return function(*copy.deepcopy(args))
+        finally:
+            if self.timed:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _matches(actual, expected, tolerance):
+    """Does `actual` equal `expected` (from JSON: lists also match tuples, floats within tolerance)?"""
+    if isinstance(expected, list):
+        return (isinstance(actual, (list, tuple)) and len(actual) == len(expected)
+                and all(_matches(a, e, tolerance) for a, e in zip(actual, expected)))
+    if _is_number(expected) and _is_number(actual) and (isinstance(expected, float) or isinstance(actual, float)):
+        return math.isclose(actual, expected, rel_tol=tolerance, abs_tol=tolerance)
+    return actual == expected
+
+
+def _short(text):
+    return text if len(text) <= TEST_REPR_LIMIT else text[:TEST_REPR_LIMIT - 3] + '...'
+
+
+class CompiledTests:
+    """The "tests" of one rubric criterion, validated once per spec."""
+
+    def __init__(self, spec):
+        inputs, expected = spec.get('inputs'), spec.get('expected')
+        if not isinstance(inputs, list) or not isinstance(expected, list) or len(inputs) != len(expected):
+            raise ValueError('tests need "inputs" and "expected" lists of equal length')
+        if not inputs or not all(isinstance(args, list) for args in inputs):
+            raise ValueError('tests need at least one case, each input a list of arguments')
+        self.function = spec['function']
+        self.cases = list(zip(inputs, expected))
+        self.tolerance = spec.get('tolerance', TEST_TOLERANCE)
+        self.time_limit = spec.get('time_limit', TEST_TIME_LIMIT)
+        self.max_failures = spec.get('max_failures', 0)
+
+    def _describe(self, args):
+        return '%s(%s)' % (self.function, _short(', '.join(repr(arg) for arg in args)))
+
+    def run(self, namespace):
+        """
+        Call the student's function on every case. Returns the counts
+        {passed, failed, skipped, total} and the first failure, described
+        for the student (None if every case passed). Cases stopped by the
+        time limit or a limit of the whole run are also counted as
+        `limited` (only present when there are any): such a grade depends
+        on the machine, so it is not cached.
+        """
+        total = len(self.cases)
+        counts = {'passed': 0, 'failed': 0, 'skipped': 0, 'total': total}
+        function = namespace.get(self.function)
+        if not callable(function):
+            counts['failed'] = total
+            return counts, 'function %s is not defined' % self.function
+
+        first_failure = None
+        with _CaseTimer(self.time_limit) as timer:
+            for index, (args, expected) in enumerate(self.cases):
+                if self.max_failures and counts['failed'] >= self.max_failures:
+                    counts['skipped'] = total - index
+                    break
+                problem = None
+                try:
+                    actual = timer.call(function, args)
+                    if not _matches(actual, expected, self.tolerance):
+                        problem = 'returned %s, expected %s' % (_short(repr(actual)), _short(repr(expected)))
+                except TestTimeLimitExceeded:
+                    problem = 'took longer than %gs' % self.time_limit
+                    counts['limited'] = counts.get('limited', 0) + 1
+                except (Exception, SystemExit) as e:
+                    problem = 'raised %s: %s' % (type(e).__name__, _short(str(e)))
+                except (OutputLimitExceeded, StepBudgetExceeded, MemoryLimitExceeded) as e:
+                    # Limits of the whole grading run: no further case could pass
+                    counts['failed'] += 1
+                    counts['limited'] = counts.get('limited', 0) + 1
+                    counts['skipped'] = total - index - 1
+                    first_failure = first_failure or '%s stopped: %s' % (self._describe(args), e)
+                    break
+                if problem is None:
+                    counts['passed'] += 1
+                else:
+                    counts['failed'] += 1
+                    first_failure = first_failure or '%s %s' % (self._describe(args), problem)
+        return counts, first_failure
+
+    @staticmethod
+    def points(points, counts):
+        """Points earned: `points` in proportion to the cases passed, rounded down (scores are integers)."""
+        return points * counts['passed'] // counts['total']
+
+
+def _reference_outputs(namespace, tests):
+    """Expected values of one "tests" spec, computed by the reference solution in `namespace`."""
+    function = namespace.get(tests['function'])
+    if not callable(function):
+        raise ValueError('function %s is not defined' % tests['function'])
+    expected = []
+    with _CaseTimer(tests.get('time_limit', TEST_TIME_LIMIT)) as timer:
+        for args in tests['inputs']:
+            call = '%s(%s)' % (tests['function'], _short(', '.join(repr(arg) for arg in args)))
+            try:
+                value = timer.call(function, args)
+            except TestTimeLimitExceeded:
+                raise ValueError('%s took longer than %gs' % (call, timer.time_limit))
+            except (Exception, SystemExit) as e:
+                raise ValueError('%s raised %s: %s' % (call, type(e).__name__, _short(str(e))))
+            try:
+                expected.append(json.loads(json.dumps(value, allow_nan=False)))
+            except (TypeError, ValueError):
+                raise ValueError('%s returned %s, which is not JSON' % (call, _short(repr(value))))
+    return expected
+
+
+def run_references(jobs, marker=REFERENCE_MARKER):
+    """
+    Run each job's reference solution ({"code", "tests": [specs]}) once
+    and call it on every input of its tests specs; at exam save, so
+    grading compares against stored values and never runs the reference.
+    Writes one frame: per job {"expected": [values per spec]} or
+    {"error": "..."}.
+    """
+    results = []
+    for job in jobs:
+        namespace = fresh_namespace(job['code'])
+        try:
+            with _CaseTimer(0):
+                exec(compile(job['code'], REFERENCE_FILENAME, 'exec'), namespace)
+        except SyntaxError as e:
+            results.append({'error': 'line %s: %s' % (e.lineno, e.msg)})
+            continue
+        except (Exception, SystemExit, OutputLimitExceeded) as e:
+            results.append({'error': 'raised %s: %s' % (type(e).__name__, _short(str(e)))})
+            continue
+        try:
+            results.append({'expected': [_reference_outputs(namespace, tests) for tests in job['tests']]})
+        except ValueError as e:
+            results.append({'error': str(e)})
+    write_frame(marker, results)
+    return results
+
+
+# ============================================================
+# RESULT FRAMES - the grader's channel next to student output
+# ============================================================
+# A frame is one line:  <marker><length>:<json>
+# The JSON is ASCII (json.dumps default), so <length> counts bytes and
+# characters alike. A frame is only valid if exactly <length>
+# characters of JSON follow the header, and a whole-run result
+# (run_exam) only if its frame is the last line of stdout. finish()
+# ends the script right after it, so nothing can be printed later.
+
+def write_frame(marker, payload):
+    data = json.dumps(payload)
+    sys.stdout.write('%s%d:%s\n' % (marker, len(data), data))
+    sys.stdout.flush()
+
+
+def _frame_payload(line, marker):
+    if not line.startswith(marker):
+        return None
+    length, sep, data = line[len(marker):].partition(':')
+    if not sep or not length.isdigit() or len(data) != int(length):
+        return None
+    try:
+        return (json.loads(data),)
+    except ValueError:
+        return None
+
+
+def read_frames(text, marker):
+    """Payloads of every valid `marker` frame in `text`, in order."""
+    payloads = []
+    for line in text.splitlines():
+        frame = _frame_payload(line, marker)
+        if frame is not None:
+            payloads.append(frame[0])
+    return payloads
+
+
+def read_final_frame(text, marker):
+    """Payload of the `marker` frame that ends `text`, or None."""
+    lines = text.rstrip().splitlines()
+    frame = _frame_payload(lines[-1], marker) if lines else None
+    return frame[0] if frame is not None else None
+
+
+def finish(status=0):
+    """End the grading script now: student atexit handlers and threads cannot write after the results."""
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+    os._exit(status)
+
+
+# ============================================================
+# STATIC ANALYSIS - does validation need the program to run?
+# ============================================================
+
+# Calls that can reach the student's variables by name
+DYNAMIC_CALLS = frozenset(('dir', 'eval', 'exec', 'locals', 'vars'))
+# Ways to reach the namespace the student's program ran in without naming a variable
+INTROSPECTION_MODULES = frozenset(('inspect', 'gc'))
+INTROSPECTION_ATTRIBUTES = frozenset(('_getframe', 'f_back', 'f_globals', 'f_locals', 'f_builtins',
+                                      'tb_frame', 'gi_frame', 'cr_frame', 'ag_frame', '__globals__'))
+# Names every grading script defines next to the runtime's own
+SCRIPT_NAMES = frozenset(('__STUDENT_CODE__', '__QUESTION_ID__', '__name__', '__builtins__', 'base64'))
+
+_COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)
+
+
+def _position(node, end=False):
+    if end:
+        return (getattr(node, 'end_lineno', node.lineno), getattr(node, 'end_col_offset', node.col_offset))
+    return (node.lineno, node.col_offset)
+
+
+def _constant_name(node):
+    """'x' for the constant 'x' (also inside a Python 3.8 ast.Index)."""
+    node = getattr(node, 'value', node) if type(node).__name__ == 'Index' else node
+    return node.value if isinstance(node, ast.Constant) and isinstance(node.value, str) else None
+
+
+def _is_globals_call(node):
+    return (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+            and node.func.id == 'globals' and not node.args)
+
+
+def _scope_parts(node):
+    """(evaluated where `node` is defined, evaluated in its own scope)"""
+    if isinstance(node, ast.ClassDef):
+        return node.decorator_list + node.bases + node.keywords, node.body
+    args = node.args
+    outer = args.defaults + [default for default in args.kw_defaults if default is not None]
+    if isinstance(node, ast.Lambda):
+        return outer, [node.body]
+    every = getattr(args, 'posonlyargs', []) + args.args + args.kwonlyargs + [args.vararg, args.kwarg]
+    annotations = [arg.annotation for arg in every if arg is not None and arg.annotation is not None]
+    return node.decorator_list + outer + annotations + ([node.returns] if node.returns else []), node.body
+
+
+class _ValidationScan(ast.NodeVisitor):
+    """Collects the reasons a validation script depends on the executed program."""
+
+    def __init__(self, tree):
+        self.reasons = []
+        # Exactly what a batch namespace provides: other runtime globals are not there
+        self.known = set(dir(builtins)) | set(fresh_namespace(''))
+        self.module_bindings = {}   # name -> position of its first module-level binding
+        self.module_names = set()   # bound at module level anywhere, or declared global and bound in a function
+        self.scope_names = {}       # id(function/class/lambda) -> names bound in its own scope
+        self.global_names = {}      # id(function) -> names it declares global
+        self.scopes = []            # function/class/lambda nodes being visited, innermost last
+        self.comprehension_names = []
+        self.allowed_globals = set()  # globals() calls that only read SCRIPT_NAMES
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr == 'get' and _is_globals_call(node.func.value)
+                    and node.args and _constant_name(node.args[0]) in SCRIPT_NAMES):
+                self.allowed_globals.add(id(node.func.value))
+            elif (isinstance(node, ast.Subscript) and _is_globals_call(node.value)
+                  and _constant_name(node.slice) in SCRIPT_NAMES):
+                self.allowed_globals.add(id(node.value))
+        self._collect_bindings(tree, None)
+
+    def _reason(self, reason):
+        if reason not in self.reasons:
+            self.reasons.append(reason)
+
+    # --- where is each name bound? ---
+    def _bind(self, name, node, scope, end=False):
+        if scope is None:
+            self.module_bindings.setdefault(name, _position(node, end))
+            self.module_names.add(name)
+        elif name in self.global_names.get(id(scope), ()):
+            self.module_names.add(name)
+        else:
+            self.scope_names.setdefault(id(scope), set()).add(name)
+
+    def _collect_bindings(self, node, scope):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, _SCOPES):
+                if not isinstance(child, ast.Lambda):
+                    self._bind(child.name, child, scope)
+                outer, inner = _scope_parts(child)
+                for part in outer:
+                    self._collect_bindings(part, scope)
+                own = self.scope_names.setdefault(id(child), set())
+                if not isinstance(child, ast.ClassDef):
+                    args = child.args
+                    own.update(arg.arg for arg in getattr(args, 'posonlyargs', []) + args.args + args.kwonlyargs)
+                    own.update(arg.arg for arg in (args.vararg, args.kwarg) if arg is not None)
+                self._collect_bindings(ast.Module(body=inner, type_ignores=[]), child)
+                continue
+            if isinstance(child, ast.comprehension):
+                # Comprehension targets are local to the comprehension
+                for part in [child.iter] + child.ifs:
+                    self._collect_bindings(part, scope)
+                continue
+            self._bind_statement(child, scope)
+            self._collect_bindings(child, scope)
+
+    def _bind_statement(self, child, scope):
+        """Bind what `child` itself binds (not its children)."""
+        if isinstance(child, ast.Global) and scope is not None:
+            self.global_names.setdefault(id(scope), set()).update(child.names)
+        elif isinstance(child, (ast.Assign, ast.AugAssign, ast.AnnAssign, ast.NamedExpr)):
+            # The value is evaluated first: the name exists once the statement ends
+            targets = child.targets if isinstance(child, ast.Assign) else [child.target]
+            for target in targets:
+                for name in _target_names(target):
+                    self._bind(name, child, scope, end=True)
+        elif isinstance(child, ast.Name) and not isinstance(child.ctx, ast.Load):
+            self._bind(child.id, child, scope)
+        elif isinstance(child, (ast.Import, ast.ImportFrom)):
+            for alias in child.names:
+                self._bind((alias.asname or alias.name).split('.')[0], child, scope)
+        elif isinstance(child, ast.ExceptHandler) and child.name:
+            self._bind(child.name, child, scope)
+
+    # --- what does it read? ---
+    def _bound_in_scopes(self, name):
+        """Is `name` bound in the scope being visited or a function enclosing it?"""
+        for depth, scope in enumerate(reversed(self.scopes)):
+            # A class body's names are not visible in the functions it contains
+            if isinstance(scope, ast.ClassDef) and depth > 0:
+                continue
+            if name in self.global_names.get(id(scope), ()):
+                return name in self.module_names
+            if name in self.scope_names.get(id(scope), ()):
+                return True
+        return name in self.module_names
+
+    def _check_read(self, name, node):
+        if name == '__exec_error__':
+            self._reason('reads __exec_error__')
+        elif name in DYNAMIC_CALLS or name == 'globals':
+            self._reason('uses %s' % name)  # e.g. passed around instead of called
+        elif name in self.known or any(name in names for names in self.comprehension_names):
+            return
+        elif self.scopes:
+            if not self._bound_in_scopes(name):
+                self._reason('reads student variable %r' % name)
+        else:
+            bound_at = self.module_bindings.get(name)
+            if bound_at is None or bound_at >= _position(node):
+                self._reason('reads student variable %r' % name)
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self._check_read(node.id, node)
+
+    def visit_AugAssign(self, node):
+        if isinstance(node.target, ast.Name):
+            self._check_read(node.target.id, node)
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node):
+        if node.attr in INTROSPECTION_ATTRIBUTES:
+            self._reason('uses frame introspection (.%s)' % node.attr)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Name) and (func.id in DYNAMIC_CALLS or func.id == 'globals'):
+            if func.id in DYNAMIC_CALLS:
+                self._reason('calls %s()' % func.id)
+            elif id(node) not in self.allowed_globals:
+                self._reason('calls globals()')
+            for child in node.args + node.keywords:
+                self.visit(child)
+            return
+        self.generic_visit(node)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            if alias.name == '__main__':
+                self._reason('imports __main__')
+            elif alias.name.split('.')[0] in INTROSPECTION_MODULES:
+                self._reason('imports %s' % alias.name)
+
+    def visit_ImportFrom(self, node):
+        module = (node.module or '').split('.')[0]
+        if module == '__main__':
+            self._reason('imports __main__')
+        elif module in INTROSPECTION_MODULES:
+            self._reason('imports %s' % node.module)
+        elif any(alias.name in INTROSPECTION_ATTRIBUTES for alias in node.names):
+            self._reason('uses frame introspection (%s)' % ', '.join(alias.name for alias in node.names))
+
+    def _visit_scope(self, node):
+        outer, inner = _scope_parts(node)
+        for part in outer:
+            self.visit(part)
+        self.scopes.append(node)
+        for part in inner:
+            self.visit(part)
+        self.scopes.pop()
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = visit_ClassDef = _visit_scope
+
+    def _visit_comprehension(self, node):
+        names = set()
+        for generator in node.generators:
+            names.update(_target_names(generator.target))
+        self.comprehension_names.append(names)
+        self.generic_visit(node)
+        self.comprehension_names.pop()
+
+    visit_ListComp = visit_SetComp = visit_DictComp = visit_GeneratorExp = _visit_comprehension
+
+
+def classify_validation(source):
+    """
+    Does validation code need the student's program to have run?
+
+    Static validation only inspects the source (analyze(), grade_rubric()
+    on __STUDENT_CODE__), so graders may skip exec() of the student code.
+    It is dynamic when it reads a name it has not bound yet (a student
+    variable; names bound in a function only count in that function and
+    the functions nested in it), reads __exec_error__, calls dir()/eval()/
+    exec()/locals()/vars(), uses globals() for anything but the script's
+    own names, imports __main__, or introspects frames (inspect, gc,
+    sys._getframe, f_back/f_globals/f_locals, __globals__), which reach
+    the program's namespace without naming a variable.
+    Returns {'static': bool, 'reasons': [...]}.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        return {'static': False, 'reasons': ['syntax error: %s' % e]}
+    scan = _ValidationScan(tree)
+    scan.visit(tree)
+    return {'static': not scan.reasons, 'reasons': scan.reasons}
+
+
+# ============================================================
+# PRECOMPILED VALIDATION - compiled once, at exam save
+# ============================================================
+ARTIFACT_FORMAT = 1
+PREPARED_MARKER = '__PREPARED__'
+
+
+def _bytecode_magic():
+    from importlib.util import MAGIC_NUMBER
+    return MAGIC_NUMBER.hex()
+
+
+def compile_artifact(source):
+    """
+    Compile validation into a versioned artifact (raises SyntaxError).
+    Marshal data is only valid for the bytecode version that wrote it,
+    so the artifact records it; other interpreters recompile the source.
+    """
+    code = compile(source, '<validation>', 'exec')
+    return {
+        'format': ARTIFACT_FORMAT,
+        'magic': _bytecode_magic(),
+        'python': '%d.%d' % sys.version_info[:2],
+        'code': base64.b64encode(marshal.dumps(code)).decode('ascii'),
+    }
+
+
+def load_validation(source, artifact=None):
+    """Code object for validation: the artifact when it fits this interpreter, else compile(source)."""
+    if artifact and artifact.get('format') == ARTIFACT_FORMAT and artifact.get('magic') == _bytecode_magic():
+        try:
+            return marshal.loads(base64.b64decode(artifact['code']))
+        except (ValueError, EOFError, TypeError):
+            pass
+    return compile(source, '<validation>', 'exec')
+
+
+def prepare_validations(sources, marker=PREPARED_MARKER):
+    """
+    Exam save: classify and precompile every validation script and write
+    one frame. Each result is classify_validation() plus `artifact`, or
+    `error` ("line N: message") when the source does not compile.
+    """
+    results = []
+    for source in sources:
+        result = classify_validation(source)
+        try:
+            result['artifact'] = compile_artifact(source)
+        except SyntaxError as e:
+            result['error'] = 'line %s: %s' % (e.lineno, e.msg)
+        except ValueError as e:
+            result['error'] = str(e)
+        results.append(result)
+    write_frame(marker, results)
+    return results
+
+
+# ============================================================
+# BOUNDED OUTPUT - a ring buffer per stream, a byte budget per question
+# ============================================================
+OUTPUT_BUDGET = 1024 * 1024  # bytes a question may print before it is stopped
+OUTPUT_TAIL = 2048           # characters of student output kept in grading results
+RUN_OUTPUT_TAIL = 64 * 1024  # ... and shown by the Run button
+TRUNCATED_MARKER = '...[%d characters truncated]...\n'
+
+
+class OutputLimitExceeded(BaseException):
+    """
+    Printed more than the budget. A BaseException so that the student's
+    `except Exception:` cannot swallow it and keep printing.
+    """
+
+
+class BoundedOutput(io.TextIOBase):
+    """
+    Text stream that keeps only the last `tail` characters written (older
+    chunks are dropped as new ones arrive) and raises OutputLimitExceeded
+    once more than `budget` bytes were written in total (0 = unlimited).
+    """
+
+    def __init__(self, tail=OUTPUT_TAIL, budget=OUTPUT_BUDGET):
+        self.tail = tail
+        self.budget = budget
+        self.written = 0     # bytes (UTF-8) written in total
+        self.dropped = 0     # characters no longer kept
+        self.exceeded = False
+        self._chunks = collections.deque()
+        self._kept = 0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError('write() argument must be str, not %s' % type(text).__name__)
+        self.written += len(text) if text.isascii() else len(text.encode('utf-8', 'replace'))
+        if self.budget and self.written > self.budget:
+            self.exceeded = True
+            raise OutputLimitExceeded('output limit exceeded (%d bytes)' % self.budget)
+
+        if len(text) >= self.tail:
+            self.dropped += self._kept + len(text) - self.tail
+            self._chunks.clear()
+            text = text[len(text) - self.tail:] if self.tail else ''
+            self._kept = 0
+        self._chunks.append(text)
+        self._kept += len(text)
+        while self._kept - len(self._chunks[0]) >= self.tail and len(self._chunks) > 1:
+            oldest = self._chunks.popleft()
+            self._kept -= len(oldest)
+            self.dropped += len(oldest)
+        return len(text)
+
+    def getvalue(self):
+        """The kept output, at most `tail` characters, after a truncation marker if any was dropped."""
+        data = ''.join(self._chunks)
+        extra = len(data) - self.tail
+        if extra > 0:
+            data = data[extra:]
+        dropped = self.dropped + max(extra, 0)
+        return (TRUNCATED_MARKER % dropped + data) if dropped else data
+
+
+def run_student_program(code, namespace, budget=OUTPUT_BUDGET, tail=RUN_OUTPUT_TAIL):
+    """
+    exec() the student's program with bounded output, then print what was
+    kept (Run button script). Returns the error text for __exec_error__, or
+    None. SystemExit propagates like it would from a plain exec().
+    """
+    stdout, stderr = BoundedOutput(tail, budget), BoundedOutput(tail, budget)
+    saved = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        exec(code, namespace)
+    except (Exception, OutputLimitExceeded) as e:
+        return str(e)
+    finally:
+        sys.stdout, sys.stderr = saved
+        sys.stdout.write(stdout.getvalue())
+        sys.stderr.write(stderr.getvalue())
+    return None
+
+
+# ============================================================
+# STEP BUDGET AND MEMORY - stop runaway student code deterministically
+# ============================================================
+STUDENT_FILENAME = '<student>'
+
+
+class StepBudgetExceeded(BaseException):
+    """Student code ran more lines than allowed (BaseException, like OutputLimitExceeded)."""
+
+
+class MemoryLimitExceeded(BaseException):
+    """Student code holds more traced memory than allowed."""
+
+
+class StudentTracer:
+    """
+    Context manager tracing frames of student code (compiled as
+    STUDENT_FILENAME) line by line:
+
+    - `step_limit`: raise StepBudgetExceeded on the line after that many.
+      The count does not depend on machine speed, so a program stops at
+      the same point on every run, in milliseconds instead of at the
+      sandbox's time limit.
+    - `memory_limit`: raise MemoryLimitExceeded once memory traced by
+      tracemalloc (see PeakMemory) exceeds that many bytes.
+
+    sys.settrace (not sys.monitoring) keeps this working on Judge0's
+    Python 3.8. Only student frames pay for line tracing; code the student
+    builds with exec()/eval() is not counted. Threads the student starts
+    are traced too. While tracing, sys.settrace and threading.settrace
+    refuse to run, and a tracer that is gone at exit anyway (with no limit
+    hit) raises the limit's exception: a limit that could not be checked
+    counts as exceeded.
+    """
+
+    def __init__(self, step_limit=None, memory_limit=None):
+        self.step_limit = step_limit
+        self.memory_limit = memory_limit
+        self.steps = 0
+        self.steps_exceeded = False
+        self.memory_exceeded = False
+        self._saved = None
+        self._trace = None
+
+    def _on_call(self, frame, event, arg):
+        return self._on_line if frame.f_code.co_filename == STUDENT_FILENAME else None
+
+    def _on_line(self, frame, event, arg):
+        if event == 'line':
+            self.steps += 1
+            if self.step_limit and self.steps > self.step_limit:
+                self.steps_exceeded = True
+                raise StepBudgetExceeded('step budget exceeded (%d steps)' % self.step_limit)
+            if self.memory_limit and tracemalloc.get_traced_memory()[0] > self.memory_limit:
+                self.memory_exceeded = True
+                raise MemoryLimitExceeded('memory limit exceeded (%d bytes)' % self.memory_limit)
+        return self._on_line
+
+    def __enter__(self):
+        if self.step_limit or self.memory_limit:
+            self._saved = sys.gettrace(), threading._trace_hook
+            self._trace = self._on_call  # one bound method, so `is` finds it again
+            _settrace(self._trace)
+            _threading_settrace(self._trace)
+            sys.settrace, threading.settrace = _guarded_settrace(self._trace), _guarded_settrace(None)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not (self.step_limit or self.memory_limit):
+            return False
+        # A trace function that raised (a limit was hit) is unset by Python itself
+        removed = sys.gettrace() is not self._trace and not (self.steps_exceeded or self.memory_exceeded)
+        sys.settrace, threading.settrace = _settrace, _threading_settrace
+        _settrace(self._saved[0])
+        _threading_settrace(self._saved[1])
+        if removed:
+            if self.step_limit:
+                self.steps_exceeded, error = True, StepBudgetExceeded
+            else:
+                self.memory_exceeded, error = True, MemoryLimitExceeded
+            if exc_type is None or issubclass(exc_type, (Exception, SystemExit)):
+                raise error('limits not checked: the tracer was removed')
+        return False
+
+
+_settrace, _threading_settrace = sys.settrace, threading.settrace
+
+
+def _guarded_settrace(allowed):
+    """settrace() while StudentTracer runs: only (re)installs `allowed`, as new threads do."""
+    def settrace(function):
+        if function is None or function is not allowed:
+            raise RuntimeError('settrace() is not available while the step budget is checked')
+        _settrace(function)
+    return settrace
+
+
+class PeakMemory:
+    """
+    Context manager measuring the peak memory allocated inside it with
+    tracemalloc (`peak`, bytes). `peak` stays None when another tool is
+    already tracing and this Python cannot reset the peak (3.8).
+    """
+
+    def __init__(self):
+        self.peak = None
+        self._owned = False
+        self._baseline = 0
+
+    def __enter__(self):
+        self._owned = not tracemalloc.is_tracing()
+        if self._owned:
+            tracemalloc.start()
+        elif hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        else:
+            return self
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._owned or hasattr(tracemalloc, 'reset_peak'):
+            self.peak = max(tracemalloc.get_traced_memory()[1] - self._baseline, 0)
+        if self._owned:
+            tracemalloc.stop()
+        return False
+
+
+# ============================================================
+# PHASE TIMINGS - where a grade's time goes
+# ============================================================
+# `timings` in every result, milliseconds from time.perf_counter()
+# (monotonic):
+#   decode      base64 + JSON of the script's payload
+#   load        compiling validation (or loading its artifact)
+#   student     running the student's program
+#   parse       analyze(): ast.parse + fact table of the student code
+#   validation  the rest of validation
+#   total       the whole question
+# decode and a shared load happen once per script; each result of a
+# batch gets an equal share, so timings still add up across results.
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def decode_payload(encoded):
+    """The JSON payload embedded (base64) in a grading script, timed as 'decode'."""
+    started = time.perf_counter()
+    payload = json.loads(base64.b64decode(encoded).decode('utf-8'))
+    _PHASE_SECONDS['decode'] = _PHASE_SECONDS.get('decode', 0.0) + time.perf_counter() - started
+    return payload
+
+
+def _share(results, phase, seconds):
+    """Spread a once-per-script phase over a batch's results."""
+    if results and seconds:
+        share = _ms(seconds / len(results))
+        for result in results:
+            timings = result['timings']
+            timings[phase] = timings.get(phase, 0) + share
+            timings['total'] = round(timings['total'] + share, 3)
+
+
+# ============================================================
+# BATCH MODE - whole exam in one execution
+# ============================================================
+BATCH_MARKER = '__BATCH__'
+
+# Names validation code can rely on, copied into every namespace
+RUNTIME_EXPORTS = (
+    'ast', 'base64', 'json', 'CodeFacts', 'analyze',
+    'compile_rubric', 'emit_rubric', 'grade_rubric',
+)
+
+
+def fresh_namespace(student_code, question_id=''):
+    """Globals for one question: same names the single-question script sees."""
+    runtime_globals = globals()
+    namespace = {name: runtime_globals[name] for name in RUNTIME_EXPORTS}
+    namespace.update({
+        '__name__': '__main__',
+        '__builtins__': builtins,
+        '__STUDENT_CODE__': student_code,
+        '__QUESTION_ID__': question_id,
+        '__exec_error__': None,
+    })
+    return namespace
+
+
+def run_question(job):
+    """
+    Run one {id, code, validation} job in an isolated namespace.
+    `validation` may be source text (with an optional precompiled
+    `artifact`) or an already compiled code object.
+
+    Mirrors the single-question script: student code runs first and
+    its exception is stored in __exec_error__, then validation runs in
+    the same namespace. With `static` set (see classify_validation())
+    the student code is not executed at all. `ok` is False when
+    validation itself raised (Judge0 would report a runtime error).
+
+    `stdout`/`stderr` hold what validation printed. What the student's
+    program prints while it runs is captured apart: `output` keeps its
+    last OUTPUT_TAIL characters, so it can neither fake a __RUBRIC__
+    line nor bloat the results. Each stream may print `output_budget`
+    bytes (default OUTPUT_BUDGET); past that the student program is
+    stopped (__exec_error__ says so, `output_exceeded` is set) or, for
+    validation, the question fails. `timings` is described under
+    PHASE TIMINGS.
+
+    With `step_budget` set, student code may execute that many lines
+    while the program runs, and as many again when validation calls into
+    it (see StudentTracer). Past that it is stopped like an output overrun:
+    __exec_error__ (or a failed question) and `step_budget_exceeded`.
+
+    `peak_memory` is the peak allocation (bytes) while the program ran,
+    None for static grading. With `memory_limit` set (bytes) the program
+    is stopped once it holds more; `memory_exceeded` is then set.
+    """
+    started = time.perf_counter()
+    namespace = fresh_namespace(job['code'], job.get('id', ''))
+    validation = job['validation']
+    if isinstance(validation, str):
+        validation = load_validation(validation, job.get('artifact'))
+    loaded = time.perf_counter()
+    budget = job.get('output_budget') or OUTPUT_BUDGET
+    student = BoundedOutput(OUTPUT_TAIL, budget)
+    stdout, stderr = BoundedOutput(RUN_OUTPUT_TAIL, budget), BoundedOutput(RUN_OUTPUT_TAIL, budget)
+    saved = sys.stdout, sys.stderr
+    ok = True
+    student_done = loaded
+    _PHASE_SECONDS['parse'] = 0.0
+    student_trace = validation_trace = StudentTracer()
+    memory = PeakMemory()
+    try:
+        if not job.get('static'):
+            sys.stdout = sys.stderr = student
+            student_trace = StudentTracer(job.get('step_budget'), job.get('memory_limit'))
+            try:
+                with memory, student_trace:
+                    exec(compile(job['code'], STUDENT_FILENAME, 'exec'), namespace)
+            except (Exception, SystemExit, OutputLimitExceeded, StepBudgetExceeded, MemoryLimitExceeded) as e:
+                namespace['__exec_error__'] = str(e)
+            student_done = time.perf_counter()
+        sys.stdout, sys.stderr = stdout, stderr
+        validation_trace = StudentTracer(job.get('step_budget'))
+        try:
+            with validation_trace:
+                exec(validation, namespace)
+        except (Exception, SystemExit):
+            ok = False
+            try:
+                traceback.print_exc()
+            except OutputLimitExceeded:
+                pass
+        except (OutputLimitExceeded, StepBudgetExceeded):
+            ok = False
+    finally:
+        sys.stdout, sys.stderr = saved
+    finished = time.perf_counter()
+    parse = _PHASE_SECONDS.pop('parse', 0.0)
+    errors = stderr.getvalue()
+    if stdout.exceeded or stderr.exceeded:
+        errors += 'validation output limit exceeded (%d bytes)\n' % budget
+    if validation_trace.steps_exceeded:
+        errors += 'step budget exceeded in student code called by validation (%d steps)\n' % job['step_budget']
+    return {
+        'id': job.get('id', ''),
+        'ok': ok,
+        'stdout': stdout.getvalue(),
+        'stderr': errors,
+        'output': student.getvalue(),
+        'output_exceeded': student.exceeded,
+        'step_budget_exceeded': student_trace.steps_exceeded or validation_trace.steps_exceeded,
+        'peak_memory': memory.peak,
+        'memory_exceeded': student_trace.memory_exceeded,
+        'timings': {
+            'load': _ms(loaded - started),
+            'student': _ms(student_done - loaded),
+            'parse': _ms(parse),
+            'validation': _ms(max(finished - student_done - parse, 0.0)),
+            'total': _ms(finished - started),
+        },
+    }
+
+
+def run_exam(jobs, marker=BATCH_MARKER):
+    """Grade every job and write the per-question results as one frame."""
+    results = [run_question(job) for job in jobs]
+    _share(results, 'decode', _PHASE_SECONDS.pop('decode', 0.0))
+    write_frame(marker, results)
+    return results
+
+
+# ============================================================
+# BATCH MODE - one question, many students
+# ============================================================
+RESULT_MARKER = '__RESULT__'
+
+
+class _InterpreterState:
+    """
+    What one answer in a student batch could change for the next: the
+    modules (sys.modules and every module's globals, builtins and this
+    runtime's included), sys.path and the recursion limit. Module globals
+    are compared by identity, so no student object's __eq__ runs.
+    """
+
+    def __init__(self):
+        self.modules = dict(sys.modules)
+        namespaces = {id(vars(module)): vars(module) for module in self.modules.values()
+                      if isinstance(getattr(module, '__dict__', None), dict)}
+        namespaces.setdefault(id(globals()), globals())  # the runtime need not be a module
+        self.namespaces = [(namespace, dict(namespace)) for namespace in namespaces.values()]
+        self.path = list(sys.path)
+        self.recursion_limit = sys.getrecursionlimit()
+
+    def restore(self):
+        for namespace, saved in self.namespaces:
+            if len(namespace) != len(saved) or any(namespace.get(name, saved) is not value
+                                                   for name, value in saved.items()):
+                namespace.clear()
+                namespace.update(saved)
+        for name in [name for name in sys.modules if name not in self.modules]:
+            del sys.modules[name]
+        sys.modules.update(self.modules)
+        sys.path[:] = self.path
+        sys.setrecursionlimit(self.recursion_limit)
+
+
+def run_students(validation, answers, question_id='', marker=RESULT_MARKER, static=False, artifact=None,
+                 output_budget=None, step_budget=None, memory_limit=None):
+    """
+    Grade [{key, code}, ...] against one validation script.
+
+    Validation is compiled (or loaded from `artifact`) once; each answer
+    runs in a fresh namespace, and the interpreter state it changed is
+    put back before the next one (see _InterpreterState). Callers pass
+    the answers as arguments, never in globals, where an answer could
+    read the others.
+    Results are streamed (one frame per student, flushed) so answers
+    graded before a timeout are not lost.
+    """
+    started = time.perf_counter()
+    compiled = load_validation(validation, artifact)
+    # Per-script work, shared by every answer (each frame leaves before the next answer runs)
+    count = max(len(answers), 1)
+    decode, load = _PHASE_SECONDS.pop('decode', 0.0) / count, (time.perf_counter() - started) / count
+    for answer in answers:
+        state = _InterpreterState()
+        try:
+            result = run_question({'id': question_id, 'code': answer['code'], 'validation': compiled,
+                                   'static': static, 'output_budget': output_budget,
+                                   'step_budget': step_budget, 'memory_limit': memory_limit})
+        finally:
+            state.restore()
+        result['key'] = answer['key']
+        _share([result], 'decode', decode)
+        _share([result], 'load', load)
+        write_frame(marker, result)
+
@@ -0,0 +1,187 @@
+"""
+Pre-publish self-test: grade known answers to every question of an exam.
+
+Each question's validation runs, as the app would grade it (see
+grader/questions.py), against answers whose outcome is known:
+
+  - correct answers must earn full points,
+  - wrong answers, the question's starter code and an empty answer must not,
+  - validation must not crash (a rubric that raises, a syntax error).
+
+A question failing any of these has a broken rubric and the exam should
+not be published. Like the app at exam save, functional tests without
+`expected` first get it from the question's referenceSolution
+(fill_expected_outputs()); a reference that fails breaks its question. Questions without a known correct answer are reported
+as untested. Cases run in parallel on a process pool, each in the local
+sandbox (grader/executor.py).
+
+    results = self_test(questions, correct={qid: code}, wrong={qid: [code, ...]})
+    print(format_report(results))
+    if broken(results): ...
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Union
+
+from .executor import ExecutionLimits, run_source
+from .questions import (BATCH_MARKER, exam_script, fill_expected_outputs, grade_result, grading_job, grading_type,
+                        run_failure_grade)
+from .runtime import read_final_frame
+
+Answers = Dict[str, Union[str, List[str]]]
+
+CORRECT, WRONG = 'correct', 'wrong'
+
+
+# ============================================================
+# CASES
+# ============================================================
+
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def question_cases(question: Dict, correct: Answers, wrong: Answers) -> List[Dict]:
+    """The (label, kind, code) cases one question is graded with."""
+    qid = question['id']
+    cases = [{'label': 'correct' if i == 0 else 'correct #%d' % (i + 1), 'kind': CORRECT, 'code': code}
+             for i, code in enumerate(_as_list(correct.get(qid)) or _as_list(question.get('referenceSolution')))]
+    cases += [{'label': 'wrong' if i == 0 else 'wrong #%d' % (i + 1), 'kind': WRONG, 'code': code}
+              for i, code in enumerate(_as_list(wrong.get(qid)))]
+    if (question.get('initialCode') or '').strip():
+        cases.append({'label': 'starter code', 'kind': WRONG, 'code': question['initialCode']})
+    cases.append({'label': 'empty', 'kind': WRONG, 'code': ''})
+    return cases
+
+
+def _validation_crash(question: Dict, output: Dict) -> Optional[str]:
+    """
+    The exception validation raised, if that is a bug in the validation.
+    Assertion validation raising on a wrong answer (AssertionError, a
+    NameError for a missing variable) is how it fails; a rubric never raises.
+    """
+    if output['ok']:
+        return None
+    lines = [line for line in (output.get('stderr') or '').splitlines() if line.strip()]
+    last = lines[-1].strip() if lines else 'validation failed'
+    if grading_type(question) == 'rubric' or last.startswith(('SyntaxError', 'IndentationError')):
+        return last
+    return None
+
+
+def run_case(task) -> Dict:
+    """Worker: grade one answer to one question."""
+    question, case, limits = task
+    job = grading_job(question, case['code'])
+    started = time.perf_counter()
+    execution = run_source(exam_script([job]), '', limits)
+    elapsed = time.perf_counter() - started
+    crash = None
+    if execution['status']['id'] != 3:
+        grade = run_failure_grade(question, execution)
+        # Student exceptions are caught in run_question(): a traceback here is the grading script dying
+        if 'Traceback' in (execution.get('stderr') or ''):
+            crash = execution['stderr'].strip().splitlines()[-1]
+    else:
+        outputs = read_final_frame(execution.get('stdout') or '', BATCH_MARKER)
+        if not isinstance(outputs, list) or len(outputs) != 1:
+            grade = {'score': 0, 'maxScore': question['points'], 'errors': ['Grading produced no result'],
+                     'status': 'error'}
+            crash = (execution.get('stderr') or 'grading produced no result').strip().splitlines()[-1]
+        else:
+            grade = grade_result(question, outputs[0], execution.get('memory'))
+            crash = _validation_crash(question, outputs[0])
+    return {
+        'label': case['label'],
+        'kind': case['kind'],
+        'score': grade['score'],
+        'maxScore': grade['maxScore'],
+        'status': grade['status'],
+        'errors': grade['errors'],
+        'crash': crash,
+        'ms': round(elapsed * 1000, 1),
+    }
+
+
+# ============================================================
+# VERDICTS
+# ============================================================
+
+def _problems(question: Dict, cases: List[Dict]) -> List[str]:
+    problems = []
+    for case in cases:
+        score = '%g/%g' % (case['score'], case['maxScore'])
+        if case['crash']:
+            problems.append('validation crashed on the %s answer: %s' % (case['label'], case['crash']))
+        elif case['status'] == 'timeout':
+            problems.append('the %s answer timed out' % case['label'])
+        elif case['kind'] == CORRECT and case['score'] < case['maxScore']:
+            problems.append('the %s answer scored %s (%s)' % (case['label'], score, ', '.join(case['errors'])))
+        elif case['kind'] == WRONG and case['maxScore'] and case['score'] >= case['maxScore']:
+            problems.append('the %s answer scored full points (%s)' % (case['label'], score))
+    mismatched = {c['maxScore'] for c in cases if c['status'] == 'graded'} - {question['points']}
+    if mismatched:
+        problems.append('rubric max score %s does not match the question points (%s)'
+                        % (', '.join('%g' % m for m in sorted(mismatched)), question['points']))
+    return problems
+
+
+def self_test(questions: List[Dict], correct: Optional[Answers] = None, wrong: Optional[Answers] = None,
+              workers: Optional[int] = None, limits: Optional[ExecutionLimits] = None) -> List[Dict]:
+    """
+    Grade every question against its known answers; one result per question:
+    {id, status: 'ok' | 'broken' | 'untested' | 'skipped', problems, cases}.
+    """
+    correct, wrong = correct or {}, wrong or {}
+    limits = limits or ExecutionLimits()
+    questions, unprepared = fill_expected_outputs(questions, limits)
+    tasks, owners = [], []
+    for index, question in enumerate(questions):
+        if question['id'] in unprepared or grading_job(question, '') is None:
+            continue
+        for case in question_cases(question, correct, wrong):
+            tasks.append((question, case, limits))
+            owners.append(index)
+
+    cases = [[] for _ in questions]
+    if tasks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for index, case in zip(owners, pool.map(run_case, tasks)):
+                cases[index].append(case)
+
+    results = []
+    for question, graded in zip(questions, cases):
+        if question['id'] in unprepared:
+            status, problems = 'broken', [unprepared[question['id']]]
+        elif not graded:
+            status, problems = 'skipped', ['no validation code']
+        else:
+            problems = _problems(question, graded)
+            status = 'broken' if problems else \
+                'ok' if any(c['kind'] == CORRECT for c in graded) else 'untested'
+            if status == 'untested':
+                problems = ['no known correct answer']
+        results.append({'id': question['id'], 'status': status, 'problems': problems, 'cases': graded})
+    return results
+
+
+def broken(results: List[Dict]) -> List[str]:
+    return [result['id'] for result in results if result['status'] == 'broken']
+
+
+def format_report(results: List[Dict]) -> str:
+    icons = {'ok': '✅', 'broken': '❌', 'untested': '⚠️', 'skipped': '➖'}
+    lines = []
+    for result in results:
+        scores = ', '.join('%s %g/%g' % (c['label'], c['score'], c['maxScore']) for c in result['cases'])
+        slowest = max((c['ms'] for c in result['cases']), default=0.0)
+        lines.append('%s %-8s %s%s' % (icons[result['status']], result['id'], scores,
+                                        '  (slowest %.0f ms)' % slowest if result['cases'] else ''))
+        lines.extend('      ' + problem for problem in result['problems'])
+    counts = {status: sum(r['status'] == status for r in results) for status in icons}
+    lines.append('%d ok, %d broken, %d untested, %d skipped'
+                 % (counts['ok'], counts['broken'], counts['untested'], counts['skipped']))
+    return '\n'.join(lines)
@@ -0,0 +1,232 @@
+"""
+Static grading service: grades AST-only questions without a sandbox.
+
+Static validation (see classify_validation() in runtime.py) never runs
+the student's program, it only parses it, so there is nothing to
+isolate and no reason to pay for a Judge0 round trip.
+
+    python -m grader.static_service --port 2359 --workers 4
+    STATIC_GRADER_URL=http://127.0.0.1:2359 npm run dev
+
+    POST /grade  {"jobs": [{"id", "code", "validation"}, ...]}
+              -> {"results": [{"id", "ok", "stdout", "stderr"} | {"id", "error"}, ...]}
+    POST /keys   {"answers": [{"code", "rubric"?}, ...]}
+              -> {"keys": ["ast:<fingerprint>" | "raw:<sha256>", ...]}
+    GET  /health
+
+Each result is exactly what run_exam() reports per question, so the
+caller parses the same __RUBRIC__ line it would get from Judge0. Jobs
+come back with `error` instead when they cannot be graded here
+(dynamic validation, per-job time limit, worker crash); the caller
+sends those to Judge0.
+
+/keys gives the grade cache key of each answer (canonical.cache_key()),
+so answers to a declarative rubric that differ only in formatting share
+one cached grade (src/lib/gradeCache.ts). An answer whose key takes
+longer than the job timeout gets its raw hash.
+
+Parsing is CPU-bound, so jobs run on a process pool. Every worker
+keeps its compiled validations (and the runtime's compiled rubrics) in
+memory, so an exam's rubrics are compiled once per worker, not per
+grade. Validation code is executed: bind to localhost only.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import resource
+import signal
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List
+
+from . import runtime
+from .canonical import cache_key, raw_key
+from .httpd import HTTPError, Request, Router, start_server
+
+MAX_CACHED_VALIDATIONS = 1024
+
+
+# ============================================================
+# WORKER PROCESS
+# ============================================================
+
+class _JobTimeout(BaseException):
+    """Raised by SIGALRM; a BaseException so run_question() does not swallow it."""
+
+
+_validations: 'OrderedDict[str, object]' = OrderedDict()
+
+
+def _on_alarm(signum, frame):
+    raise _JobTimeout()
+
+
+def _init_worker(memory_mb: int) -> None:
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+
+def _compiled(validation: str):
+    """(code object, None) for static validation, (None, reason) otherwise."""
+    key = hashlib.sha256(validation.encode('utf-8')).hexdigest()
+    entry = _validations.get(key)
+    if entry is None:
+        verdict = runtime.classify_validation(validation)
+        if verdict['static']:
+            entry = (compile(validation, '<validation>', 'exec'), None)
+        else:
+            entry = (None, 'dynamic validation: ' + '; '.join(verdict['reasons']))
+        _validations[key] = entry
+        while len(_validations) > MAX_CACHED_VALIDATIONS:
+            _validations.popitem(last=False)
+    else:
+        _validations.move_to_end(key)
+    return entry
+
+
+def grade_job(job: Dict, timeout: float) -> Dict:
+    """Grade one job in this worker (static mode: the student code is parsed, never run)."""
+    job_id = job.get('id', '')
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        code, reason = _compiled(job['validation'])
+        if code is None:
+            return {'id': job_id, 'error': reason}
+        return runtime.run_question({'id': job_id, 'code': job['code'], 'validation': code, 'static': True})
+    except _JobTimeout:
+        return {'id': job_id, 'error': 'time limit exceeded'}
+    except (SyntaxError, RecursionError, MemoryError) as e:
+        return {'id': job_id, 'error': '%s: %s' % (type(e).__name__, e)}
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def answer_key(answer: Dict, timeout: float) -> str:
+    """Grade cache key of one answer in this worker (raw hash if it takes too long)."""
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return cache_key(answer['code'], answer.get('rubric'))
+    except _JobTimeout:
+        return raw_key(answer['code'])
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# ============================================================
+# SERVICE
+# ============================================================
+
+class StaticGrader:
+    """Process pool plus the per-job limits applied in the workers."""
+
+    def __init__(self, workers: int, job_timeout: float = 2.0, memory_mb: int = 512):
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self.memory_mb = memory_mb
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(self.memory_mb,))
+
+    async def grade(self, jobs: List[Dict]) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(self._pool, grade_job, job, self.job_timeout) for job in jobs]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        if any(isinstance(result, BrokenProcessPool) for result in results):
+            # A worker died (e.g. killed by the memory limit): start a fresh pool
+            self._pool.shutdown(wait=False)
+            self._pool = self._new_pool()
+        return [
+            result if isinstance(result, dict)
+            else {'id': job.get('id', ''), 'error': '%s: %s' % (type(result).__name__, result)}
+            for job, result in zip(jobs, results)
+        ]
+
+    async def keys(self, answers: List[Dict]) -> List[str]:
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(self._pool, answer_key, answer, self.job_timeout) for answer in answers]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        if any(isinstance(result, BrokenProcessPool) for result in results):
+            self._pool.shutdown(wait=False)
+            self._pool = self._new_pool()
+        return [result if isinstance(result, str) else raw_key(answer['code'])
+                for answer, result in zip(answers, results)]
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+def _parse_jobs(body) -> List[Dict]:
+    jobs = body.get('jobs') if isinstance(body, dict) else None
+    if not isinstance(jobs, list):
+        raise HTTPError(422, 'jobs must be a list')
+    for job in jobs:
+        if not isinstance(job, dict) or not isinstance(job.get('code'), str) \
+                or not isinstance(job.get('validation'), str):
+            raise HTTPError(422, 'every job needs string code and validation')
+    return jobs
+
+
+def _parse_answers(body) -> List[Dict]:
+    answers = body.get('answers') if isinstance(body, dict) else None
+    if not isinstance(answers, list):
+        raise HTTPError(422, 'answers must be a list')
+    for answer in answers:
+        if not isinstance(answer, dict) or not isinstance(answer.get('code'), str) \
+                or not isinstance(answer.get('rubric'), (dict, type(None))):
+            raise HTTPError(422, 'every answer needs string code and an optional rubric object')
+    return answers
+
+
+def build_router(grader: StaticGrader) -> Router:
+    router = Router()
+
+    async def grade(request: Request):
+        return 200, {'results': await grader.grade(_parse_jobs(request.json()))}
+
+    async def keys(request: Request):
+        return 200, {'keys': await grader.keys(_parse_answers(request.json()))}
+
+    async def health(request: Request):
+        return 200, {'status': 'ok', 'workers': grader.workers, 'job_timeout': grader.job_timeout}
+
+    router.add('POST', '/grade', grade)
+    router.add('POST', '/keys', keys)
+    router.add('GET', '/health', health)
+    return router
+
+
+async def serve(host: str, port: int, grader: StaticGrader) -> None:
+    server = await start_server(build_router(grader), host, port)
+    print(f"[grader.static_service] static grading on http://{host}:{port} "
+          f"({grader.workers} workers, {grader.job_timeout}s per job)")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Static (AST-only) grading service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2359)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--job-timeout', type=float, default=2.0, help='seconds per graded answer')
+    parser.add_argument('--memory-mb', type=int, default=512, help='address space cap per worker')
+    args = parser.parse_args(argv)
+
+    grader = StaticGrader(args.workers, args.job_timeout, args.memory_mb)
+    try:
+        asyncio.run(serve(args.host, args.port, grader))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        grader.shutdown()
+
+
+if __name__ == '__main__':
+    main()
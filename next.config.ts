@@ -3,6 +3,10 @@ import type { NextConfig } from "next";
 const nextConfig: NextConfig = {
   // Prevent Next.js from trying to bundle 'pg', which causes crashes
   serverExternalPackages: ["pg"],
+  // Grading runtime is read from disk at request time (src/lib/gradingRuntime.ts)
+  outputFileTracingIncludes: {
+    "/api/**/*": ["./grader/**/*.py"],
+  },
 };
 
 export default nextConfig;
@@ -1,35 +1,26 @@
 """
 Script to create Alpro Exam with 10 questions via API
 """
-import requests
 import json
+import os
+import sys
 
-BASE_URL = "http://localhost:3000"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Validation code template - each question has its own validation
-def make_validation(qid, checks):
-    """Generate validation code for a specific question"""
-    return f'''import ast, json
+from grader.questions import standalone_validation
 
-score = 0
-breakdown = {{}}
-errors = []
+BASE_URL = "http://localhost:3000"
 
-try:
-    tree = ast.parse(__STUDENT_CODE__)
-    
-{checks}
+# Rubric helpers - each question stores its rubric as data; the grading
+# runtime (grader/runtime.py) compiles it and emits the __RUBRIC__ result
+def criterion(name, points, check, error):
+    """One rubric criterion: `points` if `check` holds, else `error`"""
+    return {"name": name, "points": points, "check": check, "error": error}
 
-except SyntaxError as e:
-    errors.append(f'Syntax error: {{e}}')
 
-print('__RUBRIC__' + json.dumps({{
-    "score": score,
-    "max_score": 10,
-    "breakdown": breakdown,
-    "errors": errors
-}}))
-'''
+def rubric(*criteria, max_score=10):
+    """Declarative rubric spec (see grader/runtime.py for check kinds)"""
+    return {"max_score": max_score, "criteria": list(criteria)}
 
 # Question definitions
 QUESTIONS = [
@@ -46,55 +37,11 @@ print_pesan("Halo Dunia")
 # Output: Halo Dunia
 ```""",
         "initialCode": "# Buat fungsi print_pesan di sini\n\n",
-        "validationCode": '''import ast, json
-
-score = 0
-breakdown = {}
-errors = []
-
-try:
-    tree = ast.parse(__STUDENT_CODE__)
-    
-    has_func = has_param = has_print = False
-    for n in ast.walk(tree):
-        if isinstance(n, ast.FunctionDef) and n.name == "print_pesan":
-            has_func = True
-            if len(n.args.args) == 1:
-                has_param = True
-        if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id == "print":
-            has_print = True
-
-    if has_func:
-        breakdown["fungsi"] = 3
-        score += 3
-    else:
-        breakdown["fungsi"] = 0
-        errors.append("Fungsi print_pesan tidak ditemukan")
-
-    if has_param:
-        breakdown["parameter"] = 3
-        score += 3
-    else:
-        breakdown["parameter"] = 0
-        errors.append("Parameter tidak sesuai")
-
-    if has_print:
-        breakdown["print"] = 4
-        score += 4
-    else:
-        breakdown["print"] = 0
-        errors.append("Tidak menggunakan print()")
-
-except SyntaxError as e:
-    errors.append(f'Syntax error: {e}')
-
-print('__RUBRIC__' + json.dumps({
-    "score": score,
-    "max_score": 10,
-    "breakdown": breakdown,
-    "errors": errors
-}))
-''',
+        "rubric": rubric(
+            criterion("fungsi", 3, {"function": "print_pesan"}, "Fungsi print_pesan tidak ditemukan"),
+            criterion("parameter", 3, {"function": "print_pesan", "params": 1}, "Parameter tidak sesuai"),
+            criterion("print", 4, {"calls": "print"}, "Tidak menggunakan print()"),
+        ),
         "points": 10,
         "hints": "Kriteria: Fungsi (3), Parameter (3), Print (4)"
     },
@@ -111,46 +58,10 @@ hasil = tambah(3, 5)
 print(hasil)  # Output: 8
 ```""",
         "initialCode": "# Buat fungsi tambah di sini\n\n",
-        "validationCode": '''import ast, json
-
-score = 0
-breakdown = {}
-errors = []
-
-try:
-    tree = ast.parse(__STUDENT_CODE__)
-    
-    has_func = has_return = False
-    for n in ast.walk(tree):
-        if isinstance(n, ast.FunctionDef) and n.name == "tambah" and len(n.args.args) == 2:
-            has_func = True
-        if isinstance(n, ast.Return):
-            has_return = True
-
-    if has_func:
-        breakdown["fungsi"] = 5
-        score += 5
-    else:
-        breakdown["fungsi"] = 0
-        errors.append("Fungsi tambah dengan 2 parameter tidak ditemukan")
-
-    if has_return:
-        breakdown["return"] = 5
-        score += 5
-    else:
-        breakdown["return"] = 0
-        errors.append("Tidak ada return statement")
-
-except SyntaxError as e:
-    errors.append(f'Syntax error: {e}')
-
-print('__RUBRIC__' + json.dumps({
-    "score": score,
-    "max_score": 10,
-    "breakdown": breakdown,
-    "errors": errors
-}))
-''',
+        "rubric": rubric(
+            criterion("fungsi", 5, {"function": "tambah", "params": 2}, "Fungsi tambah dengan 2 parameter tidak ditemukan"),
+            criterion("return", 5, {"return": True}, "Tidak ada return statement"),
+        ),
         "points": 10,
         "hints": "Kriteria: Fungsi dengan 2 parameter (5), Return (5)"
     },
@@ -171,48 +82,10 @@ def tambah(a, b):
 # Tulis kode kamu di bawah ini
 ```""",
         "initialCode": "def tambah(a, b):\n    return a + b\n\n# Panggil fungsi dan simpan hasilnya\n",
-        "validationCode": '''import ast, json
-
-score = 0
-breakdown = {}
-errors = []
-
-try:
-    tree = ast.parse(__STUDENT_CODE__)
-    
-    called = assigned = False
-    for n in ast.walk(tree):
-        if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id == "tambah":
-            called = True
-        if isinstance(n, ast.Assign):
-            for target in n.targets:
-                if isinstance(target, ast.Name) and target.id == "hasil":
-                    assigned = True
-
-    if called:
-        breakdown["pemanggilan"] = 5
-        score += 5
-    else:
-        breakdown["pemanggilan"] = 0
-        errors.append("Fungsi tambah tidak dipanggil")
-
-    if assigned:
-        breakdown["penyimpanan"] = 5
-        score += 5
-    else:
-        breakdown["penyimpanan"] = 0
-        errors.append("Hasil tidak disimpan ke variabel 'hasil'")
-
-except SyntaxError as e:
-    errors.append(f'Syntax error: {e}')
-
-print('__RUBRIC__' + json.dumps({
-    "score": score,
-    "max_score": 10,
-    "breakdown": breakdown,
-    "errors": errors
-}))
-''',
+        "rubric": rubric(
+            criterion("pemanggilan", 5, {"calls": "tambah"}, "Fungsi tambah tidak dipanggil"),
+            criterion("penyimpanan", 5, {"assigns": "hasil"}, "Hasil tidak disimpan ke variabel 'hasil'"),
+        ),
         "points": 10,
         "hints": "Kriteria: Pemanggilan fungsi (5), Penyimpanan ke variabel (5)"
     },
@@ -230,46 +103,10 @@ luas = luas_persegi_panjang(5, 3)
 print(luas)  # Output: 15
 ```""",
         "initialCode": "# Buat fungsi luas_persegi_panjang di sini\n\n",
-        "validationCode": '''import ast, json
-
-score = 0
-breakdown = {}
-errors = []
-
-try:
-    tree = ast.parse(__STUDENT_CODE__)
-    
-    has_func = has_mul = False
-    for n in ast.walk(tree):
-        if isinstance(n, ast.FunctionDef) and n.name == "luas_persegi_panjang":
-            has_func = True
-        if isinstance(n, ast.BinOp) and isinstance(n.op, ast.Mult):
-            has_mul = True
-
-    if has_func:
-        breakdown["fungsi"] = 5
-        score += 5
-    else:
-        breakdown["fungsi"] = 0
-        errors.append("Fungsi luas_persegi_panjang tidak ditemukan")
-
-    if has_mul:
-        breakdown["perkalian"] = 5
-        score += 5
-    else:
-        breakdown["perkalian"] = 0
-        errors.append("Tidak ada operasi perkalian")
-
-except SyntaxError as e:
-    errors.append(f'Syntax error: {e}')
-
-print('__RUBRIC__' + json.dumps({
-    "score": score,
-    "max_score": 10,
-    "breakdown": breakdown,
-    "errors": errors
-}))
-''',
+        "rubric": rubric(
+            criterion("fungsi", 5, {"function": "luas_persegi_panjang"}, "Fungsi luas_persegi_panjang tidak ditemukan"),
+            criterion("perkalian", 5, {"binop": "Mult"}, "Tidak ada operasi perkalian"),
+        ),
         "points": 10,
         "hints": "Kriteria: Fungsi (5), Perkalian p*l (5)"
     },
@@ -287,46 +124,10 @@ luas = luas_lingkaran(7)
 print(luas)  # Output: 153.86
 ```""",
         "initialCode": "# Buat fungsi luas_lingkaran di sini\n\n",
-        "validationCode": '''import ast, json
-
-score = 0
-breakdown = {}
-errors = []
-
-try:
-    tree = ast.parse(__STUDENT_CODE__)
-    
-    has_func = has_return = False
-    for n in ast.walk(tree):
-        if isinstance(n, ast.FunctionDef) and n.name == "luas_lingkaran":
-            has_func = True
-        if isinstance(n, ast.Return):
-            has_return = True
-
-    if has_func:
-        breakdown["fungsi"] = 5
-        score += 5
-    else:
-        breakdown["fungsi"] = 0
-        errors.append("Fungsi luas_lingkaran tidak ditemukan")
-
-    if has_return:
-        breakdown["return"] = 5
-        score += 5
-    else:
-        breakdown["return"] = 0
-        errors.append("Tidak ada return statement")
-
-except SyntaxError as e:
-    errors.append(f'Syntax error: {e}')
-
-print('__RUBRIC__' + json.dumps({
-    "score": score,
-    "max_score": 10,
-    "breakdown": breakdown,
-    "errors": errors
-}))
-''',
+        "rubric": rubric(
+            criterion("fungsi", 5, {"function": "luas_lingkaran"}, "Fungsi luas_lingkaran tidak ditemukan"),
+            criterion("return", 5, {"return": True}, "Tidak ada return statement"),
+        ),
         "points": 10,
         "hints": "Kriteria: Fungsi (5), Return (5)"
     },
@@ -347,46 +148,10 @@ hasil = nilai_minimum(angka)
 print(hasil)  # Output: 1
 ```""",
         "initialCode": "# Buat fungsi nilai_minimum di sini\n# Gunakan loop, jangan pakai min()\n\n",
-        "validationCode": '''import ast, json
-
-score = 0
-breakdown = {}
-errors = []
-
-try:
-    tree = ast.parse(__STUDENT_CODE__)
-    
-    has_func = has_loop = False
-    for n in ast.walk(tree):
-        if isinstance(n, ast.FunctionDef) and n.name == "nilai_minimum":
-            has_func = True
-        if isinstance(n, (ast.For, ast.While)):
-            has_loop = True
-
-    if has_func:
-        breakdown["fungsi"] = 5
-        score += 5
-    else:
-        breakdown["fungsi"] = 0
-        errors.append("Fungsi nilai_minimum tidak ditemukan")
-
-    if has_loop:
-        breakdown["loop"] = 5
-        score += 5
-    else:
-        breakdown["loop"] = 0
-        errors.append("Tidak menggunakan perulangan (for/while)")
-
-except SyntaxError as e:
-    errors.append(f'Syntax error: {e}')
-
-print('__RUBRIC__' + json.dumps({
-    "score": score,
-    "max_score": 10,
-    "breakdown": breakdown,
-    "errors": errors
-}))
-''',
+        "rubric": rubric(
+            criterion("fungsi", 5, {"function": "nilai_minimum"}, "Fungsi nilai_minimum tidak ditemukan"),
+            criterion("loop", 5, {"loop": True}, "Tidak menggunakan perulangan (for/while)"),
+        ),
         "points": 10,
         "hints": "Kriteria: Fungsi (5), Perulangan (5)"
     },
@@ -405,46 +170,10 @@ hasil = rata_rata(angka)
 print(hasil)  # Output: 20.0
 ```""",
         "initialCode": "# Buat fungsi rata_rata di sini\n\n",
-        "validationCode": '''import ast, json
-
-score = 0
-breakdown = {}
-errors = []
-
-try:
-    tree = ast.parse(__STUDENT_CODE__)
-    
-    has_loop = has_len = False
-    for n in ast.walk(tree):
-        if isinstance(n, (ast.For, ast.While)):
-            has_loop = True
-        if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id == "len":
-            has_len = True
-
-    if has_loop:
-        breakdown["loop"] = 5
-        score += 5
-    else:
-        breakdown["loop"] = 0
-        errors.append("Tidak menggunakan perulangan")
-
-    if has_len:
-        breakdown["len"] = 5
-        score += 5
-    else:
-        breakdown["len"] = 0
-        errors.append("Tidak menggunakan len()")
-
-except SyntaxError as e:
-    errors.append(f'Syntax error: {e}')
-
-print('__RUBRIC__' + json.dumps({
-    "score": score,
-    "max_score": 10,
-    "breakdown": breakdown,
-    "errors": errors
-}))
-''',
+        "rubric": rubric(
+            criterion("loop", 5, {"loop": True}, "Tidak menggunakan perulangan"),
+            criterion("len", 5, {"calls": "len"}, "Tidak menggunakan len()"),
+        ),
         "points": 10,
         "hints": "Kriteria: Perulangan (5), Menggunakan len() (5)"
     },
@@ -462,46 +191,10 @@ print(status_kelulusan(80))  # Output: Lulus
 print(status_kelulusan(60))  # Output: Tidak Lulus
 ```""",
         "initialCode": "# Buat fungsi status_kelulusan di sini\n\n",
-        "validationCode": '''import ast, json
-
-score = 0
-breakdown = {}
-errors = []
-
-try:
-    tree = ast.parse(__STUDENT_CODE__)
-    
-    has_if = has_return = False
-    for n in ast.walk(tree):
-        if isinstance(n, ast.If):
-            has_if = True
-        if isinstance(n, ast.Return):
-            has_return = True
-
-    if has_if:
-        breakdown["if"] = 5
-        score += 5
-    else:
-        breakdown["if"] = 0
-        errors.append("Tidak menggunakan if statement")
-
-    if has_return:
-        breakdown["return"] = 5
-        score += 5
-    else:
-        breakdown["return"] = 0
-        errors.append("Tidak ada return statement")
-
-except SyntaxError as e:
-    errors.append(f'Syntax error: {e}')
-
-print('__RUBRIC__' + json.dumps({
-    "score": score,
-    "max_score": 10,
-    "breakdown": breakdown,
-    "errors": errors
-}))
-''',
+        "rubric": rubric(
+            criterion("if", 5, {"node": "If"}, "Tidak menggunakan if statement"),
+            criterion("return", 5, {"return": True}, "Tidak ada return statement"),
+        ),
         "points": 10,
         "hints": "Kriteria: Kondisi if (5), Return (5)"
     },
@@ -518,46 +211,10 @@ Nama: Budi Santoso
 NIM: 12345678
 ```""",
         "initialCode": "# Buat fungsi tampilkan_identitas di sini\n\n",
-        "validationCode": '''import ast, json
-
-score = 0
-breakdown = {}
-errors = []
-
-try:
-    tree = ast.parse(__STUDENT_CODE__)
-    
-    has_func = has_print = False
-    for n in ast.walk(tree):
-        if isinstance(n, ast.FunctionDef) and n.name == "tampilkan_identitas":
-            has_func = True
-        if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id == "print":
-            has_print = True
-
-    if has_func:
-        breakdown["fungsi"] = 5
-        score += 5
-    else:
-        breakdown["fungsi"] = 0
-        errors.append("Fungsi tampilkan_identitas tidak ditemukan")
-
-    if has_print:
-        breakdown["print"] = 5
-        score += 5
-    else:
-        breakdown["print"] = 0
-        errors.append("Tidak menggunakan print()")
-
-except SyntaxError as e:
-    errors.append(f'Syntax error: {e}')
-
-print('__RUBRIC__' + json.dumps({
-    "score": score,
-    "max_score": 10,
-    "breakdown": breakdown,
-    "errors": errors
-}))
-''',
+        "rubric": rubric(
+            criterion("fungsi", 5, {"function": "tampilkan_identitas"}, "Fungsi tampilkan_identitas tidak ditemukan"),
+            criterion("print", 5, {"calls": "print"}, "Tidak menggunakan print()"),
+        ),
         "points": 10,
         "hints": "Kriteria: Fungsi (5), Print (5)"
     },
@@ -575,75 +232,34 @@ hitung_luas_dan_tampilkan(4, 5)
 # Output: 20
 ```""",
         "initialCode": "# Buat fungsi hitung_luas_dan_tampilkan di sini\n\n",
-        "validationCode": '''import ast, json
-
-score = 0
-breakdown = {}
-errors = []
-
-try:
-    tree = ast.parse(__STUDENT_CODE__)
-    
-    has_func = has_calc = has_print = False
-    for n in ast.walk(tree):
-        if isinstance(n, ast.FunctionDef) and n.name == "hitung_luas_dan_tampilkan":
-            has_func = True
-        if isinstance(n, ast.BinOp) and isinstance(n.op, ast.Mult):
-            has_calc = True
-        if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id == "print":
-            has_print = True
-
-    if has_func:
-        breakdown["fungsi"] = 4
-        score += 4
-    else:
-        breakdown["fungsi"] = 0
-        errors.append("Fungsi hitung_luas_dan_tampilkan tidak ditemukan")
-
-    if has_calc:
-        breakdown["perhitungan"] = 3
-        score += 3
-    else:
-        breakdown["perhitungan"] = 0
-        errors.append("Tidak ada operasi perkalian")
-
-    if has_print:
-        breakdown["print"] = 3
-        score += 3
-    else:
-        breakdown["print"] = 0
-        errors.append("Tidak menggunakan print()")
-
-except SyntaxError as e:
-    errors.append(f'Syntax error: {e}')
-
-print('__RUBRIC__' + json.dumps({
-    "score": score,
-    "max_score": 10,
-    "breakdown": breakdown,
-    "errors": errors
-}))
-''',
+        "rubric": rubric(
+            criterion("fungsi", 4, {"function": "hitung_luas_dan_tampilkan"}, "Fungsi hitung_luas_dan_tampilkan tidak ditemukan"),
+            criterion("perhitungan", 3, {"binop": "Mult"}, "Tidak ada operasi perkalian"),
+            criterion("print", 3, {"calls": "print"}, "Tidak menggunakan print()"),
+        ),
         "points": 10,
         "hints": "Kriteria: Fungsi (4), Perkalian (3), Print (3)"
     }
 ]
 
+EXAM = {
+    "id": "alpro-functions",
+    "title": "Ujian Algoritma & Pemrograman: Fungsi Python",
+    "description": "Ujian tentang konsep fungsi dalam Python: membuat fungsi, parameter, return, dan pemanggilan fungsi.",
+    "durationMinutes": 90,
+    # The app grades the rubric; the Express backend only knows validationCode,
+    # so each question also carries the rubric compiled with the runtime
+    "questions": [dict(q, gradingType="rubric", validationCode=standalone_validation(q["rubric"]))
+                  for q in QUESTIONS],
+    "isPublic": True
+}
+
 def create_exam():
-    """Create the Alpro exam via API"""
-    
-    # Add gradingType to all questions
-    for q in QUESTIONS:
-        q["gradingType"] = "rubric"
-    
-    exam_data = {
-        "id": "alpro-functions",
-        "title": "Ujian Algoritma & Pemrograman: Fungsi Python",
-        "description": "Ujian tentang konsep fungsi dalam Python: membuat fungsi, parameter, return, dan pemanggilan fungsi.",
-        "durationMinutes": 90,
-        "questions": QUESTIONS,
-        "isPublic": True
-    }
+    """Create the Alpro exam via API (scripts/import_exams.py also reads EXAM)"""
+    import requests
+    from selftest_exam import check_exam, load_answers
+
+    exam_data = EXAM
     
     print("=" * 60)
     print("Creating Alpro Exam...")
@@ -653,6 +269,13 @@ def create_exam():
     print(f"Questions: {len(QUESTIONS)}")
     print(f"Total Points: {sum(q['points'] for q in QUESTIONS)}")
     print()
+
+    # Grade known answers locally first: a broken rubric is not published
+    broken = check_exam(exam_data, *load_answers())
+    print()
+    if broken:
+        print(f"❌ Not published, fix the rubrics of: {', '.join(broken)}")
+        return
     
     # Create via API
     response = requests.post(
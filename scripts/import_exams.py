@@ -0,0 +1,314 @@
+"""
+Bulk exam importer: sync a directory of exam definitions to the app.
+
+    python scripts/import_exams.py exams/ --base-url http://localhost:3000
+    python scripts/import_exams.py exams/ --concurrency 8 --retries 4 --dry-run
+
+A definition is a *.json file holding one exam object, or a *.py module
+assigning EXAM at top level (see scripts/create_alpro_exam.py). Other
+*.py files in the directory (helpers, scripts) are never imported: the
+assignment is found by parsing, before anything runs. The stored exams are
+fetched once (GET /api/admin/exams) and every question is hashed on both
+sides; only new or changed exams are uploaded (POST /api/admin/exams),
+concurrently, over keep-alive connections (one per worker), retrying
+connection errors and 429/502/503/504 with exponential backoff. With
+--self-test, changed exams are first graded against known answers
+(scripts/selftest_exam.py) and those with broken rubrics are held back.
+
+Fields the server derives on save (staticGrading, validationArtifact,
+gradingHash, and expected outputs computed from a referenceSolution)
+are left out of the hashes. Standard library only.
+"""
+
+import argparse
+import ast
+import glob
+import hashlib
+import http.client
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+BASE_URL = os.environ.get('BASE_URL', 'http://localhost:3000')
+EXAMS_PATH = '/api/admin/exams'
+
+EXAM_FIELDS = ('title', 'description', 'durationMinutes', 'isPublic')
+DERIVED_QUESTION_FIELDS = ('staticGrading', 'validationArtifact', 'gradingHash')
+RETRY_STATUSES = frozenset((429, 502, 503, 504))
+
+
+# ============================================================
+# DEFINITIONS AND HASHES
+# ============================================================
+
+def defines_exam(path: str) -> bool:
+    """Does the module at `path` assign EXAM at top level? Parsed, not run."""
+    with open(path, encoding='utf-8') as f:
+        try:
+            tree = ast.parse(f.read(), path)
+        except SyntaxError as e:
+            raise SystemExit(f'{path}: {e}')
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            targets = node.targets
+        elif isinstance(node, ast.AnnAssign):
+            targets = [node.target]
+        else:
+            continue
+        if any(isinstance(target, ast.Name) and target.id == 'EXAM' for target in targets):
+            return True
+    return False
+
+
+def load_definitions(directory: str) -> List[Dict]:
+    """Every exam defined in `directory`, sorted by file name."""
+    exams, seen = [], {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.json')) + glob.glob(os.path.join(directory, '*.py'))):
+        if path.endswith('.py'):
+            if not defines_exam(path):
+                continue
+            spec = importlib.util.spec_from_file_location('exam_definition_%d' % len(exams), path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            exam = getattr(module, 'EXAM', None)
+        else:
+            with open(path, encoding='utf-8') as f:
+                exam = json.load(f)
+        if not isinstance(exam, dict) or not exam.get('id') or not isinstance(exam.get('questions'), list):
+            raise SystemExit(f'{path}: an exam needs an id and a list of questions')
+        if exam['id'] in seen:
+            raise SystemExit(f"{path}: exam id {exam['id']} is also defined in {seen[exam['id']]}")
+        seen[exam['id']] = path
+        exams.append(exam)
+    return exams
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def question_hash(question: Dict) -> str:
+    """Hash of what the author wrote: server-derived fields are left out."""
+    authored = {key: value for key, value in question.items() if key not in DERIVED_QUESTION_FIELDS}
+    if authored.get('referenceSolution') and isinstance(authored.get('rubric'), dict):
+        rubric = dict(authored['rubric'])
+        rubric['criteria'] = [
+            dict(c, tests={k: v for k, v in c['tests'].items() if k != 'expected'}) if 'tests' in c else c
+            for c in rubric.get('criteria', [])
+        ]
+        authored['rubric'] = rubric
+    return _digest(authored)
+
+
+def exam_hashes(exam: Dict) -> Tuple[str, Dict[str, str]]:
+    """(hash of the whole exam, hash per question id)"""
+    questions = {q.get('id'): question_hash(q) for q in exam.get('questions', [])}
+    fields = {key: exam.get(key) for key in EXAM_FIELDS}
+    return _digest([fields, [questions[q.get('id')] for q in exam.get('questions', [])]]), questions
+
+
+def plan(definitions: List[Dict], stored: List[Dict]) -> List[Tuple[Dict, Optional[str]]]:
+    """
+    (exam, reason) per definition; reason is None when the stored exam
+    is identical, else 'new' or what changed.
+    """
+    remote = {exam.get('id'): exam_hashes(exam) for exam in stored}
+    planned = []
+    for exam in definitions:
+        digest, questions = exam_hashes(exam)
+        if exam['id'] not in remote:
+            planned.append((exam, 'new'))
+            continue
+        stored_digest, stored_questions = remote[exam['id']]
+        if digest == stored_digest:
+            planned.append((exam, None))
+            continue
+        changed = [qid for qid, h in questions.items() if stored_questions.get(qid) != h]
+        removed = [qid for qid in stored_questions if qid not in questions]
+        parts = (['questions ' + ', '.join(changed)] if changed else []) + \
+                (['removed ' + ', '.join(removed)] if removed else [])
+        planned.append((exam, '; '.join(parts) or 'exam fields or question order'))
+    return planned
+
+
+# ============================================================
+# HTTP - keep-alive connections, one per worker thread
+# ============================================================
+
+class APIError(Exception):
+    def __init__(self, status: int, body):
+        super().__init__('HTTP %d: %s' % (status, body.get('error') if isinstance(body, dict) else body))
+        self.status = status
+        self.body = body
+
+
+class KeepAliveClient:
+    """JSON over HTTP/1.1, reusing one connection per thread; retries transient failures."""
+
+    def __init__(self, base_url: str, retries: int = 3, backoff: float = 0.5, timeout: float = 60.0):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.connections = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open = []
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.host, self.port, timeout=self.timeout)
+            with self._lock:
+                self.connections += 1
+                self._open.append(conn)
+        return conn
+
+    def _drop_connection(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+            with self._lock:
+                if conn in self._open:
+                    self._open.remove(conn)
+
+    def request(self, method: str, path: str, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        for attempt in range(self.retries + 1):
+            try:
+                conn = self._connection()
+                conn.request(method, self.prefix + path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self._drop_connection()
+            except (OSError, http.client.HTTPException) as e:
+                # Includes a keep-alive connection the server closed meanwhile
+                self._drop_connection()
+                if attempt == self.retries:
+                    raise ConnectionError('%s %s failed: %s' % (method, path, e))
+            else:
+                try:
+                    parsed = json.loads(data.decode('utf-8')) if data else None
+                except ValueError:
+                    parsed = data.decode('utf-8', 'replace')
+                if response.status < 400:
+                    return parsed
+                if response.status not in RETRY_STATUSES or attempt == self.retries:
+                    raise APIError(response.status, parsed)
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def close(self) -> None:
+        """Close the connections of every worker thread."""
+        with self._lock:
+            for conn in self._open:
+                conn.close()
+            self._open = []
+        self._local = threading.local()
+
+
+# ============================================================
+# SYNC
+# ============================================================
+
+def upload(client: KeepAliveClient, exam: Dict) -> Tuple[str, Optional[str]]:
+    """POST one exam; (exam id, error or None)"""
+    try:
+        client.request('POST', EXAMS_PATH, exam)
+        return exam['id'], None
+    except APIError as e:
+        problems = e.body.get('problems') if isinstance(e.body, dict) else None
+        return exam['id'], str(e) + (''.join(f"\n      {p['questionId']}: {p['error']}" for p in problems)
+                                     if problems else '')
+    except ConnectionError as e:
+        return exam['id'], str(e)
+
+
+def sync(definitions: List[Dict], client: KeepAliveClient, concurrency: int = 8,
+         dry_run: bool = False, check: Optional[Callable[[Dict], List[str]]] = None) -> Dict[str, List]:
+    """
+    Upload new and changed exams; returns ids per outcome (unchanged,
+    uploaded, failed). `check` (the self-test) returns the broken question
+    ids of an exam; exams with any are not uploaded.
+    """
+    stored = client.request('GET', EXAMS_PATH) or []
+    planned = plan(definitions, stored)
+    summary = {'unchanged': [], 'uploaded': [], 'failed': [], 'pending': []}
+    changed = []
+    for exam, reason in planned:
+        if reason is None:
+            summary['unchanged'].append(exam['id'])
+        else:
+            print(f"  ↻ {exam['id']}: {reason}")
+            changed.append(exam)
+    if check:
+        for exam in list(changed):
+            broken = check(exam)
+            if broken:
+                print(f"  ❌ {exam['id']}: broken rubrics ({', '.join(broken)}), not uploaded")
+                summary['failed'].append(exam['id'])
+                changed.remove(exam)
+    if dry_run:
+        summary['pending'] = [exam['id'] for exam in changed]
+        return summary
+
+    if changed:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(changed)))) as pool:
+            for exam_id, error in pool.map(lambda exam: upload(client, exam), changed):
+                if error:
+                    print(f"  ❌ {exam_id}: {error}")
+                    summary['failed'].append(exam_id)
+                else:
+                    print(f"  ✅ {exam_id}")
+                    summary['uploaded'].append(exam_id)
+    return summary
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Upload new and changed exam definitions')
+    parser.add_argument('directory', help='directory of *.json exams and *.py modules assigning EXAM')
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--concurrency', type=int, default=8, help='uploads in flight')
+    parser.add_argument('--retries', type=int, default=3, help='retries per request on transient failures')
+    parser.add_argument('--dry-run', action='store_true', help='only show what would be uploaded')
+    parser.add_argument('--self-test', action='store_true',
+                        help='grade known answers first (scripts/selftest_exam.py); skip exams with broken rubrics')
+    parser.add_argument('--answers', help='known answers for --self-test (default tests/reference_answers.py)')
+    args = parser.parse_args(argv)
+
+    check = None
+    if args.self_test:
+        from selftest_exam import DEFAULT_ANSWERS, check_exam, load_answers
+        correct, wrong = load_answers(args.answers or DEFAULT_ANSWERS)
+        check = lambda exam: check_exam(exam, correct, wrong)
+
+    started = time.monotonic()
+    definitions = load_definitions(args.directory)
+    client = KeepAliveClient(args.base_url, retries=args.retries)
+    print(f"Syncing {len(definitions)} exams to {args.base_url}")
+    summary = sync(definitions, client, args.concurrency, args.dry_run, check)
+    client.close()
+
+    print(f"{len(summary['unchanged'])} unchanged, {len(summary['uploaded'])} uploaded, "
+          f"{len(summary['failed'])} failed"
+          + (f", {len(summary['pending'])} would be uploaded" if args.dry_run else '')
+          + f" in {time.monotonic() - started:.1f}s ({client.connections} connections)")
+    if summary['failed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""
+Regrade the stored submissions of one exam after its questions changed.
+
+Only the questions whose grading changed since a submission was graded
+are regraded: saving an exam stores each question's gradingHash, and
+every grade the hash of the version it was computed with (see
+hashGradingInputs in src/lib/gradeCache.ts). Grades without a hash, and
+questions of exams not saved since hashes exist, count as changed.
+
+Submissions are streamed with a server-side cursor. The stale answers of
+each batch are grouped by question and graded on a process pool in
+per-question runs (grade_question_for_students() in grader/questions.py:
+validation compiled once per run, many answers, identical answers graded
+once) in the local sandbox of grader/executor.py, and written back with
+one batched UPDATE per batch.
+
+    pip install psycopg2-binary
+    DATABASE_URL=postgres://... python scripts/regrade_exam.py EXAM_ID
+    python scripts/regrade_exam.py EXAM_ID --questions Q2,Q5   # also regrade these
+    python scripts/regrade_exam.py EXAM_ID --all --dry-run
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grader.executor import ExecutionLimits
+from grader.questions import STUDENT_BATCH_SIZE, grade_question_for_students
+
+UPDATE_SQL = """
+    UPDATE exam_submissions AS s
+    SET score = v.score, grade_details = v.grade_details
+    FROM (VALUES %s) AS v(id, score, grade_details)
+    WHERE s.id = v.id
+"""
+
+
+# ============================================================
+# WHAT TO REGRADE
+# ============================================================
+
+def stale_questions(questions: List[Dict], grade_details: Dict, forced: Set[str]) -> List[Dict]:
+    """Questions of one submission whose stored grade is missing, forced, or from another version."""
+    stale = []
+    for question in questions:
+        grade = grade_details.get(question['id'])
+        if (question['id'] in forced or not isinstance(grade, dict)
+                or grade.get('gradingHash') != question.get('gradingHash')
+                or not question.get('gradingHash')):
+            stale.append(question)
+    return stale
+
+
+def total_score(questions: List[Dict], grade_details: Dict) -> int:
+    return int(round(sum(grade_details.get(q['id'], {}).get('score', 0) for q in questions)))
+
+
+def question_tasks(submissions: List[Tuple], limits: ExecutionLimits,
+                   answers_per_run: int = STUDENT_BATCH_SIZE) -> List[Tuple]:
+    """
+    Group the stale answers of (id, answers, grade_details, stale) submissions
+    by question: one (question, {submission id: code}, limits) task per
+    `answers_per_run` answers to a question.
+    """
+    by_question: Dict[str, Tuple[Dict, Dict]] = {}
+    for submission_id, answers, _, stale in submissions:
+        for question in stale:
+            by_question.setdefault(question['id'], (question, {}))[1][submission_id] = answers.get(question['id']) or ''
+    tasks = []
+    for question, codes in by_question.values():
+        ids = list(codes)
+        for start in range(0, len(ids), answers_per_run):
+            tasks.append((question, {i: codes[i] for i in ids[start:start + answers_per_run]}, limits))
+    return tasks
+
+
+def grade_question_task(task) -> Tuple[str, Dict]:
+    """Worker: grade one task of question_tasks(); (question id, {submission id: grade})."""
+    question, answers, limits = task
+    return question['id'], grade_question_for_students(question, answers, limits, batch_size=len(answers))
+
+
+def regrade_submission(submission_id, grade_details: Dict, stale: List[Dict], fresh: Dict[str, Dict],
+                       questions: List[Dict]) -> Dict:
+    """New row values of one submission, its stale questions replaced by `fresh` (question id -> grade)."""
+    details = dict(grade_details)
+    for question in stale:
+        grade = dict(fresh[question['id']])
+        if question.get('gradingHash'):
+            grade['gradingHash'] = question['gradingHash']
+        details[question['id']] = grade
+    return {'id': submission_id, 'score': total_score(questions, details), 'grade_details': details,
+            'changed': {q['id'] for q in stale
+                        if grade_details.get(q['id'], {}).get('score') != details[q['id']]['score']}}
+
+
+# ============================================================
+# PROGRESS
+# ============================================================
+
+class Progress:
+    """Prints processed/total, regraded and throughput at most every `interval` seconds."""
+
+    def __init__(self, total: int, interval: float = 2.0):
+        self.total = total
+        self.interval = interval
+        self.seen = 0
+        self.regraded = 0
+        self.questions = 0
+        self.changed = 0
+        self.started = time.monotonic()
+        self._printed = 0.0
+
+    def update(self, seen: int, regraded: int, questions: int, changed: int, force: bool = False) -> None:
+        self.seen += seen
+        self.regraded += regraded
+        self.questions += questions
+        self.changed += changed
+        now = time.monotonic()
+        if force or now - self._printed >= self.interval:
+            self._printed = now
+            print(self.line(now), file=sys.stderr, flush=True)
+
+    def line(self, now: Optional[float] = None) -> str:
+        elapsed = max((now or time.monotonic()) - self.started, 1e-9)
+        rate = self.regraded / elapsed
+        left = (self.total - self.seen) / (self.seen / elapsed) if self.seen else 0
+        return (f"[regrade] {self.seen}/{self.total} submissions, {self.regraded} regraded "
+                f"({self.questions} answers, {self.changed} scores changed), "
+                f"{rate:.1f} submissions/s, {elapsed:.0f}s elapsed, ~{left:.0f}s left")
+
+
+# ============================================================
+# DATABASE
+# ============================================================
+
+def connect(url: str):
+    try:
+        import psycopg2
+    except ImportError:
+        raise SystemExit('regrade_exam.py needs psycopg2: pip install psycopg2-binary')
+    return psycopg2.connect(url)
+
+
+def write_batch(conn, rows: List[Dict]) -> None:
+    from psycopg2.extras import execute_values
+    with conn.cursor() as cur:
+        execute_values(cur, UPDATE_SQL, [(row['id'], row['score'], json.dumps(row['grade_details'])) for row in rows],
+                       template='(%s::integer, %s::integer, %s::text)')
+    conn.commit()
+
+
+def load_questions(conn, exam_id: str) -> List[Dict]:
+    with conn.cursor() as cur:
+        cur.execute('SELECT questions FROM exams WHERE id = %s', (exam_id,))
+        row = cur.fetchone()
+    if row is None:
+        raise SystemExit(f'exam {exam_id} not found')
+    return json.loads(row[0] or '[]')
+
+
+def regrade_exam(args) -> Progress:
+    reader, writer = connect(args.database_url), connect(args.database_url)
+    questions = load_questions(writer, args.exam_id)
+    forced = {q['id'] for q in questions} if args.all else set(filter(None, args.questions.split(',')))
+    limits = ExecutionLimits(cpu_time=args.cpu_time, wall_time=args.wall_time)
+
+    with writer.cursor() as cur:
+        cur.execute('SELECT count(*) FROM exam_submissions WHERE exam_id = %s', (args.exam_id,))
+        progress = Progress(cur.fetchone()[0])
+
+    # A named cursor is server-side: rows arrive `batch_size` at a time
+    cursor = reader.cursor(name='regrade_exam_submissions')
+    cursor.itersize = args.batch_size
+    cursor.execute('SELECT id, answers, grade_details FROM exam_submissions WHERE exam_id = %s ORDER BY id',
+                   (args.exam_id,))
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        while True:
+            rows = cursor.fetchmany(args.batch_size)
+            if not rows:
+                break
+            submissions = []
+            for submission_id, answers, grade_details in rows:
+                details = json.loads(grade_details) if grade_details else {}
+                stale = stale_questions(questions, details, forced)
+                if stale:
+                    submissions.append((submission_id, json.loads(answers or '{}'), details, stale))
+
+            fresh: Dict = {}
+            for question_id, grades in pool.map(grade_question_task,
+                                                question_tasks(submissions, limits, args.answers_per_run)):
+                for submission_id, grade in grades.items():
+                    fresh.setdefault(submission_id, {})[question_id] = grade
+            results = [regrade_submission(submission_id, details, stale, fresh[submission_id], questions)
+                       for submission_id, _, details, stale in submissions]
+            if results and not args.dry_run:
+                write_batch(writer, results)
+            progress.update(len(rows), len(results), sum(len(s[3]) for s in submissions),
+                            sum(len(result['changed']) for result in results))
+
+    cursor.close()
+    reader.close()
+    writer.close()
+    progress.update(0, 0, 0, 0, force=True)
+    return progress
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Regrade stored submissions of an exam whose questions changed')
+    parser.add_argument('exam_id')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--questions', default='', help='comma-separated question ids to regrade everywhere')
+    parser.add_argument('--all', action='store_true', help='regrade every question of every submission')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--batch-size', type=int, default=200, help='submissions fetched and updated at a time')
+    parser.add_argument('--answers-per-run', type=int, default=STUDENT_BATCH_SIZE,
+                        help='answers to one question graded per sandbox run')
+    parser.add_argument('--cpu-time', type=float, default=5.0, help='CPU seconds per grading run')
+    parser.add_argument('--wall-time', type=float, default=10.0, help='wall-clock seconds per grading run')
+    parser.add_argument('--dry-run', action='store_true', help='grade but do not write')
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        raise SystemExit('DATABASE_URL is not set (or pass --database-url)')
+
+    progress = regrade_exam(args)
+    print(f"✅ {progress.regraded} of {progress.seen} submissions regraded"
+          f"{' (dry run, nothing written)' if args.dry_run else ''}")
+
+
+if __name__ == '__main__':
+    main()
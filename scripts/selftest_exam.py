@@ -0,0 +1,84 @@
+"""
+Pre-publish self-test of exam definitions (see grader/selftest.py).
+
+Grades known-correct and known-wrong answers to every question in the
+local sandbox, reports score, runtime and validation crashes per
+question, and exits non-zero if any rubric is broken.
+
+    python scripts/selftest_exam.py scripts/                 # every exam defined there
+    python scripts/selftest_exam.py exams/ --exam alpro-functions --workers 8
+    python scripts/selftest_exam.py exams/ --answers answers.json
+
+Answers come from a *.py module defining CORRECT_ANSWERS/WRONG_ANSWERS
+(default: tests/reference_answers.py) or a *.json file
+{"correct": {...}, "wrong": {...}}, both keyed by question id; a
+question's referenceSolution counts as a correct answer too.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grader.executor import ExecutionLimits
+from grader.selftest import broken, format_report, self_test
+from import_exams import load_definitions
+
+DEFAULT_ANSWERS = os.path.join(ROOT, 'tests', 'reference_answers.py')
+
+
+def load_answers(path: str = DEFAULT_ANSWERS) -> Tuple[Dict, Dict]:
+    """(correct, wrong) answers by question id."""
+    if path.endswith('.py'):
+        spec = importlib.util.spec_from_file_location('reference_answers', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return getattr(module, 'CORRECT_ANSWERS', {}), getattr(module, 'WRONG_ANSWERS', {})
+    with open(path, encoding='utf-8') as f:
+        answers = json.load(f)
+    return answers.get('correct', {}), answers.get('wrong', {})
+
+
+def check_exam(exam: Dict, correct: Dict, wrong: Dict, workers=None, limits=None) -> List[str]:
+    """Self-test one exam and print the report; returns the ids of broken questions."""
+    started = time.monotonic()
+    results = self_test(exam['questions'], correct, wrong, workers, limits)
+    print(f"🧪 {exam['id']}: {len(exam['questions'])} questions "
+          f"({sum(len(r['cases']) for r in results)} answers graded in {time.monotonic() - started:.1f}s)")
+    print(format_report(results))
+    return broken(results)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Grade known answers to every question before publishing')
+    parser.add_argument('directory', help='directory of *.json exams and *.py modules assigning EXAM')
+    parser.add_argument('--exam', action='append', help='only this exam id (repeatable)')
+    parser.add_argument('--answers', default=DEFAULT_ANSWERS, help='*.py or *.json file of known answers')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--cpu-time', type=float, default=5.0, help='CPU seconds per grading run')
+    parser.add_argument('--wall-time', type=float, default=10.0, help='wall-clock seconds per grading run')
+    args = parser.parse_args(argv)
+
+    exams = [e for e in load_definitions(args.directory) if not args.exam or e['id'] in args.exam]
+    correct, wrong = load_answers(args.answers)
+    limits = ExecutionLimits(cpu_time=args.cpu_time, wall_time=args.wall_time)
+    failed = {}
+    for exam in exams:
+        failed[exam['id']] = check_exam(exam, correct, wrong, args.workers, limits)
+        print()
+    failed = {exam_id: ids for exam_id, ids in failed.items() if ids}
+    if failed:
+        print('❌ Broken rubrics, do not publish: ' +
+              '; '.join(f"{exam_id} ({', '.join(ids)})" for exam_id, ids in failed.items()))
+        sys.exit(1)
+    print(f"✅ {len(exams)} exams passed the self-test")
+
+
+if __name__ == '__main__':
+    main()
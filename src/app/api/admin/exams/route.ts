@@ -1,6 +1,7 @@
 
 import { NextResponse } from "next/server";
 import { db } from "@/lib/db";
+import { ExamPreparationError, invalidateChangedQuestions, prepareExam } from "@/lib/rubricGrader";
 
 export async function GET() {
     try {
@@ -15,9 +16,15 @@ export async function GET() {
 export async function POST(req: Request) {
     try {
         const body = await req.json();
-        const exam = await db.saveExam(body);
+        const previous = body.id ? await db.getExam(body.id) : undefined;
+        const exam = await db.saveExam(await prepareExam(body));
+        // Grades cached under the old validation of edited questions are dead weight now
+        if (previous) await invalidateChangedQuestions(previous.questions, exam.questions);
         return NextResponse.json(exam);
     } catch (e: unknown) {
+        if (e instanceof ExamPreparationError) {
+            return NextResponse.json({ error: e.message, problems: e.problems }, { status: 400 });
+        }
         const message = e instanceof Error ? e.message : "Unknown error";
         return NextResponse.json({ error: message }, { status: 500 });
     }
@@ -1,4 +1,5 @@
 import { NextResponse } from "next/server";
+import { buildCombinedCode } from "@/lib/rubricGrader";
 
 /**
  * Debug endpoint to test grading engine directly
@@ -9,29 +10,8 @@ export async function POST(req: Request) {
     try {
         const { studentCode, validationCode } = await req.json();
 
-        // Base64 encode for safe transmission
-        const base64StudentCode = Buffer.from(studentCode || '', 'utf-8').toString('base64');
-        const base64ValidationCode = Buffer.from(validationCode || '', 'utf-8').toString('base64');
-
         // Build script - same as rubricGrader.ts
-        const combinedCode = `import base64
-import ast
-import json
-
-# Decode student code and store in globals
-globals()['__STUDENT_CODE__'] = base64.b64decode("${base64StudentCode}").decode('utf-8')
-globals()['__exec_error__'] = None
-
-# Execute student code in global namespace
-try:
-    exec(globals()['__STUDENT_CODE__'], globals())
-except Exception as e:
-    globals()['__exec_error__'] = str(e)
-
-# Execute validation code in same global namespace
-__validation_code__ = base64.b64decode("${base64ValidationCode}").decode('utf-8')
-exec(__validation_code__, globals())
-`;
+        const combinedCode = buildCombinedCode(studentCode || '', validationCode || '');
 
         // Execute via Judge0
         const judge0Url = process.env.JUDGE0_URL || 'http://129.212.236.32:2358';
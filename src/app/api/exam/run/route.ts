@@ -0,0 +1,31 @@
+import { NextResponse } from "next/server";
+import { db, Question } from "@/lib/db";
+import { buildCombinedCode, executeCode, getValidationCode } from "@/lib/rubricGrader";
+
+/**
+ * Run student code against a question's validation code
+ * POST /api/exam/run
+ * Body: { studentCode: string, examId: string, questionId: string }
+ *
+ * Used by the exam "Run" button so the script includes the grading runtime.
+ * The validation is loaded here: students never receive it (toStudentExam).
+ */
+export async function POST(req: Request) {
+    try {
+        const { studentCode, examId, questionId } = await req.json();
+
+        const exam = examId ? await db.getExam(examId) : null;
+        const question = exam?.questions.find(q => q.id === questionId) as Question | undefined;
+        if (!question) {
+            return NextResponse.json({ error: "Question not found" }, { status: 404 });
+        }
+
+        const combinedCode = buildCombinedCode(studentCode || '', getValidationCode(question));
+        const result = await executeCode(combinedCode);
+
+        return NextResponse.json(result);
+    } catch (e: unknown) {
+        const message = e instanceof Error ? e.message : "Unknown error";
+        return NextResponse.json({ error: "Failed to run code", details: message }, { status: 500 });
+    }
+}
@@ -1,6 +1,6 @@
 import { NextResponse } from "next/server";
 import { db, Question, GradeResult } from "@/lib/db";
-import { gradeWithRubric, gradeWithAssertion } from "@/lib/rubricGrader";
+import { gradeExam, getQuestionGradingSpec, ExamGradingJob } from "@/lib/rubricGrader";
 
 export async function POST(req: Request) {
     try {
@@ -19,17 +19,19 @@ export async function POST(req: Request) {
 
         // Server-side grading with rubric engine
         const gradeDetails: Record<string, GradeResult> = {};
+        const ungraded: Record<string, GradeResult> = {};
         let totalScore = 0;
         let totalPoints = 0;
+        const jobs: ExamGradingJob[] = [];
 
         for (const question of exam.questions) {
             const q = question as Question;
-            const studentCode = answers[q.id] || '';
             totalPoints += q.points;
 
             // Skip grading if no validation code
-            if (!q.validationCode) {
-                gradeDetails[q.id] = {
+            const spec = getQuestionGradingSpec(q);
+            if (!spec) {
+                ungraded[q.id] = {
                     questionId: q.id,
                     score: 0,
                     maxScore: q.points,
@@ -40,27 +42,16 @@ export async function POST(req: Request) {
                 continue;
             }
 
-            // Grade based on grading type
-            let result: GradeResult;
-            if (q.gradingType === 'rubric') {
-                result = await gradeWithRubric(
-                    studentCode,
-                    q.validationCode,
-                    q.id,
-                    q.points,
-                    q.gradingFormat || undefined
-                );
-            } else {
-                // Default: assertion-based grading
-                result = await gradeWithAssertion(
-                    studentCode,
-                    q.validationCode,
-                    q.id,
-                    q.points
-                );
-            }
+            // Grade based on grading type (default: assertion)
+            jobs.push({ ...spec, studentCode: answers[q.id] || '' });
+        }
 
-            gradeDetails[q.id] = result;
+        // All questions in one sandbox execution (falls back to per-question runs)
+        const graded = new Map((await gradeExam(jobs)).map(result => [result.questionId, result]));
+        for (const question of exam.questions) {
+            const result = graded.get(question.id) || ungraded[question.id];
+            // Which version of the question this grade belongs to (see scripts/regrade_exam.py)
+            gradeDetails[question.id] = question.gradingHash ? { ...result, gradingHash: question.gradingHash } : result;
             totalScore += result.score;
         }
 
@@ -1,5 +1,6 @@
 import React from "react";
 import { db } from "@/lib/db";
+import { toStudentExam } from "@/lib/rubricGrader";
 import ExamInterface from "@/components/exam/ExamInterface";
 import { notFound } from "next/navigation";
 
@@ -16,5 +17,6 @@ export default async function ExamPage({ params }: PageProps) {
         notFound();
     }
 
-    return <ExamInterface exam={exam} />;
+    // Only what students may see: validation, rubrics and reference solutions stay here
+    return <ExamInterface exam={toStudentExam(exam)} />;
 }
@@ -59,6 +59,17 @@ export default function ExamEditor({ id }: ExamEditorProps) {
         setExam(prev => ({ ...prev, questions: newQuestions }));
     };
 
+    // A rubric replaces validationCode when grading (getValidationCode), so
+    // the validation editor only takes effect once the rubric is removed
+    const removeRubric = (idx: number) => {
+        if (!confirm("Remove this question's rubric and grade it with the validation code instead?")) return;
+        const newQuestions = [...exam.questions];
+        // eslint-disable-next-line @typescript-eslint/no-unused-vars
+        const { rubric, ...question } = newQuestions[idx];
+        newQuestions[idx] = question;
+        setExam(prev => ({ ...prev, questions: newQuestions }));
+    };
+
     const removeQuestion = (idx: number) => {
         const newQuestions = [...exam.questions];
         newQuestions.splice(idx, 1);
@@ -248,16 +259,28 @@ export default function ExamEditor({ id }: ExamEditorProps) {
                                             />
                                         </div>
                                     </div>
-                                    <div className="h-64 border border-[#27273a] rounded overflow-hidden flex flex-col">
-                                        <div className="bg-[#161622] px-3 py-1 text-xs text-gray-500 border-b border-[#27273a]">Validation Code (Hidden assertion logic)</div>
-                                        <div className="flex-1 relative">
-                                            <CodeEditor
-                                                initialValue={q.validationCode || ""}
-                                                onChange={v => updateQuestion(idx, 'validationCode', v || '')}
-                                                language="python"
-                                            />
+                                    {q.rubric ? (
+                                        <div className="h-64 border border-[#27273a] rounded overflow-hidden flex flex-col">
+                                            <div className="bg-[#161622] px-3 py-1 text-xs text-yellow-500 border-b border-[#27273a] flex items-center justify-between">
+                                                <span>Rubric (grades this question; validation code is ignored)</span>
+                                                <button onClick={() => removeRubric(idx)} className="text-red-400 hover:text-red-300">Remove rubric</button>
+                                            </div>
+                                            <pre className="flex-1 overflow-auto p-3 text-xs text-gray-300 bg-[#1e1e2e]">
+                                                {JSON.stringify(q.rubric, null, 2)}
+                                            </pre>
                                         </div>
-                                    </div>
+                                    ) : (
+                                        <div className="h-64 border border-[#27273a] rounded overflow-hidden flex flex-col">
+                                            <div className="bg-[#161622] px-3 py-1 text-xs text-gray-500 border-b border-[#27273a]">Validation Code (Hidden assertion logic)</div>
+                                            <div className="flex-1 relative">
+                                                <CodeEditor
+                                                    initialValue={q.validationCode || ""}
+                                                    onChange={v => updateQuestion(idx, 'validationCode', v || '')}
+                                                    language="python"
+                                                />
+                                            </div>
+                                        </div>
+                                    )}
                                 </div>
                             </div>
                         </div>
@@ -1,10 +1,10 @@
 "use client";
 
 import React, { useState, useEffect, useCallback } from "react";
-import { Exam, GradeResult } from "@/lib/types";
+import { GradeResult, StudentExam } from "@/lib/types";
 import dynamic from "next/dynamic";
 import { Play, CheckCircle, Clock, ChevronRight, ChevronLeft, Save, Lightbulb, Shield, AlertTriangle, X, Monitor, Eye } from "lucide-react";
-import { runCode } from "@/lib/judge0";
+import { runCode, runWithValidation } from "@/lib/judge0";
 import { cn } from "@/lib/utils";
 import { useAppContext } from "@/context/AppContext";
 import { useExamSecurity, Violation } from "@/hooks/useExamSecurity";
@@ -17,7 +17,7 @@ const CodeEditor = dynamic(() => import("@/components/Editor/CodeEditor"), {
 });
 
 interface ExamInterfaceProps {
-    exam: Exam;
+    exam: StudentExam;
 }
 
 export default function ExamInterface({ exam }: ExamInterfaceProps) {
@@ -139,40 +139,17 @@ export default function ExamInterface({ exam }: ExamInterfaceProps) {
         setOutputs(prev => ({ ...prev, [currentQuestion.id]: "Running..." }));
 
         try {
-            let codeToRun: string;
-
-            if (currentQuestion.validationCode) {
-                // Wrap code to provide __STUDENT_CODE__ for validation
-                const studentCodeEscaped = currentCode
-                    .replace(/\\/g, '\\\\')
-                    .replace(/"""/g, '\\"\\"\\"');
-
-                codeToRun = `import ast
-import json
-
-# Student code as string for AST analysis
-__STUDENT_CODE__ = """${studentCodeEscaped}"""
-__exec_error__ = None
-
-# Execute student code
-try:
-    exec(__STUDENT_CODE__)
-except Exception as e:
-    __exec_error__ = str(e)
-
-# === VALIDATION ===
-${currentQuestion.validationCode}`;
-            } else {
-                // No validation - just run student code directly
-                codeToRun = currentCode;
-            }
+            // With validation, the server wraps the code with __STUDENT_CODE__ and the grading runtime.
+            // No validation - just run student code directly.
+            const result = currentQuestion.hasValidation
+                ? await runWithValidation(currentCode, exam.id, currentQuestion.id)
+                : await runCode(currentCode);
 
-            const result = await runCode(codeToRun);
             const output = (result.stdout || "") + (result.stderr || "");
 
             // Check for success (no errors) logic
             let statusMessage = "";
-            if (currentQuestion.validationCode) {
+            if (hasValidation) {
                 if (result.stderr) {
                     statusMessage = "\n\n❌ Test Failed: " + (result.stderr.split("AssertionError:")[1]?.trim() || "Check your logic.");
                 } else {
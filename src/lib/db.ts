@@ -36,6 +36,7 @@ export type {
     Lesson,
     Submission,
     Question,
+    RubricSpec,
     Exam,
     GradeResult,
     ExamSubmission,
@@ -166,6 +167,17 @@ const ensureDbInitialized = () => {
                     await client.query(`ALTER TABLE exam_submissions ADD COLUMN grade_details TEXT`);
                 }
 
+                // 6. Grade cache (second tier of src/lib/gradeCache.ts)
+                await client.query(`
+                    CREATE TABLE IF NOT EXISTS grade_cache (
+                        validation_hash TEXT NOT NULL,
+                        student_hash TEXT NOT NULL,
+                        result TEXT NOT NULL, -- JSON GradeResult without questionId
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (validation_hash, student_hash)
+                    );
+                `);
+
                 // 3. Seed Data
                 await seedCurriculum(client);
 
@@ -435,6 +447,41 @@ export const db = {
         query += ` ORDER BY timestamp DESC`;
         const res = await pool.query(query, values);
         return res.rows.map(mapRowToExamSubmission);
+    },
+
+    // --- GRADE CACHE ---
+    // Keyed by "validationHash:studentHash"; values are GradeResults without questionId
+    getCachedGrades: async (keys: { studentHash: string; validationHash: string }[]) => {
+        await ensureDbInitialized();
+        const res = await pool.query(`
+            SELECT validation_hash, student_hash, result FROM grade_cache
+            WHERE (validation_hash, student_hash) IN (
+                SELECT * FROM unnest($1::text[], $2::text[])
+            )
+        `, [keys.map(k => k.validationHash), keys.map(k => k.studentHash)]);
+        const grades = new Map<string, Omit<GradeResult, 'questionId'>>();
+        for (const row of res.rows) {
+            grades.set(`${row.validation_hash}:${row.student_hash}`, JSON.parse(row.result));
+        }
+        return grades;
+    },
+
+    saveCachedGrades: async (rows: { studentHash: string; validationHash: string; result: Omit<GradeResult, 'questionId'> }[]) => {
+        await ensureDbInitialized();
+        await pool.query(`
+            INSERT INTO grade_cache (validation_hash, student_hash, result)
+            SELECT * FROM unnest($1::text[], $2::text[], $3::text[])
+            ON CONFLICT (validation_hash, student_hash) DO NOTHING
+        `, [
+            rows.map(r => r.validationHash),
+            rows.map(r => r.studentHash),
+            rows.map(r => JSON.stringify(r.result))
+        ]);
+    },
+
+    deleteCachedGrades: async (validationHashes: string[]) => {
+        await ensureDbInitialized();
+        await pool.query(`DELETE FROM grade_cache WHERE validation_hash = ANY($1::text[])`, [validationHashes]);
     }
 };
 
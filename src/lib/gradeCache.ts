@@ -0,0 +1,196 @@
+import 'server-only';
+import { createHash } from 'crypto';
+import { db } from './db';
+import { getRuntimeSource } from './gradingRuntime';
+import type { GradeResult } from './types';
+
+/**
+ * Content-addressed grade cache.
+ *
+ * A grade depends only on the student's code and on how the question is
+ * graded, so identical answers (common on short questions) are graded once.
+ * Keys are hashes, never question ids:
+ *   studentHash    = 'ast:<canonical fingerprint>' for answers to a declarative
+ *                    rubric, when the static grading service is configured to
+ *                    compute it (grader/canonical.py: answers that differ only
+ *                    in formatting share one entry), else 'raw:<sha256(studentCode)>'
+ *   validationHash = sha256(runtime.py + gradingType + marker + maxPoints + staticOnly + budgets + validationCode)
+ * Editing a question's validation (or deploying a new runtime) changes its
+ * validationHash, so stale grades can never be hit; invalidateValidations()
+ * only frees their space.
+ *
+ * Tier 1: in-process LRU (GRADE_CACHE_SIZE entries, default 5000, 0 disables)
+ * Tier 2: Postgres table grade_cache when GRADE_CACHE_PERSIST=true, shared
+ *         by every server instance and kept across restarts.
+ */
+
+const CACHE_SIZE = parseInt(process.env.GRADE_CACHE_SIZE || '5000', 10);
+const PERSIST = process.env.GRADE_CACHE_PERSIST === 'true';
+
+export interface GradeCacheKey {
+    studentHash: string;
+    validationHash: string;
+}
+
+/**
+ * What decides a grade besides the student's code (see QuestionGradingSpec)
+ */
+export interface GradingInputs {
+    validationCode: string;
+    maxPoints: number;
+    gradingType: 'assertion' | 'rubric';
+    marker?: string;
+    staticOnly?: boolean;
+    outputBudget?: number;
+    stepBudget?: number;
+    memoryLimit?: number;
+}
+
+export type CachedGrade = Omit<GradeResult, 'questionId' | 'timings' | 'memory' | 'gradingHash'>;
+
+interface GlobalWithGradeCache { gradeCache?: Map<string, CachedGrade>; }
+const globalWithCache = global as GlobalWithGradeCache;
+const memory = globalWithCache.gradeCache || new Map<string, CachedGrade>();
+if (process.env.NODE_ENV !== 'production') globalWithCache.gradeCache = memory;
+
+let runtimeHash: string | null = null;
+
+function sha256(text: string): string {
+    return createHash('sha256').update(text, 'utf-8').digest('hex');
+}
+
+function memoryKey(key: GradeCacheKey): string {
+    return `${key.validationHash}:${key.studentHash}`;
+}
+
+function gradingParts(inputs: GradingInputs): string[] {
+    return [
+        inputs.gradingType, inputs.marker || '', String(inputs.maxPoints),
+        inputs.staticOnly ? 'static' : 'exec', String(inputs.outputBudget || ''),
+        String(inputs.stepBudget || ''), String(inputs.memoryLimit || ''), inputs.validationCode
+    ];
+}
+
+export function hashValidation(inputs: GradingInputs): string {
+    if (runtimeHash === null) runtimeHash = sha256(getRuntimeSource());
+    return sha256([runtimeHash, ...gradingParts(inputs)].join('\0'));
+}
+
+/**
+ * Like hashValidation() but without the runtime: it only changes when the
+ * question is edited, not on deploys. Stored as Question.gradingHash and
+ * GradeResult.gradingHash, so tools can tell which grades are out of date
+ * (scripts/regrade_exam.py).
+ */
+export function hashGradingInputs(inputs: GradingInputs): string {
+    return sha256(gradingParts(inputs).join('\0'));
+}
+
+/**
+ * Cache key of one answer. `studentKey` is its canonical key from the static
+ * grading service (see answerKeys() in rubricGrader.ts); without one the raw
+ * hash is used, like grader/canonical.py raw_key().
+ */
+export function gradeCacheKey(studentCode: string, inputs: GradingInputs, studentKey?: string): GradeCacheKey {
+    return {
+        studentHash: studentKey || `raw:${sha256(studentCode)}`,
+        validationHash: hashValidation(inputs)
+    };
+}
+
+function remember(key: string, grade: CachedGrade): void {
+    if (CACHE_SIZE <= 0) return;
+    memory.delete(key);
+    memory.set(key, grade);
+    while (memory.size > CACHE_SIZE) {
+        // Map iterates in insertion order: the first key is least recently used
+        memory.delete(memory.keys().next().value as string);
+    }
+}
+
+/**
+ * Cached grades for `keys`, in order (undefined = miss). Memory first, then
+ * one Postgres query for the rest; Postgres hits are promoted to memory.
+ */
+export async function lookupGrades(keys: GradeCacheKey[]): Promise<(CachedGrade | undefined)[]> {
+    const found: (CachedGrade | undefined)[] = keys.map(key => {
+        const id = memoryKey(key);
+        const grade = memory.get(id);
+        if (grade) remember(id, grade);
+        return grade;
+    });
+
+    const missing = keys.filter((_, i) => !found[i]);
+    if (!PERSIST || missing.length === 0) return found;
+
+    try {
+        const stored = await db.getCachedGrades(missing);
+        keys.forEach((key, i) => {
+            if (found[i]) return;
+            const grade = stored.get(memoryKey(key)) as CachedGrade | undefined;
+            if (grade) {
+                found[i] = grade;
+                remember(memoryKey(key), grade);
+            }
+        });
+    } catch (error) {
+        console.warn('[GradeCache] Postgres lookup failed, grading without it:', error);
+    }
+    return found;
+}
+
+const LIMIT_ERRORS = ['output_limit_exceeded', 'step_budget_exceeded', 'memory_limit_exceeded'];
+
+/**
+ * Whether a grade describes the answer rather than this run. Errors and
+ * timeouts may come from the sandbox, and a grade that hit a resource
+ * limit (or has functional-test cases stopped by one) may differ on a less
+ * loaded machine. Mirrored by grader/questions.py cacheable().
+ */
+export function isCacheable(result: GradeResult): boolean {
+    return result.status === 'graded'
+        && !result.errors.some(error => LIMIT_ERRORS.includes(error))
+        && !Object.values(result.tests || {}).some(counts => counts.limited);
+}
+
+/**
+ * Remember fresh grades that are isCacheable()
+ */
+export async function storeGrades(entries: { key: GradeCacheKey; result: GradeResult }[]): Promise<void> {
+    const cacheable = entries.filter(entry => isCacheable(entry.result));
+    if (cacheable.length === 0) return;
+
+    const rows = cacheable.map(({ key, result }) => {
+        // Timings and memory describe one run, not the answer
+        // eslint-disable-next-line @typescript-eslint/no-unused-vars
+        const { questionId, timings, memory: _memory, gradingHash, ...grade } = result;
+        remember(memoryKey(key), grade);
+        return { ...key, result: grade };
+    });
+
+    if (!PERSIST) return;
+    try {
+        await db.saveCachedGrades(rows);
+    } catch (error) {
+        console.warn('[GradeCache] Postgres write failed:', error);
+    }
+}
+
+/**
+ * Drop every cached grade for these validation hashes (both tiers)
+ */
+export async function invalidateValidations(validationHashes: string[]): Promise<void> {
+    if (validationHashes.length === 0) return;
+
+    const prefixes = validationHashes.map(hash => `${hash}:`);
+    for (const key of Array.from(memory.keys())) {
+        if (prefixes.some(prefix => key.startsWith(prefix))) memory.delete(key);
+    }
+
+    if (!PERSIST) return;
+    try {
+        await db.deleteCachedGrades(validationHashes);
+    } catch (error) {
+        console.warn('[GradeCache] Postgres invalidation failed:', error);
+    }
+}
@@ -0,0 +1,18 @@
+import 'server-only';
+import fs from 'fs';
+import path from 'path';
+
+/**
+ * Python grading runtime (grader/runtime.py) shipped with every grading script.
+ * Read once per server process and reused for all grades.
+ */
+let runtimeSource: string | null = null;
+
+export function getRuntimeSource(): string {
+    if (runtimeSource === null) {
+        const runtimePath = process.env.GRADER_RUNTIME_PATH
+            || path.join(process.cwd(), 'grader', 'runtime.py');
+        runtimeSource = fs.readFileSync(runtimePath, 'utf-8');
+    }
+    return runtimeSource;
+}
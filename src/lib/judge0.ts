@@ -85,3 +85,29 @@ export async function runCode(sourceCode: string): Promise<ExecutionResult> {
         throw new Error("Failed to execute code: " + (error as Error).message);
     }
 }
+
+export async function runWithValidation(
+    studentCode: string,
+    examId: string,
+    questionId: string
+): Promise<ExecutionResult> {
+    // Validation needs the grading runtime, which only the Next app serves
+    // (the Express backend has no /api/exam/run), so this never uses NEXT_PUBLIC_API_URL
+    const RUN_URL = '/api/exam/run';
+    console.log("[Judge0] Running code with validation...");
+    try {
+        const response = await axios.post(RUN_URL, {
+            studentCode,
+            // The route loads the question's validation itself
+            examId,
+            questionId
+        });
+        return response.data;
+    } catch (error: unknown) {
+        if (axios.isAxiosError(error)) {
+            console.error("[Judge0] Execution Error:", error.response?.data || error.message);
+            throw new Error(error.response?.data?.details || "Failed to execute code");
+        }
+        throw new Error("Failed to execute code: " + (error as Error).message);
+    }
+}
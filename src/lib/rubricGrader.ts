@@ -1,5 +1,10 @@
 import 'server-only';
-import { GradeResult } from './types';
+import { createHash } from 'crypto';
+import { Exam, FunctionalTests, GradeResult, Question, RubricSpec, StudentExam, ValidationArtifact } from './types';
+import { getRuntimeSource } from './gradingRuntime';
+import {
+    gradeCacheKey, hashGradingInputs, hashValidation, invalidateValidations, lookupGrades, storeGrades
+} from './gradeCache';
 
 const DEFAULT_RUBRIC_MARKER = '__RUBRIC__';
 
@@ -15,7 +20,7 @@ interface Judge0Response {
 /**
  * Execute code via Judge0 API (server-side)
  */
-async function executeCode(sourceCode: string): Promise<Judge0Response> {
+export async function executeCode(sourceCode: string): Promise<Judge0Response> {
     const judge0Url = process.env.JUDGE0_URL || 'http://129.212.236.32:2358';
 
     try {
@@ -40,27 +45,66 @@ async function executeCode(sourceCode: string): Promise<Judge0Response> {
     }
 }
 
+// ============================================================
+// RESULT FRAMES - see write_frame() in grader/runtime.py
+// ============================================================
+
+/**
+ * Payload of one `<marker><length>:<json>` line, or undefined if the line is
+ * not a complete frame (wrong marker, length mismatch, invalid JSON)
+ */
+function parseFrameLine(line: string, marker: string): unknown {
+    if (!line.startsWith(marker)) return undefined;
+    const rest = line.substring(marker.length);
+    const colon = rest.indexOf(':');
+    const length = rest.substring(0, colon);
+    if (colon <= 0 || !/^\d+$/.test(length)) return undefined;
+
+    const data = rest.substring(colon + 1);
+    if (data.length !== parseInt(length, 10)) return undefined;
+    try {
+        return JSON.parse(data);
+    } catch (e) {
+        console.error('[RubricGrader] Failed to parse result frame:', e);
+        return undefined;
+    }
+}
+
 /**
- * Parse rubric result from Judge0 output
+ * Payload of the `marker` frame that ends stdout. Anything printed before
+ * it (or a frame that is not last) is ignored.
+ */
+function readFinalFrame(stdout: string | null, marker: string): unknown {
+    if (!stdout) return undefined;
+    const trimmed = stdout.trimEnd();
+    return parseFrameLine(trimmed.substring(trimmed.lastIndexOf('\n') + 1), marker);
+}
+
+/**
+ * Parse the rubric result printed by validation code. Only validation's
+ * own output reaches this (student prints are captured apart), and the
+ * last marker line wins, so a student function called by validation
+ * cannot pre-empt the real result.
  */
 function parseRubricOutput(
     stdout: string | null,
     marker: string = DEFAULT_RUBRIC_MARKER
-): { score: number; maxScore: number; breakdown: Record<string, number>; errors: string[] } | null {
+): Pick<GradeResult, 'score' | 'maxScore' | 'breakdown' | 'errors' | 'tests'> | null {
     if (!stdout) return null;
 
-    const markerIndex = stdout.indexOf(marker);
+    const markerIndex = stdout.lastIndexOf(marker);
     if (markerIndex === -1) return null;
 
     try {
-        const jsonStr = stdout.substring(markerIndex + marker.length).trim();
+        const jsonStr = stdout.substring(markerIndex + marker.length).split('\n')[0].trim();
         const parsed = JSON.parse(jsonStr);
 
         return {
             score: typeof parsed.score === 'number' ? parsed.score : 0,
             maxScore: typeof parsed.max_score === 'number' ? parsed.max_score : 0,
             breakdown: parsed.breakdown || {},
-            errors: Array.isArray(parsed.errors) ? parsed.errors : []
+            errors: Array.isArray(parsed.errors) ? parsed.errors : [],
+            ...(parsed.tests && typeof parsed.tests === 'object' ? { tests: parsed.tests } : {})
         };
     } catch (e) {
         console.error('[RubricGrader] Failed to parse rubric JSON:', e);
@@ -68,110 +112,438 @@ function parseRubricOutput(
     }
 }
 
+function toBase64(text: string): string {
+    return Buffer.from(text, 'utf-8').toString('base64');
+}
+
 /**
- * Grade a student's code using rubric-based validation
- * 
- * @param studentCode - The student's submitted code
- * @param validationCode - The validation/grading code (should output __RUBRIC__ + JSON)
- * @param questionId - Question identifier
- * @param maxPoints - Maximum points for this question (fallback)
- * @param customMarker - Custom marker for parsing (default: __RUBRIC__)
+ * Build the script sent to Judge0:
+ * 1. Grading runtime (analyze(), CodeFacts, ...)
+ * 2. Define __STUDENT_CODE__ and execute it via exec (skipped for static validation)
+ * 3. Run validation code DIRECTLY (not via exec)
+ *
+ * Student output goes straight to stdout: this is the script behind the
+ * exam "Run" button. Grading uses buildExamCode(), which keeps the two apart.
  */
-export async function gradeWithRubric(
-    studentCode: string,
-    validationCode: string,
-    questionId: string,
-    maxPoints: number,
-    customMarker?: string
-): Promise<GradeResult> {
-    const marker = customMarker || DEFAULT_RUBRIC_MARKER;
-
+export function buildCombinedCode(studentCode: string, validationCode: string, staticOnly = false): string {
     // Base64 encode student code for safe embedding
     const base64StudentCode = Buffer.from(studentCode, 'utf-8').toString('base64');
+    const execution = staticOnly ? '' : `
+# Execute student code (output bounded, see run_student_program)
+__exec_error__ = run_student_program(__STUDENT_CODE__, globals())
+`;
 
-    // Build combined script:
-    // 1. Define __STUDENT_CODE__ 
-    // 2. Execute student code via exec
-    // 3. Run validation code DIRECTLY (not via exec)
-    const combinedCode = `import base64
-import ast
-import json
+    return `${getRuntimeSource()}
+
+import base64
 
 # Store student code as string (for AST analysis)
 __STUDENT_CODE__ = base64.b64decode("${base64StudentCode}").decode('utf-8')
 __exec_error__ = None
-
-# Execute student code
-try:
-    exec(__STUDENT_CODE__)
-except Exception as e:
-    __exec_error__ = str(e)
-
+${execution}
 # === VALIDATION CODE (runs directly, not via exec) ===
 ${validationCode}
 `;
+}
+
+/**
+ * Validation code for a declarative rubric: the runtime compiles the spec
+ * and prints the __RUBRIC__ line. JSON text is also a valid Python string literal.
+ * Functional tests call into the program, so they get its namespace
+ * (which also makes the question dynamic, see classify_validation).
+ */
+export function buildRubricValidation(spec: RubricSpec, marker: string = DEFAULT_RUBRIC_MARKER): string {
+    const specLiteral = JSON.stringify(JSON.stringify(spec));
+    const namespace = spec.criteria.some(criterion => criterion.tests) ? ', globals()' : '';
+    return `grade_rubric(${specLiteral}, __STUDENT_CODE__, ${JSON.stringify(marker)}${namespace})`;
+}
+
+/**
+ * Validation code to run for a question (declarative rubric wins over validationCode)
+ */
+export function getValidationCode(question: Question): string {
+    if (question.rubric) {
+        return buildRubricValidation(question.rubric, question.gradingFormat || undefined);
+    }
+    return question.validationCode || '';
+}
+
+/**
+ * What students may see of an exam: everything that grades it stays on the server
+ */
+export function toStudentExam(exam: Exam): StudentExam {
+    return {
+        ...exam,
+        questions: exam.questions.map(question => ({
+            id: question.id,
+            title: question.title,
+            description: question.description,
+            initialCode: question.initialCode,
+            points: question.points,
+            hints: question.hints,
+            hasValidation: Boolean(getValidationCode(question))
+        }))
+    };
+}
+
+/**
+ * How a question is graded, or null when it has nothing to grade with
+ */
+export function getQuestionGradingSpec(question: Question): QuestionGradingSpec | null {
+    const validationCode = getValidationCode(question);
+    if (!validationCode) return null;
+    return {
+        questionId: question.id,
+        validationCode,
+        maxPoints: question.points,
+        gradingType: question.gradingType === 'rubric' || question.rubric ? 'rubric' : 'assertion',
+        marker: question.gradingFormat || undefined,
+        staticOnly: question.staticGrading === true,
+        outputBudget: question.outputBudget,
+        stepBudget: question.stepBudget,
+        memoryLimit: question.memoryLimit,
+        validationArtifact: currentArtifact(question.validationArtifact, validationCode),
+        rubric: question.rubric || undefined
+    };
+}
+
+// ============================================================
+// EXAM PREPARATION - once per save, not once per grade
+// ============================================================
+
+const PREPARED_MARKER = '__PREPARED__';
+
+interface PreparedValidation {
+    static: boolean;
+    reasons: string[];
+    artifact?: Omit<ValidationArtifact, 'sourceHash'>;
+    error?: string;
+}
+
+const REFERENCE_MARKER = '__REFERENCE__';
+
+interface ReferenceOutput {
+    expected?: unknown[][];
+    error?: string;
+}
+
+/**
+ * Questions that cannot be graded as written; raised by prepareExam() so the exam is not saved
+ */
+export class ExamPreparationError extends Error {
+    constructor(message: string, public readonly problems: { questionId: string; error: string }[]) {
+        super(`${message}: ` + problems.map(p => `${p.questionId} (${p.error})`).join(', '));
+        this.name = 'ExamPreparationError';
+    }
+}
 
+/**
+ * A validation does not compile
+ */
+export class ValidationSyntaxError extends ExamPreparationError {
+    constructor(problems: { questionId: string; error: string }[]) {
+        super('Validation code does not compile', problems);
+        this.name = 'ValidationSyntaxError';
+    }
+}
+
+/**
+ * A reference solution cannot produce the expected outputs of its question's tests
+ */
+export class ReferenceSolutionError extends ExamPreparationError {
+    constructor(problems: { questionId: string; error: string }[]) {
+        super('Reference solution failed', problems);
+        this.name = 'ReferenceSolutionError';
+    }
+}
+
+function hashSource(source: string): string {
+    return createHash('sha256').update(source, 'utf-8').digest('hex');
+}
+
+/**
+ * The question's artifact, if it was compiled from this exact validation source
+ */
+function currentArtifact(artifact: ValidationArtifact | undefined, validationCode: string): ValidationArtifact | undefined {
+    return artifact && artifact.sourceHash === hashSource(validationCode) ? artifact : undefined;
+}
+
+/**
+ * Build one script that checks and compiles validation sources via prepare_validations()
+ */
+function buildPrepareCode(validationCodes: string[]): string {
+    const base64Payload = toBase64(JSON.stringify(validationCodes));
+
+    return `${getRuntimeSource()}
+
+prepare_validations(decode_payload("${base64Payload}"))
+finish()
+`;
+}
+
+function parsePreparedOutput(stdout: string | null): PreparedValidation[] | null {
+    const parsed = readFinalFrame(stdout, PREPARED_MARKER);
+    return Array.isArray(parsed) ? parsed : null;
+}
+
+function functionalTests(question: Question): FunctionalTests[] {
+    return (question.rubric?.criteria || []).flatMap(criterion => criterion.tests ? [criterion.tests] : []);
+}
+
+function hasExpectedOutputs(tests: FunctionalTests): boolean {
+    return Array.isArray(tests.expected) && tests.expected.length === tests.inputs.length;
+}
+
+/**
+ * Build one script that runs every reference solution on its tests' inputs via run_references()
+ */
+function buildReferenceCode(questions: Question[]): string {
+    const payload = questions.map(q => ({
+        code: q.referenceSolution,
+        tests: functionalTests(q).map(t => ({ function: t.function, inputs: t.inputs, time_limit: t.time_limit }))
+    }));
+    const base64Payload = toBase64(JSON.stringify(payload));
+
+    return `${getRuntimeSource()}
+
+run_references(decode_payload("${base64Payload}"))
+finish()
+`;
+}
+
+/**
+ * Fill in `expected` of every functional test from the question's
+ * reference solution: all reference solutions run once, in one sandbox
+ * run, so grading only compares against stored values. Mutates the
+ * rubrics of `questions` (copies made by prepareExam).
+ *
+ * If the sandbox run fails, outputs stored by the previous save are
+ * kept; without them the exam cannot be graded and is not saved.
+ */
+async function fillExpectedOutputs(questions: Question[]): Promise<void> {
+    const missing = questions
+        .filter(q => !q.referenceSolution && functionalTests(q).some(t => !hasExpectedOutputs(t)))
+        .map(q => ({ questionId: q.id, error: 'functional tests need expected outputs or a reference solution' }));
+    if (missing.length > 0) throw new ExamPreparationError('Functional tests cannot be graded', missing);
+
+    const referenced = questions.filter(q => q.referenceSolution && functionalTests(q).length > 0);
+    if (referenced.length === 0) return;
+
+    let outputs: ReferenceOutput[] | null = null;
     try {
-        const result = await executeCode(combinedCode);
+        const result = await executeCode(buildReferenceCode(referenced));
+        const parsed = result.status.id === 3 ? readFinalFrame(result.stdout, REFERENCE_MARKER) : null;
+        if (Array.isArray(parsed) && parsed.length === referenced.length) {
+            outputs = parsed;
+        } else {
+            console.warn(`[RubricGrader] Running reference solutions failed (${result.status.description})`);
+        }
+    } catch (error) {
+        console.error('[RubricGrader] Running reference solutions failed:', error);
+    }
+    if (!outputs) {
+        if (referenced.every(q => functionalTests(q).every(hasExpectedOutputs))) return;
+        throw new Error('Reference solutions could not be run and some functional tests have no expected outputs');
+    }
 
-        // Check for execution errors
-        if (result.status.id !== 3) { // 3 = Accepted
-            return {
-                questionId,
-                score: 0,
-                maxScore: maxPoints,
-                breakdown: {},
-                errors: [result.stderr || result.compile_output || result.status.description],
-                status: result.status.id === 5 ? 'timeout' : 'error'
-            };
+    const problems = referenced
+        .map((q, i) => ({ questionId: q.id, error: outputs![i].error }))
+        .filter((p): p is { questionId: string; error: string } => Boolean(p.error));
+    if (problems.length > 0) throw new ReferenceSolutionError(problems);
+
+    referenced.forEach((q, i) => {
+        functionalTests(q).forEach((tests, j) => {
+            tests.expected = outputs![i].expected![j];
+        });
+    });
+}
+
+/**
+ * Everything about grading that can be decided once per save, in one
+ * sandbox run (prepare_validations in grader/runtime.py):
+ *
+ * - Expected outputs of functional tests, from the question's reference
+ *   solution (a separate run first, see fillExpectedOutputs: they are
+ *   part of the rubric that is compiled next).
+ * - Validation is compiled by the sandbox's own Python and stored as a
+ *   versioned artifact, so grading skips parsing and compiling it. Code
+ *   that does not compile throws ValidationSyntaxError: the author sees
+ *   it now instead of every student at exam time.
+ * - Whether grading has to run the student program. Declarative rubrics
+ *   without functional tests only inspect the source, so they are static
+ *   by construction; free-form validation code is classified (classify_validation).
+ * - gradingHash, which tells stored grades of an earlier version of the
+ *   question apart (hashGradingInputs).
+ *
+ * Client-supplied flags, artifacts and hashes are overwritten. If the sandbox run
+ * fails the exam is saved without artifacts and every free-form question
+ * keeps executing the student code, which is always correct.
+ */
+export async function prepareExam(exam: Exam): Promise<Exam> {
+    const questions: Question[] = exam.questions.map(q => ({
+        ...q,
+        // Copied: expected outputs are written into it
+        rubric: q.rubric && JSON.parse(JSON.stringify(q.rubric)),
+        staticGrading: Boolean(q.rubric) && functionalTests(q).length === 0,
+        validationArtifact: undefined
+    }));
+    await fillExpectedOutputs(questions);
+    await compileValidations(questions);
+    for (const q of questions) {
+        const spec = getQuestionGradingSpec(q);
+        q.gradingHash = spec ? hashGradingInputs(spec) : undefined;
+    }
+    return { ...exam, questions };
+}
+
+/**
+ * Check, classify and compile every question's validation in one sandbox
+ * run (see prepareExam). Sets staticGrading and validationArtifact in place.
+ */
+async function compileValidations(questions: Question[]): Promise<void> {
+    const pending = questions.filter(q => getValidationCode(q));
+    if (pending.length === 0) return;
+
+    const sources = pending.map(q => getValidationCode(q));
+    let prepared: PreparedValidation[] | null = null;
+    try {
+        const result = await executeCode(buildPrepareCode(sources));
+        prepared = result.status.id === 3 ? parsePreparedOutput(result.stdout) : null;
+        if (!prepared || prepared.length !== pending.length) {
+            console.warn(`[RubricGrader] Preparing validation failed (${result.status.description}), saving without it`);
+            prepared = null;
         }
+    } catch (error) {
+        console.error('[RubricGrader] Preparing validation failed, saving without it:', error);
+    }
+    if (!prepared) return;
+
+    const problems = pending
+        .map((q, i) => ({ questionId: q.id, error: prepared![i].error }))
+        .filter((p): p is { questionId: string; error: string } => Boolean(p.error));
+    if (problems.length > 0) throw new ValidationSyntaxError(problems);
+
+    pending.forEach((q, i) => {
+        const verdict = prepared![i];
+        if (!q.rubric) q.staticGrading = verdict.static === true;
+        if (verdict.artifact) q.validationArtifact = { ...verdict.artifact, sourceHash: hashSource(sources[i]) };
+    });
+}
+
+/**
+ * Turn an execution result into a rubric GradeResult
+ */
+function toRubricGrade(
+    result: Judge0Response,
+    questionId: string,
+    maxPoints: number,
+    marker: string
+): GradeResult {
+    // Check for execution errors
+    if (result.status.id !== 3) { // 3 = Accepted
+        return {
+            questionId,
+            score: 0,
+            maxScore: maxPoints,
+            breakdown: {},
+            errors: [result.stderr || result.compile_output || result.status.description],
+            status: result.status.id === 5 ? 'timeout' : 'error'
+        };
+    }
 
-        // Parse rubric output
-        const rubricResult = parseRubricOutput(result.stdout, marker);
-
-        if (!rubricResult) {
-            // Fallback: If no rubric marker found, check for errors
-            if (result.stderr) {
-                return {
-                    questionId,
-                    score: 0,
-                    maxScore: maxPoints,
-                    breakdown: {},
-                    errors: ['assertion_failed'],
-                    status: 'graded'
-                };
-            }
-            // No errors = full points (simple pass/fail)
+    // Parse rubric output
+    const rubricResult = parseRubricOutput(result.stdout, marker);
+
+    if (!rubricResult) {
+        // Fallback: If no rubric marker found, check for errors
+        if (result.stderr) {
             return {
                 questionId,
-                score: maxPoints,
+                score: 0,
                 maxScore: maxPoints,
-                breakdown: { 'passed': maxPoints },
-                errors: [],
+                breakdown: {},
+                errors: ['assertion_failed'],
                 status: 'graded'
             };
         }
-
-        return {
-            questionId,
-            score: rubricResult.score,
-            maxScore: rubricResult.maxScore || maxPoints,
-            breakdown: rubricResult.breakdown,
-            errors: rubricResult.errors,
-            status: 'graded'
-        };
-
-    } catch (error) {
-        console.error('[RubricGrader] Grading failed:', error);
+        // No errors = full points (simple pass/fail)
         return {
             questionId,
-            score: 0,
+            score: maxPoints,
             maxScore: maxPoints,
-            breakdown: {},
-            errors: [error instanceof Error ? error.message : 'Unknown error'],
-            status: 'error'
+            breakdown: { 'passed': maxPoints },
+            errors: [],
+            status: 'graded'
         };
     }
+
+    return {
+        questionId,
+        score: rubricResult.score,
+        maxScore: rubricResult.maxScore || maxPoints,
+        breakdown: rubricResult.breakdown,
+        errors: rubricResult.errors,
+        ...(rubricResult.tests ? { tests: rubricResult.tests } : {}),
+        status: 'graded'
+    };
+}
+
+/**
+ * Turn an execution result into an assertion GradeResult
+ */
+function toAssertionGrade(result: Judge0Response, questionId: string, maxPoints: number): GradeResult {
+    // No stderr means passed
+    const passed = !result.stderr && result.status.id === 3;
+    // A failed assertion is a runtime error (NZEC); time limits, signals and
+    // internal errors may come from the sandbox rather than the answer
+    const status = result.status.id === 5 ? 'timeout'
+        : result.status.id === 3 || result.status.id === 11 ? 'graded' : 'error';
+
+    return {
+        questionId,
+        score: passed ? maxPoints : 0,
+        maxScore: maxPoints,
+        breakdown: passed ? { 'all_tests': maxPoints } : { 'all_tests': 0 },
+        errors: passed ? [] : ['assertion_failed'],
+        status
+    };
+}
+
+function toErrorGrade(error: unknown, questionId: string, maxPoints: number): GradeResult {
+    return {
+        questionId,
+        score: 0,
+        maxScore: maxPoints,
+        breakdown: {},
+        errors: [error instanceof Error ? error.message : 'Unknown error'],
+        status: 'error'
+    };
+}
+
+/**
+ * Grade a student's code using rubric-based validation
+ * 
+ * @param studentCode - The student's submitted code
+ * @param validationCode - The validation/grading code (should output __RUBRIC__ + JSON)
+ * @param questionId - Question identifier
+ * @param maxPoints - Maximum points for this question (fallback)
+ * @param customMarker - Custom marker for parsing (default: __RUBRIC__)
+ * @param staticOnly - Validation only inspects the source: do not run the student code
+ * @param artifact - Validation precompiled at exam save (see prepareExam)
+ */
+export async function gradeWithRubric(
+    studentCode: string,
+    validationCode: string,
+    questionId: string,
+    maxPoints: number,
+    customMarker?: string,
+    staticOnly = false,
+    artifact?: ValidationArtifact
+): Promise<GradeResult> {
+    return gradeSingleJob({
+        questionId, studentCode, validationCode, maxPoints, gradingType: 'rubric',
+        marker: customMarker, staticOnly, validationArtifact: artifact
+    });
 }
 
 /**
@@ -182,53 +554,312 @@ export async function gradeWithAssertion(
     studentCode: string,
     validationCode: string,
     questionId: string,
-    maxPoints: number
+    maxPoints: number,
+    staticOnly = false,
+    artifact?: ValidationArtifact
 ): Promise<GradeResult> {
-    // Base64 encode student code for safe embedding
-    const base64StudentCode = Buffer.from(studentCode, 'utf-8').toString('base64');
+    return gradeSingleJob({
+        questionId, studentCode, validationCode, maxPoints, gradingType: 'assertion',
+        staticOnly, validationArtifact: artifact
+    });
+}
 
-    // Build script: embed validation code directly (not via exec)
-    const combinedCode = `import base64
-import ast
-import json
+/**
+ * One question in its own execution, read back through the result frame
+ */
+async function gradeSingleJob(job: ExamGradingJob): Promise<GradeResult> {
+    try {
+        const result = await executeCode(buildExamCode([job]));
+        if (result.status.id !== 3) {
+            return job.gradingType === 'rubric'
+                ? toRubricGrade(result, job.questionId, job.maxPoints, job.marker || DEFAULT_RUBRIC_MARKER)
+                : toAssertionGrade(result, job.questionId, job.maxPoints);
+        }
 
-# Store student code as string
-__STUDENT_CODE__ = base64.b64decode("${base64StudentCode}").decode('utf-8')
-__exec_error__ = None
+        const outputs = parseBatchOutput(result.stdout);
+        if (!outputs || outputs.length !== 1) {
+            // Accepted but no result frame: the script was ended before grading finished
+            throw new Error('Grading produced no result');
+        }
+        return gradeJobOutput(job, outputs[0], result.memory);
+    } catch (error) {
+        console.error('[RubricGrader] Grading failed:', error);
+        return toErrorGrade(error, job.questionId, job.maxPoints);
+    }
+}
 
-# Execute student code
-try:
-    exec(__STUDENT_CODE__)
-except Exception as e:
-    __exec_error__ = str(e)
+// ============================================================
+// BATCH GRADING - whole exam in one execution
+// ============================================================
 
-# === VALIDATION CODE ===
-${validationCode}
+const BATCH_MARKER = '__BATCH__';
+
+/**
+ * One question of a student's exam, ready to grade
+ */
+export interface ExamGradingJob {
+    questionId: string;
+    studentCode: string;
+    validationCode: string;
+    maxPoints: number;
+    gradingType: 'assertion' | 'rubric';
+    marker?: string;
+    staticOnly?: boolean;
+    outputBudget?: number;
+    stepBudget?: number;
+    memoryLimit?: number;
+    validationArtifact?: ValidationArtifact;
+    // The declarative rubric validationCode was built from: answers are then
+    // cached by canonical fingerprint (see answerKeys())
+    rubric?: RubricSpec;
+}
+
+/**
+ * How to grade one question (an ExamGradingJob without the answer)
+ */
+export type QuestionGradingSpec = Omit<ExamGradingJob, 'studentCode'>;
+
+interface BatchQuestionOutput {
+    id: string;
+    ok: boolean;
+    stdout: string;
+    stderr: string;
+    // Last characters the student's program printed, and whether it was stopped for printing too much
+    output?: string;
+    output_exceeded?: boolean;
+    // The student's code was stopped by the question's step budget
+    step_budget_exceeded?: boolean;
+    // Peak bytes the student's program allocated, and whether it was stopped by the memory limit
+    peak_memory?: number | null;
+    memory_exceeded?: boolean;
+    // Milliseconds per phase (decode, load, student, parse, validation, total), see grader/runtime.py
+    timings?: Record<string, number>;
+}
+
+/**
+ * Build one script that grades every job via run_exam() (grader/runtime.py).
+ * Each question runs in its own namespace inside a single interpreter.
+ */
+export function buildExamCode(jobs: ExamGradingJob[]): string {
+    const payload = jobs.map(job => ({
+        id: job.questionId,
+        code: job.studentCode,
+        validation: job.validationCode,
+        static: job.staticOnly === true,
+        artifact: job.validationArtifact || null,
+        output_budget: job.outputBudget || null,
+        step_budget: job.stepBudget || null,
+        memory_limit: job.memoryLimit || null
+    }));
+    const base64Payload = Buffer.from(JSON.stringify(payload), 'utf-8').toString('base64');
+
+    return `${getRuntimeSource()}
+
+run_exam(decode_payload("${base64Payload}"))
+finish()
 `;
+}
+
+/**
+ * Parse the per-question results framed by run_exam()
+ */
+function parseBatchOutput(stdout: string | null): BatchQuestionOutput[] | null {
+    const parsed = readFinalFrame(stdout, BATCH_MARKER);
+    return Array.isArray(parsed) ? parsed : null;
+}
+
+function gradeJobOutput(job: ExamGradingJob, output: BatchQuestionOutput, sandboxKb?: number): GradeResult {
+    // Present each question like its own Judge0 run so both paths grade identically
+    const result: Judge0Response = {
+        stdout: output.stdout,
+        stderr: output.stderr || null,
+        status: output.ok
+            ? { id: 3, description: 'Accepted' }
+            : { id: 11, description: 'Runtime Error (NZEC)' },
+        compile_output: null,
+        time: '0',
+        memory: 0
+    };
+    const grade = job.gradingType === 'rubric'
+        ? toRubricGrade(result, job.questionId, job.maxPoints, job.marker || DEFAULT_RUBRIC_MARKER)
+        : toAssertionGrade(result, job.questionId, job.maxPoints);
+    if (output.output_exceeded) grade.errors = [...grade.errors, 'output_limit_exceeded'];
+    if (output.step_budget_exceeded) grade.errors = [...grade.errors, 'step_budget_exceeded'];
+    if (output.memory_exceeded) grade.errors = [...grade.errors, 'memory_limit_exceeded'];
+    if (output.timings) grade.timings = output.timings;
+    if (sandboxKb || output.peak_memory !== undefined) {
+        grade.memory = { sandboxKb: sandboxKb || undefined, peakBytes: output.peak_memory };
+    }
+    return grade;
+}
+
+async function gradeJobSeparately(job: ExamGradingJob): Promise<GradeResult> {
+    // The whole job, so its budgets and memory limit still apply
+    return gradeSingleJob(job);
+}
+
+// Sandbox runs in flight at once when a failed batch is regraded job by job
+const SEPARATE_GRADING_CONCURRENCY = parseInt(process.env.GRADING_FALLBACK_CONCURRENCY || '10', 10);
+
+/**
+ * Grade jobs one sandbox run each, at most SEPARATE_GRADING_CONCURRENCY
+ * at a time; results are in job order.
+ */
+async function gradeJobsSeparately(jobs: ExamGradingJob[]): Promise<GradeResult[]> {
+    const results: GradeResult[] = new Array(jobs.length);
+    let next = 0;
+    const worker = async () => {
+        while (next < jobs.length) {
+            const i = next++;
+            results[i] = await gradeJobSeparately(jobs[i]);
+        }
+    };
+    const workers = Math.max(1, Math.min(SEPARATE_GRADING_CONCURRENCY, jobs.length));
+    await Promise.all(Array.from({ length: workers }, worker));
+    return results;
+}
+
+// ============================================================
+// STATIC GRADING SERVICE - AST-only questions without Judge0
+// ============================================================
+
+const STATIC_GRADER_URL = process.env.STATIC_GRADER_URL;
+
+type StaticOutput = BatchQuestionOutput | { id: string; error: string };
+
+/**
+ * Grade static-only jobs on the static grading service (grader/static_service.py)
+ * when STATIC_GRADER_URL is set. Returns one result per job, or null for
+ * jobs the service could not grade; the caller sends those to Judge0.
+ */
+async function gradeStatically(jobs: ExamGradingJob[]): Promise<(GradeResult | null)[]> {
+    if (!STATIC_GRADER_URL || jobs.length === 0) return jobs.map(() => null);
 
     try {
-        const result = await executeCode(combinedCode);
+        const response = await fetch(`${STATIC_GRADER_URL}/grade`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                jobs: jobs.map(job => ({ id: job.questionId, code: job.studentCode, validation: job.validationCode }))
+            })
+        });
+        if (!response.ok) throw new Error(`Static grader error: ${response.status}`);
 
-        // No stderr means passed
-        const passed = !result.stderr && result.status.id === 3;
+        const { results } = await response.json() as { results: StaticOutput[] };
+        return jobs.map((job, i) => {
+            const output = results[i];
+            if (!output || 'error' in output) return null;
+            return gradeJobOutput(job, output);
+        });
+    } catch (error) {
+        console.warn('[RubricGrader] Static grading service unavailable, using Judge0:', error);
+        return jobs.map(() => null);
+    }
+}
 
-        return {
-            questionId,
-            score: passed ? maxPoints : 0,
-            maxScore: maxPoints,
-            breakdown: passed ? { 'all_tests': maxPoints } : { 'all_tests': 0 },
-            errors: passed ? [] : ['assertion_failed'],
-            status: 'graded'
-        };
+/**
+ * Grade cache keys of the rubric jobs' answers from the static grading
+ * service (grader/canonical.py cache_key()), undefined for the other jobs
+ * or when the service is not configured or unavailable: those answers are
+ * keyed by their raw hash.
+ */
+async function answerKeys(jobs: ExamGradingJob[]): Promise<(string | undefined)[]> {
+    const rubricJobs = jobs.filter(job => job.rubric);
+    if (!STATIC_GRADER_URL || rubricJobs.length === 0) return jobs.map(() => undefined);
 
+    try {
+        const response = await fetch(`${STATIC_GRADER_URL}/keys`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ answers: rubricJobs.map(job => ({ code: job.studentCode, rubric: job.rubric })) })
+        });
+        if (!response.ok) throw new Error(`Static grader error: ${response.status}`);
+
+        const { keys } = await response.json() as { keys: string[] };
+        const byJob = new Map(rubricJobs.map((job, i) => [job, keys[i]]));
+        return jobs.map(job => byJob.get(job));
     } catch (error) {
-        return {
-            questionId,
-            score: 0,
-            maxScore: maxPoints,
-            breakdown: {},
-            errors: [error instanceof Error ? error.message : 'Unknown error'],
-            status: 'error'
-        };
+        console.warn('[RubricGrader] Static grading service unavailable, caching by raw hash:', error);
+        return jobs.map(() => undefined);
+    }
+}
+
+/**
+ * Grade all of one student's answers in a single Judge0 execution.
+ *
+ * Returns one GradeResult per job, in order. Answers already in the grade
+ * cache are not executed, and static-only questions go to the static
+ * grading service when one is configured. If the batch run as a whole fails (e.g. one
+ * answer loops until the time limit), every question is regraded
+ * separately so a single bad answer cannot zero the exam.
+ */
+export async function gradeExam(jobs: ExamGradingJob[]): Promise<GradeResult[]> {
+    if (jobs.length === 0) return [];
+
+    const studentKeys = await answerKeys(jobs);
+    const keys = jobs.map((job, i) => gradeCacheKey(job.studentCode, job, studentKeys[i]));
+    const cached = await lookupGrades(keys);
+    const pending = jobs.filter((_, i) => !cached[i]);
+    const pendingKeys = keys.filter((_, i) => !cached[i]);
+    const fresh = await executeExam(pending);
+    await storeGrades(fresh.map((result, i) => ({ key: pendingKeys[i], result })));
+
+    let next = 0;
+    return jobs.map((job, i) => {
+        const grade = cached[i];
+        return grade ? { ...grade, questionId: job.questionId } : fresh[next++];
+    });
+}
+
+async function executeExam(jobs: ExamGradingJob[]): Promise<GradeResult[]> {
+    const staticJobs = jobs.filter(job => job.staticOnly);
+    const staticResults = await gradeStatically(staticJobs);
+    const graded = new Map<ExamGradingJob, GradeResult>();
+    staticJobs.forEach((job, i) => {
+        if (staticResults[i]) graded.set(job, staticResults[i]!);
+    });
+
+    const remaining = jobs.filter(job => !graded.has(job));
+    const executed = await executeExamInSandbox(remaining);
+    remaining.forEach((job, i) => graded.set(job, executed[i]));
+    return jobs.map(job => graded.get(job)!);
+}
+
+async function executeExamInSandbox(jobs: ExamGradingJob[]): Promise<GradeResult[]> {
+    if (jobs.length === 0) return [];
+
+    try {
+        const result = await executeCode(buildExamCode(jobs));
+        const outputs = result.status.id === 3 ? parseBatchOutput(result.stdout) : null;
+
+        if (outputs && outputs.length === jobs.length) {
+            return jobs.map((job, i) => gradeJobOutput(job, outputs[i], result.memory));
+        }
+        console.warn(`[RubricGrader] Batch run failed (${result.status.description}), grading questions separately`);
+    } catch (error) {
+        console.error('[RubricGrader] Batch grading failed, grading questions separately:', error);
+    }
+
+    return gradeJobsSeparately(jobs);
+}
+
+/**
+ * Drop cached grades of questions whose grading changed between two
+ * versions of an exam (called when an exam is saved).
+ */
+export async function invalidateChangedQuestions(before: Question[], after: Question[]): Promise<void> {
+    const current = new Map<string, string>();
+    for (const question of after) {
+        const spec = getQuestionGradingSpec(question);
+        if (spec) current.set(question.id, hashValidation(spec));
+    }
+
+    const stale: string[] = [];
+    for (const question of before) {
+        const spec = getQuestionGradingSpec(question);
+        if (!spec) continue;
+        const hash = hashValidation(spec);
+        if (current.get(question.id) !== hash) stale.push(hash);
     }
+    await invalidateValidations(stale);
 }
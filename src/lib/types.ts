@@ -11,6 +11,99 @@ export interface Question {
     gradingType?: 'assertion' | 'rubric';
     hints?: string;
     gradingFormat?: string;
+    // Declarative rubric, compiled by the grading runtime (replaces validationCode)
+    rubric?: RubricSpec;
+    // A correct answer: when the exam is saved it is run once on the inputs of
+    // the rubric's functional tests to fill in their expected outputs
+    referenceSolution?: string;
+    // Set when the exam is saved: validation only inspects the source, so
+    // grading skips running the student program (classify_validation in grader/runtime.py)
+    staticGrading?: boolean;
+    // Bytes the student's program may print while graded (default 1 MB, OUTPUT_BUDGET in grader/runtime.py)
+    outputBudget?: number;
+    // Opt-in: lines the student's code may execute (sys.settrace); past that it is
+    // stopped and graded as is, with 'step_budget_exceeded' in the errors
+    stepBudget?: number;
+    // Opt-in: bytes the student's program may hold (tracemalloc); past that it is
+    // stopped and graded as is, with 'memory_limit_exceeded' in the errors
+    memoryLimit?: number;
+    // Set when the exam is saved: validation compiled once for the sandbox's Python
+    // (prepare_validations in grader/runtime.py), so grading does not recompile it
+    validationArtifact?: ValidationArtifact;
+    // Set when the exam is saved: hash of everything that decides this question's
+    // grades (hashGradingInputs in src/lib/gradeCache.ts)
+    gradingHash?: string;
+}
+
+/**
+ * Validation code compiled by the grading runtime: a marshal'd code object,
+ * only loadable by the bytecode version (`magic`) that wrote it.
+ * `sourceHash` (sha256 of the validation source) ties it to the code it came from.
+ */
+export interface ValidationArtifact {
+    format: number;
+    magic: string;
+    python: string;
+    code: string;
+    sourceHash: string;
+}
+
+/**
+ * One check on the student's code (exactly one kind per object),
+ * e.g. { function: 'tambah', params: 2 }, { calls: 'print' }, { binop: 'Mult' }
+ * See grader/runtime.py for the full list.
+ */
+export type RubricCheck =
+    | { function: string; params?: number }
+    | { calls: string }
+    | { method: string }
+    | { binop: string }
+    | { node: string | string[] }
+    | { loop: boolean }
+    | { return: boolean }
+    | { assigns: string }
+    | { mod_compare: [number, string, number] }
+    | { all: RubricCheck[] }
+    | { any: RubricCheck[] }
+    | { not: RubricCheck };
+
+export interface RubricCriterion {
+    name: string;
+    points: number;
+    // Exactly one of check (inspects the source) and tests (calls the student's function)
+    check?: RubricCheck;
+    tests?: FunctionalTests;
+    error?: string;
+    partial?: { check: RubricCheck; points: number; error?: string }[];
+}
+
+/**
+ * Calls of the student's function, all in one grading run; the criterion
+ * earns its points in proportion to the cases passed (see FUNCTIONAL TESTS
+ * in grader/runtime.py). `inputs[i]` is the argument list of case i.
+ * `expected` is computed at save when the question has a referenceSolution.
+ */
+export interface FunctionalTests {
+    function: string;
+    inputs: unknown[][];
+    expected?: unknown[];
+    tolerance?: number;     // floats compare within this (relative and absolute)
+    time_limit?: number;    // seconds per case
+    max_failures?: number;  // stop after this many failing cases
+}
+
+export interface TestCounts {
+    passed: number;
+    failed: number;
+    skipped: number;
+    total: number;
+    // Cases stopped by the time limit or a limit of the whole run (absent when none)
+    limited?: number;
+}
+
+export interface RubricSpec {
+    max_score?: number;
+    criteria: RubricCriterion[];
 }
 
 export interface Exam {
@@ -23,6 +116,19 @@ export interface Exam {
     createdAt: string;
 }
 
+/**
+ * A question as the exam page sends it to the browser: no validation,
+ * rubric (expected outputs), reference solution or artifact (toStudentExam)
+ */
+export type StudentQuestion = Pick<Question, 'id' | 'title' | 'description' | 'initialCode' | 'points' | 'hints'> & {
+    // Whether the Run button checks the answer (the server loads the validation)
+    hasValidation: boolean;
+};
+
+export interface StudentExam extends Omit<Exam, 'questions'> {
+    questions: StudentQuestion[];
+}
+
 export interface GradeResult {
     questionId: string;
     score: number;
@@ -30,6 +136,16 @@ export interface GradeResult {
     breakdown: Record<string, number>;
     errors: string[];
     status: 'graded' | 'error' | 'timeout';
+    // Milliseconds per grading phase, measured inside the sandbox (absent for cached grades)
+    timings?: Record<string, number>;
+    // Memory of the run (absent for cached grades): what Judge0 reports for the
+    // whole sandbox (KB, shared by a batch) and the student program's peak
+    // measured by the runtime (bytes, null when it could not be measured)
+    memory?: { sandboxKb?: number; peakBytes?: number | null };
+    // Functional test counts per rubric criterion that has tests
+    tests?: Record<string, TestCounts>;
+    // Question.gradingHash when this grade was computed: differs once the question is edited
+    gradingHash?: string;
 }
 
 export interface ExamSubmission {
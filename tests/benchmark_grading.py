@@ -0,0 +1,289 @@
+"""
+Micro-benchmarks for the Python side of grading.
+
+    python tests/benchmark_grading.py                  # run, compare with the baseline
+    python tests/benchmark_grading.py --quick          # fewer iterations
+    python tests/benchmark_grading.py --only ast --only facts
+    python tests/benchmark_grading.py --save-baseline  # accept this run as the new baseline
+
+Benchmarks:
+  engine      run_grading_engine() (tests/test_grading_engine.py): the
+              combined script built and executed in-process
+  ast         ast.parse + CodeFacts per KB of student code (1-64 KB)
+  facts       a rubric graded from one CodeFacts walk vs one walk per criterion
+  alpro       the full script the app sends to Judge0 for each of the ten
+              Alpro questions, run in the local sandbox (grader/executor.py)
+
+Each reports latency percentiles (ms) and throughput (runs/s). Results go
+to tests/k6/results/grading_benchmark_results.json; with a baseline
+(grading_benchmark_baseline.json next to it) every benchmark whose p50
+is more than --threshold slower is a regression and the exit status is 1.
+Baselines are machine-specific: save one on the machine you compare on.
+"""
+
+import argparse
+import ast
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from create_alpro_exam import EXAM
+from grader.executor import ExecutionLimits, run_source
+from grader.questions import BATCH_MARKER, exam_script, grading_job, validation_code
+from grader.runtime import CodeFacts, compile_check, read_final_frame
+from reference_answers import CORRECT_ANSWERS
+from test_grading_engine import run_grading_engine
+
+RESULTS_DIR = os.path.join(ROOT, 'tests', 'k6', 'results')
+RESULTS_PATH = os.path.join(RESULTS_DIR, 'grading_benchmark_results.json')
+BASELINE_PATH = os.path.join(RESULTS_DIR, 'grading_benchmark_baseline.json')
+AST_SIZES_KB = (1, 4, 16, 64)
+
+# ============================================================
+# MEASURING
+# ============================================================
+
+def percentile(sorted_samples: List[float], p: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, -(-len(sorted_samples) * p // 100))
+    return sorted_samples[int(rank) - 1]
+
+
+def summarize(samples_ms: List[float], **extra) -> Dict:
+    ordered = sorted(samples_ms)
+    total = sum(ordered)
+    summary = {
+        'runs': len(ordered),
+        'mean_ms': round(total / len(ordered), 4),
+        'p50_ms': round(percentile(ordered, 50), 4),
+        'p90_ms': round(percentile(ordered, 90), 4),
+        'p99_ms': round(percentile(ordered, 99), 4),
+        'max_ms': round(ordered[-1], 4),
+        'throughput_per_s': round(len(ordered) / (total / 1000), 2) if total else 0.0,
+    }
+    summary.update(extra)
+    return summary
+
+
+def measure(run: Callable[[], object], iterations: int, warmup: int = 3, **extra) -> Dict:
+    """Time `iterations` calls of `run` (after `warmup` untimed ones) with the GC off, like timeit."""
+    for _ in range(warmup):
+        run()
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return summarize(samples, **extra)
+
+
+# ============================================================
+# BENCHMARKS
+# ============================================================
+
+def _question(question_id: str) -> Dict:
+    return next(q for q in EXAM['questions'] if q['id'] == question_id)
+
+
+def student_program(size_kb: int) -> str:
+    """Plausible student code (functions, loops, conditions) of about `size_kb` KB."""
+    block = (
+        "def hitung_{i}(daftar, batas):\n"
+        "    total = 0\n"
+        "    for x in daftar:\n"
+        "        if x % 2 == 0 and x < batas:\n"
+        "            total += x * 2\n"
+        "        elif x > batas:\n"
+        "            print('lewat', x)\n"
+        "    return total / len(daftar)\n\n"
+        "hasil_{i} = hitung_{i}([1, 2, 3, 4, 5], {i})\n\n"
+    )
+    parts, size, i = [], 0, 0
+    while size < size_kb * 1024:
+        part = block.format(i=i)
+        parts.append(part)
+        size += len(part)
+        i += 1
+    return ''.join(parts)
+
+
+def bench_engine(iterations: int) -> Dict[str, Dict]:
+    question = _question('Q6')
+    validation = validation_code(question)
+    code = CORRECT_ANSWERS['Q6']
+
+    def run():
+        result = run_grading_engine(code, validation)
+        assert result['success'] and '__RUBRIC__' in result['output'], result
+    return {'engine.run_grading_engine': measure(run, iterations)}
+
+
+def bench_ast(iterations: int) -> Dict[str, Dict]:
+    results = {}
+    for size_kb in AST_SIZES_KB:
+        source = student_program(size_kb)
+        kb = len(source) / 1024
+        result = measure(lambda: CodeFacts(ast.parse(source)), max(5, iterations // size_kb), kb=round(kb, 2))
+        result['ms_per_kb'] = round(result['p50_ms'] / kb, 4)
+        results['ast.parse_and_facts.%dkb' % size_kb] = result
+    return results
+
+
+def bench_facts(iterations: int) -> Dict[str, Dict]:
+    """Every Alpro rubric on a 4 KB program: one walk for all criteria vs one per criterion."""
+    tree = ast.parse(student_program(4) + CORRECT_ANSWERS['Q6'])
+    checks = [compile_check(criterion['check'])
+              for question in EXAM['questions'] for criterion in question['rubric']['criteria']]
+
+    def single_walk():
+        facts = CodeFacts(tree)
+        return [check(facts) for check in checks]
+
+    def walk_per_criterion():
+        return [check(CodeFacts(tree)) for check in checks]
+
+    assert single_walk() == walk_per_criterion()
+    single = measure(single_walk, iterations, criteria=len(checks))
+    repeated = measure(walk_per_criterion, max(3, iterations // 4), criteria=len(checks))
+    repeated['vs_single_walk'] = round(repeated['p50_ms'] / single['p50_ms'], 2) if single['p50_ms'] else None
+    return {'facts.single_walk': single, 'facts.walk_per_criterion': repeated}
+
+
+def bench_alpro(iterations: int) -> Dict[str, Dict]:
+    limits = ExecutionLimits()
+    results = {}
+    for question in EXAM['questions']:
+        script = exam_script([grading_job(question, CORRECT_ANSWERS[question['id']])])
+
+        def run(script=script):
+            execution = run_source(script, '', limits)
+            output = read_final_frame(execution.get('stdout') or '', BATCH_MARKER)
+            assert execution['status']['id'] == 3 and output and output[0]['ok'], execution
+        results['alpro.full_script.%s' % question['id']] = measure(run, iterations, warmup=1)
+    return results
+
+
+BENCHMARKS = {
+    'engine': (bench_engine, 50),
+    'ast': (bench_ast, 200),
+    'facts': (bench_facts, 500),
+    'alpro': (bench_alpro, 20),
+}
+
+
+# ============================================================
+# BASELINE
+# ============================================================
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[Dict]:
+    """p50 of every benchmark in both runs; `regressed` when slower by more than `threshold`."""
+    rows = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if not before or not before.get('p50_ms'):
+            continue
+        ratio = result['p50_ms'] / before['p50_ms']
+        rows.append({'name': name, 'baseline_ms': before['p50_ms'], 'current_ms': result['p50_ms'],
+                     'ratio': round(ratio, 3), 'regressed': ratio > 1 + threshold})
+    return rows
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Dict]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('benchmarks', {})
+
+
+def write_results(path: str, benchmarks: Dict[str, Dict]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    report = {
+        'generated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': '%s %s (%d cpus)' % (platform.system(), platform.machine(), os.cpu_count() or 1),
+        'benchmarks': benchmarks,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+
+def run_benchmarks(only: Optional[List[str]] = None, scale: float = 1.0) -> Dict[str, Dict]:
+    results = {}
+    for name, (bench, iterations) in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        started = time.perf_counter()
+        results.update(bench(max(3, int(iterations * scale))))
+        print(f"  ⏱  {name} done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return results
+
+
+def format_table(results: Dict[str, Dict]) -> str:
+    lines = ['%-34s %7s %9s %9s %9s %9s %10s' % ('benchmark', 'runs', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms', 'runs/s')]
+    for name, r in results.items():
+        lines.append('%-34s %7d %9.3f %9.3f %9.3f %9.3f %10.1f' % (
+            name, r['runs'], r['p50_ms'], r['p90_ms'], r['p99_ms'], r['max_ms'], r['throughput_per_s']))
+    return '\n'.join(lines)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the grading engine')
+    parser.add_argument('--only', action='append', choices=sorted(BENCHMARKS), help='run only this benchmark')
+    parser.add_argument('--quick', action='store_true', help='a tenth of the iterations')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed p50 slowdown vs baseline (0.25 = 25%%)')
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print("⏱  GRADING ENGINE BENCHMARKS")
+    print("=" * 60)
+    results = run_benchmarks(args.only, 0.1 if args.quick else 1.0)
+    print(format_table(results))
+    write_results(args.output, results)
+    print(f"\n📄 Results: {os.path.relpath(args.output, ROOT)}")
+
+    if args.save_baseline:
+        baseline = load_baseline(args.baseline) or {}
+        baseline.update(results)
+        write_results(args.baseline, baseline)
+        print(f"📌 Baseline saved: {os.path.relpath(args.baseline, ROOT)}")
+        return
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("No baseline yet: run with --save-baseline to store one")
+        return
+    rows = compare(results, baseline, args.threshold)
+    regressions = [row for row in rows if row['regressed']]
+    for row in rows:
+        mark = '❌' if row['regressed'] else '✅'
+        print(f"  {mark} {row['name']:<34} p50 {row['baseline_ms']:.3f} → {row['current_ms']:.3f} ms "
+              f"({(row['ratio'] - 1) * 100:+.0f}%)")
+    if regressions:
+        print(f"⚠️ {len(regressions)} benchmark(s) more than {args.threshold:.0%} slower than the baseline")
+        sys.exit(1)
+    print(f"🎉 No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,387 @@
+"""
+Load generator for the exam flow: N simulated students against a local (or any) server.
+
+    python tests/load_exam.py --students 100                       # closed loop: 100 students at once
+    python tests/load_exam.py --students 100 --ramp 60 --think 5,30
+    python tests/load_exam.py --mode open --rate 5 --duration 60   # open loop: 5 arrivals/s for a minute
+    python tests/load_exam.py --base-url http://localhost:3000 --output tests/k6/results/load_exam_results.json
+
+Each student fetches the exam page (GET /exam/{id}), thinks for a random
+time, then submits (POST /api/exam/submit) a mix of correct, wrong and
+partial answers from tests/reference_answers.py (--mix, per question).
+
+Closed loop: --students students, started together (or over --ramp
+seconds), each taking the exam --iterations times; a slow server slows
+the arrivals down. Open loop: a new student arrives every 1/--rate
+seconds whatever the server does, so queueing shows up as latency;
+latency is measured from the scheduled arrival (no coordinated omission)
+and --max-in-flight drops arrivals past that many active students.
+
+Latencies go into HDR-style histograms per phase (fetch, submit, and the
+whole student session) and per question (grading time reported by the
+server in gradeDetails[...].timings.total).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import ssl
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from reference_answers import CORRECT_ANSWERS, PARTIAL_ANSWERS, WRONG_ANSWERS
+
+BASE_URL = os.environ.get('BASE_URL', 'http://localhost:3000')
+EXAM_ID = os.environ.get('EXAM_ID', 'alpro-functions')
+ANSWERS = {'correct': CORRECT_ANSWERS, 'wrong': WRONG_ANSWERS, 'partial': PARTIAL_ANSWERS}
+FALLBACK_ANSWERS = {'correct': "print('ok')", 'wrong': 'x = 0', 'partial': 'x = 0'}
+PERCENTILES = (50, 90, 99, 99.9)
+
+# ============================================================
+# HISTOGRAM
+# ============================================================
+
+class Histogram:
+    """
+    Latency histogram with HdrHistogram's log-linear buckets: values
+    (recorded in microseconds) keep `digits` significant decimal digits
+    at any magnitude, in constant memory per order of magnitude.
+    """
+
+    def __init__(self, digits: int = 2):
+        self.sub_bits = max(1, math.ceil(math.log2(2 * 10 ** digits)))
+        self.counts: Dict[Tuple[int, int], int] = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def _bucket(self, value_us: int) -> Tuple[int, int]:
+        shift = max(0, value_us.bit_length() - self.sub_bits)
+        return shift, value_us >> shift
+
+    def record(self, value_ms: float) -> None:
+        value_us = max(0, int(round(value_ms * 1000)))
+        key = self._bucket(value_us)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.count += 1
+        self.total_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+
+    def merge(self, other: 'Histogram') -> None:
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, p: float) -> float:
+        """Highest value (ms) equivalent to the p-th percentile's bucket, like HdrHistogram."""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for shift, sub in sorted(self.counts, key=lambda key: key[1] << key[0]):
+            seen += self.counts[(shift, sub)]
+            if seen >= target:
+                return min(((sub + 1) << shift) - 1, self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self) -> Dict:
+        result = {'count': self.count,
+                  'min_ms': (self.min_us or 0) / 1000,
+                  'mean_ms': round(self.total_us / self.count / 1000, 3) if self.count else 0.0}
+        for p in PERCENTILES:
+            result['p%s_ms' % ('%g' % p).replace('.', '')] = self.percentile(p)
+        result['max_ms'] = self.max_us / 1000
+        return result
+
+
+# ============================================================
+# HTTP - one connection per request, like separate browsers
+# ============================================================
+
+class Target:
+    def __init__(self, base_url: str, timeout: float = 120.0):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.https else 80)
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.ssl = ssl.create_default_context() if self.https else None
+
+    async def request(self, method: str, path: str, payload=None) -> Tuple[int, bytes]:
+        return await asyncio.wait_for(self._request(method, path, payload), self.timeout)
+
+    async def _request(self, method: str, path: str, payload) -> Tuple[int, bytes]:
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        try:
+            body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+            head = ('%s %s HTTP/1.1\r\nHost: %s\r\nConnection: close\r\nAccept: */*\r\n'
+                    'Content-Type: application/json\r\nContent-Length: %d\r\n\r\n'
+                    % (method, self.prefix + path, self.host, len(body)))
+            writer.write(head.encode('latin-1') + body)
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if headers.get('transfer-encoding', '').lower() == 'chunked':
+                chunks = []
+                while True:
+                    size = int((await reader.readline()).split(b';')[0], 16)
+                    if size == 0:
+                        break
+                    chunks.append(await reader.readexactly(size))
+                    await reader.readline()
+                return status, b''.join(chunks)
+            if 'content-length' in headers:
+                return status, await reader.readexactly(int(headers['content-length']))
+            return status, await reader.read()
+        finally:
+            writer.close()
+
+
+# ============================================================
+# STUDENTS
+# ============================================================
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'correct=0.6,wrong=0.2,partial=0.2' -> weights"""
+    mix = {}
+    for part in filter(None, text.split(',')):
+        kind, _, weight = part.partition('=')
+        if kind.strip() not in ANSWERS:
+            raise SystemExit(f"--mix: unknown answer kind {kind!r} (use {', '.join(ANSWERS)})")
+        mix[kind.strip()] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise SystemExit('--mix needs a positive weight')
+    return mix
+
+
+def pick_answers(question_ids: List[str], mix: Dict[str, float], rng: random.Random) -> Tuple[Dict, Dict]:
+    """(answers, kind per question)"""
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=len(question_ids))
+    answers = {qid: ANSWERS[kind].get(qid, FALLBACK_ANSWERS[kind]) for qid, kind in zip(question_ids, kinds)}
+    return answers, dict(zip(question_ids, kinds))
+
+
+class LoadTest:
+    def __init__(self, target: Target, exam_id: str, question_ids: List[str], mix: Dict[str, float],
+                 think: Tuple[float, float], seed: int = 1):
+        self.target = target
+        self.exam_id = exam_id
+        self.question_ids = question_ids
+        self.mix = mix
+        self.think = think
+        self.rng = random.Random(seed)
+        self.phases = {name: Histogram() for name in ('fetch', 'submit', 'session')}
+        self.questions = {qid: Histogram() for qid in question_ids}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, int] = {}
+        self.outcomes = {kind: {'answers': 0, 'full': 0, 'partial': 0, 'zero': 0} for kind in ANSWERS}
+        self.students = 0
+        self.completed = 0
+        self.dropped = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _error(self, phase: str, reason: str) -> None:
+        key = '%s: %s' % (phase, reason)
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    async def _timed(self, phase: str, method: str, path: str, payload=None) -> Optional[bytes]:
+        started = time.perf_counter()
+        try:
+            status, body = await self.target.request(method, path, payload)
+        except asyncio.TimeoutError:
+            self._error(phase, 'timeout')
+            return None
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+            self._error(phase, type(e).__name__)
+            return None
+        self.phases[phase].record((time.perf_counter() - started) * 1000)
+        key = '%s %d' % (phase, status)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if status >= 400:
+            self._error(phase, 'HTTP %d' % status)
+            return None
+        return body
+
+    def _record_grades(self, body: bytes, kinds: Dict[str, str]) -> None:
+        try:
+            details = json.loads(body.decode('utf-8'))['data']['gradeDetails']
+        except (ValueError, KeyError, TypeError):
+            self._error('submit', 'unexpected response')
+            return
+        for qid, kind in kinds.items():
+            grade = details.get(qid) or {}
+            timings = grade.get('timings') or {}
+            if qid in self.questions and isinstance(timings.get('total'), (int, float)):
+                self.questions[qid].record(timings['total'])
+            outcome = self.outcomes[kind]
+            outcome['answers'] += 1
+            score, max_score = grade.get('score', 0), grade.get('maxScore', 0)
+            outcome['full' if max_score and score >= max_score else 'zero' if not score else 'partial'] += 1
+
+    async def student(self, scheduled: Optional[float] = None) -> None:
+        """One student taking the exam; the session is timed from `scheduled` (open loop) or now."""
+        started = scheduled if scheduled is not None else time.perf_counter()
+        number = self.students = self.students + 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if await self._timed('fetch', 'GET', '/exam/%s' % self.exam_id) is None:
+                return
+            await asyncio.sleep(self.rng.uniform(*self.think))
+            answers, kinds = pick_answers(self.question_ids, self.mix, self.rng)
+            payload = {'examId': self.exam_id, 'studentName': 'LoadTest_%d_%d' % (number, int(time.time())),
+                       'answers': answers, 'timeTakenSeconds': int(time.perf_counter() - started)}
+            body = await self._timed('submit', 'POST', '/api/exam/submit', payload)
+            if body is None:
+                return
+            self._record_grades(body, kinds)
+            self.completed += 1
+            self.phases['session'].record((time.perf_counter() - started) * 1000)
+        finally:
+            self.in_flight -= 1
+
+    async def closed_loop(self, students: int, iterations: int = 1, ramp: float = 0.0) -> None:
+        async def run(index: int) -> None:
+            if ramp:
+                await asyncio.sleep(ramp * index / students)
+            for _ in range(iterations):
+                await self.student()
+        await asyncio.gather(*(run(i) for i in range(students)))
+
+    async def open_loop(self, rate: float, duration: float, max_in_flight: int = 0) -> None:
+        tasks = []
+        start = time.perf_counter()
+        for i in range(int(rate * duration)):
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if max_in_flight and self.in_flight >= max_in_flight:
+                self.dropped += 1
+                continue
+            tasks.append(asyncio.ensure_future(self.student(scheduled)))
+        await asyncio.gather(*tasks)
+
+    def report(self, elapsed: float) -> Dict:
+        return {
+            'students': self.students,
+            'completed': self.completed,
+            'dropped': self.dropped,
+            'peak_in_flight': self.peak_in_flight,
+            'elapsed_s': round(elapsed, 2),
+            'submissions_per_s': round(self.completed / elapsed, 2) if elapsed else 0.0,
+            'phases': {name: h.summary() for name, h in self.phases.items()},
+            'questions': {qid: h.summary() for qid, h in self.questions.items() if h.count},
+            'statuses': self.statuses,
+            'errors': self.errors,
+            'outcomes': {kind: counts for kind, counts in self.outcomes.items() if counts['answers']},
+        }
+
+
+# ============================================================
+# SETUP AND REPORT
+# ============================================================
+
+async def exam_question_ids(target: Target, exam_id: str) -> List[str]:
+    status, body = await target.request('GET', '/api/admin/exams')
+    if status != 200:
+        raise SystemExit(f'GET /api/admin/exams returned {status}')
+    for exam in json.loads(body.decode('utf-8')):
+        if exam.get('id') == exam_id:
+            return [q['id'] for q in exam.get('questions', [])]
+    raise SystemExit(f'exam {exam_id} not found')
+
+
+def format_report(report: Dict) -> str:
+    header = '%-10s %7s %10s %10s %10s %10s %10s' % ('', 'count', 'p50 ms', 'p90 ms', 'p99 ms', 'p99.9 ms', 'max ms')
+    row = '%-10s %7d %10.1f %10.1f %10.1f %10.1f %10.1f'
+
+    def rows(histograms):
+        return [row % (name, h['count'], h['p50_ms'], h['p90_ms'], h['p99_ms'], h['p999_ms'], h['max_ms'])
+                for name, h in histograms.items() if h['count']]
+
+    lines = [f"Students: {report['students']} ({report['completed']} submitted, {report['dropped']} dropped, "
+             f"peak {report['peak_in_flight']} in flight) in {report['elapsed_s']}s, "
+             f"{report['submissions_per_s']} submissions/s", '', 'Per phase', header]
+    lines += rows(report['phases'])
+    if report['questions']:
+        lines += ['', 'Per question (server grading time)', header] + rows(report['questions'])
+    if report['outcomes']:
+        lines += ['', 'Scores by answer kind']
+    for kind, counts in report['outcomes'].items():
+        lines.append(f"  {kind:<8} answers: {counts['answers']} → {counts['full']} full, "
+                     f"{counts['partial']} partial, {counts['zero']} zero")
+    for reason, count in sorted(report['errors'].items()):
+        lines.append(f"  ❌ {reason}: {count}")
+    return '\n'.join(lines)
+
+
+async def run(args) -> Dict:
+    target = Target(args.base_url, args.timeout)
+    question_ids = await exam_question_ids(target, args.exam)
+    think = tuple(float(x) for x in args.think.split(','))
+    test = LoadTest(target, args.exam, question_ids, parse_mix(args.mix), (think[0], think[-1]), args.seed)
+    started = time.perf_counter()
+    if args.mode == 'open':
+        await test.open_loop(args.rate, args.duration, args.max_in_flight)
+    else:
+        await test.closed_loop(args.students, args.iterations, args.ramp)
+    return test.report(time.perf_counter() - started)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Simulate students taking an exam')
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--exam', default=EXAM_ID)
+    parser.add_argument('--mode', choices=('closed', 'open'), default='closed')
+    parser.add_argument('--students', type=int, default=15, help='closed loop: concurrent students')
+    parser.add_argument('--iterations', type=int, default=1, help='closed loop: exams per student')
+    parser.add_argument('--ramp', type=float, default=0.0, help='closed loop: seconds over which students start')
+    parser.add_argument('--rate', type=float, default=2.0, help='open loop: students arriving per second')
+    parser.add_argument('--duration', type=float, default=30.0, help='open loop: seconds of arrivals')
+    parser.add_argument('--max-in-flight', type=int, default=0, help='open loop: drop arrivals past this (0: never)')
+    parser.add_argument('--think', default='1,5', help='think time range in seconds, MIN,MAX')
+    parser.add_argument('--mix', default='correct=0.6,wrong=0.2,partial=0.2', help='answer kinds per question')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=120.0, help='seconds per request')
+    parser.add_argument('--output', help='write the report as JSON here')
+    args = parser.parse_args(argv)
+
+    print("=" * 60)
+    print(f"🚦 LOAD TEST: {args.exam} at {args.base_url} ({args.mode} loop)")
+    print("=" * 60)
+    report = asyncio.run(run(args))
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(dict(report, config=vars(args)), f, indent=2)
+            f.write('\n')
+        print(f"\n📄 Report: {args.output}")
+    if report['errors']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
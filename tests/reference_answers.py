@@ -0,0 +1,126 @@
+"""
+Known answers to the exam questions, by question id: CORRECT_ANSWERS must
+earn full points, WRONG_ANSWERS must not, PARTIAL_ANSWERS (alpro-functions)
+earn some of them. Shared by tests/test_production.py, the pre-publish
+self-test (scripts/selftest_exam.py) and the load generator (tests/load_exam.py).
+"""
+
+# ============================================================
+# CORRECT ANSWERS
+# ============================================================
+
+CORRECT_ANSWERS = {
+    # For daspro-en exam
+    "q1": """total = 0
+for i in range(1, 11):
+    if i % 2 == 0:
+        total += i
+print(total)""",
+    
+    "q2": """nilai = 80
+if nilai >= 75:
+    status = "Lulus"
+else:
+    status = "Tidak Lulus"
+print(status)""",
+    
+    "q3": """count = 0
+for i in range(1, 11):
+    if i % 2 != 0:
+        count += 1
+print(count)""",
+    
+    # For alpro-functions exam
+    "Q1": """def print_pesan(teks):
+    print(teks)
+print_pesan("Hello")""",
+    
+    "Q2": """def tambah(a, b):
+    return a + b
+print(tambah(3, 5))""",
+    
+    "Q3": """def tambah(a, b):
+    return a + b
+hasil = tambah(10, 20)
+print(hasil)""",
+    
+    "Q4": """def luas_persegi_panjang(p, l):
+    return p * l
+print(luas_persegi_panjang(5, 3))""",
+    
+    "Q5": """def luas_lingkaran(r):
+    return 3.14 * r * r
+print(luas_lingkaran(7))""",
+    
+    "Q6": """def nilai_minimum(daftar):
+    minimum = daftar[0]
+    for x in daftar:
+        if x < minimum:
+            minimum = x
+    return minimum
+print(nilai_minimum([5, 2, 8, 1]))""",
+    
+    "Q7": """def rata_rata(daftar):
+    total = 0
+    for x in daftar:
+        total += x
+    return total / len(daftar)
+print(rata_rata([10, 20, 30]))""",
+    
+    "Q8": """def status_kelulusan(nilai):
+    if nilai >= 75:
+        return "Lulus"
+    else:
+        return "Tidak Lulus"
+print(status_kelulusan(80))""",
+    
+    "Q9": """def tampilkan_identitas():
+    print("Nama: Test User")
+    print("NIM: 12345678")
+tampilkan_identitas()""",
+    
+    "Q10": """def hitung_luas_dan_tampilkan(p, l):
+    luas = p * l
+    print(luas)
+hitung_luas_dan_tampilkan(4, 5)"""
+}
+
+WRONG_ANSWERS = {
+    "q1": "x = 999",
+    "q2": "x = 'hello'",
+    "q3": "count = 100",
+    "Q1": "x = 1",
+    "Q2": "y = 2",
+    "Q3": "z = 3",
+    "Q4": "a = 4",
+    "Q5": "b = 5",
+    "Q6": "c = 6",
+    "Q7": "d = 7",
+    "Q8": "e = 8",
+    "Q9": "f = 9",
+    "Q10": "g = 10"
+}
+
+PARTIAL_ANSWERS = {
+    "Q1": """def print_pesan(teks):
+    return teks""",
+    "Q2": """def tambah(a, b):
+    print(a + b)""",
+    "Q3": """def tambah(a, b):
+    return a + b
+tambah(10, 20)""",
+    "Q4": """def luas_persegi_panjang(p, l):
+    return p + l""",
+    "Q5": """def luas_lingkaran(r):
+    print(3.14 * r * r)""",
+    "Q6": """def nilai_minimum(daftar):
+    return sorted(daftar)[0]""",
+    "Q7": """def rata_rata(daftar):
+    return sum(daftar) / len(daftar)""",
+    "Q8": """def status_kelulusan(nilai):
+    return 'Lulus'""",
+    "Q9": """def tampilkan_identitas():
+    return 'Nama: Test User'""",
+    "Q10": """def hitung_luas_dan_tampilkan(p, l):
+    return p * l"""
+}
@@ -0,0 +1,482 @@
+"""
+Stress the grader with pathological submissions.
+
+    python tests/stress_grading.py                      # isolated + mixed runs, default mix
+    python tests/stress_grading.py --quick              # fewer samples, lower limits
+    python tests/stress_grading.py --only infinite_loop --only huge_print
+    python tests/stress_grading.py --mix normal=0.5,infinite_loop=0.5 --workers 4
+    python tests/stress_grading.py --step-budget 1000000 --memory-limit-mb 64
+    python tests/stress_grading.py --write-corpus /tmp/corpus
+
+The fixtures in test_production.py and test_correct_wrong.py are all
+well-behaved. This generates (seeded, reproducible) answers of the kinds
+that hurt in practice and grades them the way the submit route does:
+one sandbox run for the whole exam (grade_answers()), the nine other
+questions answered correctly.
+
+Categories (CATEGORIES): every pathological answer is the correct answer
+to its question followed by what the student left behind, so a grader
+that copes still awards the points.
+  normal          the correct, partial and wrong answers of reference_answers.py
+  infinite_loop   a loop that never ends, silent or printing
+  deep_recursion  recursion without a base case, with and without setrecursionlimit()
+  huge_print      megabytes of output
+  huge_alloc      lists and strings of hundreds of MB
+  long_file       5,000-line programs, valid or with a syntax error at the end
+  deep_nesting    nested parentheses/lists/calls and long operator chains
+                  (the limits of ast.parse and of the recursive AST walk)
+  unicode         non-ASCII identifiers, emoji, RTL and combining text,
+                  invisible characters, lone surrogates
+
+Two runs:
+  isolated  every category on its own, one submission at a time: latency,
+            sandbox runs per submission (a failed exam run is regraded
+            question by question), sandbox memory, output size, how the
+            question failed and whether the other questions kept their points
+  mixed     the corpus drawn with --mix on --workers threads, arriving at
+            --load times the rate normal submissions can be graded, against
+            the same number of normal submissions alone: what the bad ones
+            cost everyone else in latency (queueing included) and throughput
+
+DEFAULT_MIX is an estimate of a real exam (most answers are ordinary,
+runaway loops and prints are the common accidents), not measured data.
+Results go to tests/k6/results/stress_grading_results.json.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from benchmark_grading import percentile
+from create_alpro_exam import EXAM
+from grader.executor import ExecutionLimits, run_source
+from grader.questions import grade_answers
+from reference_answers import CORRECT_ANSWERS, PARTIAL_ANSWERS, WRONG_ANSWERS
+
+RESULTS_PATH = os.path.join(ROOT, 'tests', 'k6', 'results', 'stress_grading_results.json')
+LONG_FILE_LINES = 5000
+
+# ============================================================
+# CORPUS
+# ============================================================
+
+def _normal(rng: random.Random, question_id: str) -> str:
+    answers = rng.choices((CORRECT_ANSWERS, PARTIAL_ANSWERS, WRONG_ANSWERS), weights=(6, 2, 2))[0]
+    return answers[question_id]
+
+
+def _infinite_loop(rng: random.Random, question_id: str) -> str:
+    return rng.choice((
+        # forgot the increment
+        "i = 0\nwhile i < 10:\n    print('angka', i)\n",
+        "n = 5\ntotal = 0\nwhile n > 0:\n    total += n\nprint(total)\n",
+        "while True:\n    pass\n",
+        "daftar = [1, 2, 3]\nfor x in daftar:\n    daftar.append(x)\n",
+    ))
+
+
+def _deep_recursion(rng: random.Random, question_id: str) -> str:
+    base = rng.choice((
+        "def faktorial(n):\n    return n * faktorial(n - 1)\n\nprint(faktorial({n}))\n",
+        "def genap(n):\n    return n == 0 or ganjil(n - 1)\n\n"
+        "def ganjil(n):\n    return n != 0 and genap(n - 1)\n\nprint(genap({n}))\n",
+    )).format(n=rng.choice((5, 10 ** 6)))
+    if rng.random() < 0.5:
+        return base
+    # The "fix" students find online: recursion deep enough to overflow the C stack
+    return "import sys\nsys.setrecursionlimit(%d)\n\n%s" % (rng.choice((10 ** 5, 10 ** 6)), base)
+
+
+def _huge_print(rng: random.Random, question_id: str) -> str:
+    megabytes = rng.choice((1, 2, 5))
+    return rng.choice((
+        "print('x' * %d)\n" % (megabytes * 1024 * 1024),
+        "for i in range(%d):\n    print('baris ke', i)\n" % (megabytes * 70000),
+        "print(list(range(%d)))\n" % (megabytes * 120000),
+    ))
+
+
+def _huge_alloc(rng: random.Random, question_id: str) -> str:
+    return rng.choice((
+        "data = [0] * 10 ** 9\n",
+        "data = list(range(%d))\nprint(len(data))\n" % rng.choice((10 ** 6, 10 ** 7)),
+        "matriks = [[0] * 5000 for _ in range(5000)]\nprint(len(matriks))\n",
+        "teks = 'a' * (%d * 1024 * 1024)\nprint(len(teks))\n" % rng.choice((100, 400)),
+    ))
+
+
+def long_program(lines: int, rng: random.Random) -> str:
+    """About `lines` lines of plausible student code (functions and calls)."""
+    parts, count, i = [], 0, 0
+    while count < lines:
+        op = rng.choice(('+', '-', '*'))
+        parts.append("def langkah_%d(a, b):\n    hasil = a %s b\n    if hasil > %d:\n        return hasil\n"
+                     "    return -hasil\n\nnilai_%d = langkah_%d(%d, %d)\n\n"
+                     % (i, op, rng.randint(0, 100), i, i, rng.randint(0, 50), rng.randint(0, 50)))
+        count += 8
+        i += 1
+    return ''.join(parts)
+
+
+def _long_file(rng: random.Random, question_id: str) -> str:
+    program = long_program(LONG_FILE_LINES, rng)
+    return program if rng.random() < 0.7 else program + "print('selesai'\n"
+
+
+def _deep_nesting(rng: random.Random, question_id: str) -> str:
+    depth = rng.choice((50, 150, 190, 250))
+    return rng.choice((
+        "x = %s1%s\nprint(x)\n" % ('(' * depth, ')' * depth),
+        "x = %s%s\nprint(len(x))\n" % ('[' * depth, ']' * depth),
+        "def f(x):\n    return x\n\nprint(%s0%s)\n" % ('f(' * depth, ')' * depth),
+        "x = 1%s\nprint(x)\n" % (' + 1' * rng.choice((1000, 3000, 20000))),
+        "x = 0\n%s%sx += 1\nprint(x)\n" % (
+            ''.join('    ' * level + 'if x < %d:\n' % (level + 1) for level in range(depth // 2)), '    ' * (depth // 2)),
+    ))
+
+
+def _unicode(rng: random.Random, question_id: str) -> str:
+    return rng.choice((
+        "jumlah_ñ = 3\n变量 = '中文'\nπ = 3.14159\nprint(jumlah_ñ, 变量, π)\n",
+        # NFKC folds the ligature: this assigns `file`
+        "\ufb01le = 'berkas'\nprint(file)\n",
+        "pesan = 'Halo 👋🇮🇩 ' * %d\nprint(pesan)\n" % rng.choice((10, 50000)),
+        "print('مرحبا بالعالم')\nprint('e\\u0301' * 1000)\n",
+        "nilai = 10\u200b\nprint(nilai)\n",
+        "print('\\ud800')\n",
+        "# -*- coding: utf-8 -*-\n# komentar: ünïcödé ✓ ✗ → ←\nprint('✓')\n",
+    ))
+
+
+CATEGORIES: Dict[str, Callable[[random.Random, str], str]] = {
+    'normal': _normal,
+    'infinite_loop': _infinite_loop,
+    'deep_recursion': _deep_recursion,
+    'huge_print': _huge_print,
+    'huge_alloc': _huge_alloc,
+    'long_file': _long_file,
+    'deep_nesting': _deep_nesting,
+    'unicode': _unicode,
+}
+
+DEFAULT_MIX = {
+    'normal': 0.86,
+    'infinite_loop': 0.04,
+    'huge_print': 0.03,
+    'unicode': 0.02,
+    'deep_recursion': 0.02,
+    'long_file': 0.01,
+    'huge_alloc': 0.01,
+    'deep_nesting': 0.01,
+}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'normal=0.9,infinite_loop=0.1' -> weights"""
+    mix = {}
+    for part in filter(None, text.split(',')):
+        category, _, weight = part.partition('=')
+        if category.strip() not in CATEGORIES:
+            raise SystemExit(f"--mix: unknown category {category!r} (use {', '.join(CATEGORIES)})")
+        mix[category.strip()] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise SystemExit('--mix needs a positive weight')
+    return mix
+
+
+def sample(category: str, rng: random.Random, question_ids: List[str]) -> Dict:
+    """One submission: every question answered correctly except `question`."""
+    question_id = rng.choice(question_ids)
+    code = CATEGORIES[category](rng, question_id)
+    if category != 'normal':
+        code = CORRECT_ANSWERS[question_id].rstrip('\n') + '\n\n' + code
+    return {'category': category, 'question': question_id, 'code': code}
+
+
+def build_corpus(count: int, mix: Dict[str, float], seed: int = 0,
+                 question_ids: Optional[List[str]] = None) -> List[Dict]:
+    rng = random.Random(seed)
+    question_ids = question_ids or [q['id'] for q in EXAM['questions']]
+    categories = rng.choices(list(mix), weights=list(mix.values()), k=count)
+    return [sample(category, rng, question_ids) for category in categories]
+
+
+def write_corpus(directory: str, corpus: List[Dict]) -> None:
+    """One file per sample under <category>/, and manifest.json."""
+    manifest = []
+    for i, item in enumerate(corpus):
+        path = os.path.join(item['category'], '%04d_%s.py' % (i, item['question']))
+        os.makedirs(os.path.join(directory, item['category']), exist_ok=True)
+        with open(os.path.join(directory, path), 'w', encoding='utf-8', errors='surrogatepass') as f:
+            f.write(item['code'])
+        manifest.append({'file': path, 'category': item['category'], 'question': item['question']})
+    with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+
+
+# ============================================================
+# GRADING
+# ============================================================
+
+class CountingRunner:
+    """run_source() that remembers every sandbox run (status, memory, seconds, output size)."""
+
+    def __init__(self):
+        self.runs: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, source: str, stdin: str, limits: ExecutionLimits) -> Dict:
+        started = time.perf_counter()
+        execution = run_source(source, stdin, limits)
+        run = {'status': execution['status']['description'], 'memory_kb': execution.get('memory') or 0,
+               'seconds': time.perf_counter() - started,
+               'output_bytes': len((execution.get('stdout') or '').encode('utf-8', 'surrogatepass'))}
+        with self._lock:
+            self.runs.append(run)
+        return execution
+
+
+def _error_kind(error: str) -> str:
+    """'output_limit_exceeded', 'RecursionError', 'Syntax error', 'Time Limit Exceeded', ..."""
+    lines = [line for line in error.strip().splitlines() if line.strip()]
+    last = lines[-1] if lines else error
+    return last.split(':')[0].strip()[:40]
+
+
+def grade_submission(item: Dict, questions: List[Dict], limits: ExecutionLimits) -> Dict:
+    """Grade one submission like the submit route; what it cost and how it failed."""
+    answers = dict(CORRECT_ANSWERS, **{item['question']: item['code']})
+    runner = CountingRunner()
+    started = time.perf_counter()
+    grades = grade_answers(questions, answers, limits, runner)
+    elapsed = time.perf_counter() - started
+    grade = grades[item['question']]
+    others = [g for qid, g in grades.items() if qid != item['question']]
+    return {
+        'category': item['category'],
+        'ms': elapsed * 1000,
+        'runs': runner.runs,
+        'status': grade['status'],
+        'errors': [_error_kind(error) for error in grade['errors']],
+        'full_score': grade['score'] == grade['maxScore'],
+        'peak_bytes': (grade.get('memory') or {}).get('peakBytes'),
+        'collateral': sum(1 for g in others if g['score'] < g['maxScore']),
+    }
+
+
+def _ms_summary(samples_ms: List[float]) -> Dict:
+    ordered = sorted(samples_ms)
+    return {
+        'p50_ms': round(percentile(ordered, 50), 1),
+        'p99_ms': round(percentile(ordered, 99), 1),
+        'max_ms': round(ordered[-1], 1) if ordered else 0.0,
+    }
+
+
+def summarize_category(results: List[Dict]) -> Dict:
+    runs = [run for result in results for run in result['runs']]
+    peaks = [r['peak_bytes'] for r in results if r['peak_bytes'] is not None]
+    summary = {'submissions': len(results)}
+    summary.update(_ms_summary([r['ms'] for r in results]))
+    summary.update({
+        'sandbox_runs_per_submission': round(len(runs) / len(results), 2),
+        'sandbox_seconds_per_submission': round(sum(run['seconds'] for run in runs) / len(results), 3),
+        'max_sandbox_kb': max(run['memory_kb'] for run in runs) if runs else 0,
+        'max_traced_mb': round(max(peaks) / 1024 / 1024, 1) if peaks else None,
+        'max_output_kb': round(max(run['output_bytes'] for run in runs) / 1024, 1) if runs else 0,
+        'sandbox_statuses': dict(Counter(run['status'] for run in runs)),
+        'grade_statuses': dict(Counter(r['status'] for r in results)),
+        'errors': dict(Counter(kind for r in results for kind in r['errors'])),
+        'kept_full_score': round(sum(r['full_score'] for r in results) / len(results), 2),
+        'collateral_questions': sum(r['collateral'] for r in results),
+    })
+    return summary
+
+
+def exam_questions(step_budget: Optional[int], memory_limit: Optional[int]) -> List[Dict]:
+    """The Alpro questions, with the runtime's step/memory budgets if given."""
+    budgets = {'stepBudget': step_budget, 'memoryLimit': memory_limit}
+    return [dict(question, **{k: v for k, v in budgets.items() if v}) for question in EXAM['questions']]
+
+
+def run_isolated(categories: List[str], per_category: int, limits: ExecutionLimits,
+                 questions: List[Dict], seed: int = 0) -> Dict[str, Dict]:
+    """Each category alone, one submission at a time."""
+    results = {}
+    question_ids = [q['id'] for q in questions]
+    for category in categories:
+        rng = random.Random('%s:%s' % (seed, category))
+        started = time.perf_counter()
+        graded = [grade_submission(sample(category, rng, question_ids), questions, limits)
+                  for _ in range(per_category)]
+        results[category] = summarize_category(graded)
+        print(f"  ⏱  {category} done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return results
+
+
+def _grade_all(corpus: List[Dict], questions: List[Dict], limits: ExecutionLimits, workers: int,
+               interval: float = 0.0) -> Dict:
+    """
+    Grade `corpus` on `workers` threads, one submission arriving every
+    `interval` seconds (all at once with 0). Latency counts from arrival,
+    so it includes waiting for a free worker.
+    """
+    started = time.perf_counter()
+
+    def grade(i_item):
+        i, item = i_item
+        arrival = started + i * interval
+        time.sleep(max(0.0, arrival - time.perf_counter()))
+        result = grade_submission(item, questions, limits)
+        result['ms'] = (time.perf_counter() - arrival) * 1000
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        graded = list(pool.map(grade, enumerate(corpus)))
+    elapsed = time.perf_counter() - started
+    normal = [r['ms'] for r in graded if r['category'] == 'normal']
+    sandbox = Counter()
+    for r in graded:
+        sandbox[r['category']] += sum(run['seconds'] for run in r['runs'])
+    total = sum(sandbox.values()) or 1.0
+    return {
+        'submissions': len(graded),
+        'seconds': round(elapsed, 2),
+        'throughput_per_s': round(len(graded) / elapsed, 2),
+        'normal': dict(_ms_summary(normal), submissions=len(normal)),
+        'sandbox_time_share': {category: round(seconds / total, 3) for category, seconds in sandbox.most_common()},
+    }
+
+
+def run_mixed(count: int, mix: Dict[str, float], limits: ExecutionLimits, questions: List[Dict],
+              workers: int, load: float = 0.7, seed: int = 0) -> Dict:
+    """
+    The corpus under `mix` vs the same number of normal submissions alone.
+    Both arrive at `load` times the rate `workers` sustain for normal
+    submissions (measured first), like students submitting over an exam:
+    the bad ones make everyone queue.
+    """
+    question_ids = [q['id'] for q in questions]
+    corpus = build_corpus(count, mix, seed, question_ids)
+    clean = build_corpus(count, {'normal': 1.0}, seed, question_ids)
+    capacity = _grade_all(clean[:max(workers * 4, 10)], questions, limits, workers)['throughput_per_s']
+    interval = 1 / (capacity * load)
+    clean_run = _grade_all(clean, questions, limits, workers, interval)
+    mixed_run = _grade_all(corpus, questions, limits, workers, interval)
+    return {
+        'workers': workers,
+        'arrivals_per_s': round(1 / interval, 2),
+        'mix': dict(Counter(item['category'] for item in corpus)),
+        'clean': clean_run,
+        'mixed': mixed_run,
+        'normal_p50_slowdown': round(mixed_run['normal']['p50_ms'] / clean_run['normal']['p50_ms'], 2)
+        if clean_run['normal']['p50_ms'] else None,
+        'normal_p99_slowdown': round(mixed_run['normal']['p99_ms'] / clean_run['normal']['p99_ms'], 2)
+        if clean_run['normal']['p99_ms'] else None,
+        'throughput_ratio': round(mixed_run['throughput_per_s'] / clean_run['throughput_per_s'], 2),
+    }
+
+
+# ============================================================
+# REPORT
+# ============================================================
+
+def format_report(isolated: Dict[str, Dict], mixed: Optional[Dict]) -> str:
+    lines = ['%-15s %5s %9s %9s %6s %8s %9s %10s %6s  %s' % (
+        'category', 'subs', 'p50 ms', 'p99 ms', 'runs', 'sbx MB', 'out KB', 'kept full', 'coll.', 'failures')]
+    for category, r in isolated.items():
+        failures = ', '.join('%s×%d' % item for item in sorted(r['errors'].items(), key=lambda kv: -kv[1])) or '-'
+        lines.append('%-15s %5d %9.1f %9.1f %6.2f %8.1f %9.1f %9.0f%% %6d  %s' % (
+            category, r['submissions'], r['p50_ms'], r['p99_ms'], r['sandbox_runs_per_submission'],
+            r['max_sandbox_kb'] / 1024, r['max_output_kb'], r['kept_full_score'] * 100,
+            r['collateral_questions'], failures))
+    if mixed:
+        clean, run = mixed['clean'], mixed['mixed']
+        lines += [
+            '',
+            'Mixed run (%d submissions, %d workers, %.1f arrivals/s): %s' % (
+                run['submissions'], mixed['workers'], mixed['arrivals_per_s'],
+                ', '.join('%s %d' % item for item in sorted(mixed['mix'].items(), key=lambda kv: -kv[1]))),
+            '  normal submissions p50 %.1f ms / p99 %.1f ms (alone: %.1f / %.1f ms), %sx / %sx' % (
+                run['normal']['p50_ms'], run['normal']['p99_ms'], clean['normal']['p50_ms'],
+                clean['normal']['p99_ms'], mixed['normal_p50_slowdown'], mixed['normal_p99_slowdown']),
+            '  throughput %.2f/s (alone: %.2f/s), %sx' % (
+                run['throughput_per_s'], clean['throughput_per_s'], mixed['throughput_ratio']),
+            '  sandbox time: ' + ', '.join('%s %.0f%%' % (category, share * 100)
+                                           for category, share in run['sandbox_time_share'].items()),
+        ]
+    return '\n'.join(lines)
+
+
+def write_results(path: str, report: Dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    report = dict({'generated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                   'cpus': os.cpu_count() or 1}, **report)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Grade pathological submissions and measure the damage')
+    parser.add_argument('--only', action='append', choices=sorted(CATEGORIES), help='isolated run of this category only')
+    parser.add_argument('--per-category', type=int, help='submissions per category in the isolated run (default 20)')
+    parser.add_argument('--mixed', type=int, help='submissions in the mixed run, 0 to skip (default 200)')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help='category weights for the mixed run')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='concurrent submissions in the mixed run')
+    parser.add_argument('--load', type=float, default=0.7, help='mixed-run arrival rate as a share of normal throughput')
+    parser.add_argument('--quick', action='store_true', help='5 per category, 40 mixed, 1s CPU / 2s wall limits')
+    parser.add_argument('--cpu-time', type=float, help='sandbox CPU seconds (default: ExecutionLimits)')
+    parser.add_argument('--wall-time', type=float, help='sandbox wall-clock seconds')
+    parser.add_argument('--step-budget', type=int, help="give every question this stepBudget")
+    parser.add_argument('--memory-limit-mb', type=int, help="give every question this memoryLimit")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--write-corpus', metavar='DIR', help='write the mixed corpus to DIR and exit')
+    parser.add_argument('--output', default=RESULTS_PATH)
+    args = parser.parse_args(argv)
+
+    quick = args.quick
+    args.per_category = args.per_category or (5 if quick else 20)
+    args.mixed = args.mixed if args.mixed is not None else 40 if quick else 200
+    if quick:
+        args.cpu_time, args.wall_time = args.cpu_time or 1.0, args.wall_time or 2.0
+    if args.write_corpus:
+        write_corpus(args.write_corpus, build_corpus(args.mixed, args.mix, args.seed))
+        print(f"📄 {args.mixed} submissions written to {args.write_corpus}")
+        return
+
+    defaults = ExecutionLimits()
+    limits = ExecutionLimits(cpu_time=args.cpu_time or defaults.cpu_time,
+                             wall_time=args.wall_time or defaults.wall_time)
+    questions = exam_questions(args.step_budget, args.memory_limit_mb and args.memory_limit_mb * 1024 * 1024)
+
+    print("=" * 60)
+    print("💣 PATHOLOGICAL SUBMISSION STRESS TEST")
+    print("=" * 60)
+    isolated = run_isolated(args.only or list(CATEGORIES), args.per_category, limits, questions, args.seed)
+    mixed = run_mixed(args.mixed, args.mix, limits, questions, args.workers, args.load, args.seed) if args.mixed else None
+    print(format_report(isolated, mixed))
+    write_results(args.output, {
+        'limits': vars(limits),
+        'budgets': {'stepBudget': args.step_budget, 'memoryLimitMb': args.memory_limit_mb},
+        'isolated': isolated,
+        'mixed': mixed,
+    })
+    print(f"\n📄 Results: {os.path.relpath(args.output, ROOT)}")
+
+
+if __name__ == '__main__':
+    main()
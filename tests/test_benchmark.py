@@ -0,0 +1,73 @@
+"""
+Test Script for the Grading Benchmarks (tests/benchmark_grading.py)
+Run with pytest, or directly: python tests/test_benchmark.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_grading import (BASELINE_PATH, compare, load_baseline, percentile, run_benchmarks,
+                               student_program, summarize, write_results)
+
+# ============================================================
+# TEST CASES
+# ============================================================
+
+def test_percentiles():
+    samples = [float(i) for i in range(1, 101)]
+    assert [percentile(samples, p) for p in (50, 90, 99, 100)] == [50.0, 90.0, 99.0, 100.0]
+    assert percentile([7.0], 99) == 7.0 and percentile([], 50) == 0.0
+
+    summary = summarize([4.0, 1.0, 3.0, 2.0], kb=1)
+    assert summary['runs'] == 4 and summary['p50_ms'] == 2.0 and summary['max_ms'] == 4.0
+    assert summary['throughput_per_s'] == 400.0 and summary['kb'] == 1
+    print("✅ PASSED: nearest-rank percentiles and throughput")
+
+
+def test_compare_with_baseline():
+    baseline = {'a': {'p50_ms': 10.0}, 'b': {'p50_ms': 10.0}, 'gone': {'p50_ms': 1.0}}
+    current = {'a': {'p50_ms': 12.0}, 'b': {'p50_ms': 13.0}, 'new': {'p50_ms': 5.0}}
+    rows = {row['name']: row for row in compare(current, baseline, threshold=0.25)}
+    assert sorted(rows) == ['a', 'b']
+    assert not rows['a']['regressed'] and rows['b']['regressed'] and rows['b']['ratio'] == 1.3
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'results', 'baseline.json')
+        assert load_baseline(path) is None
+        write_results(path, current)
+        with open(path) as f:
+            report = json.load(f)
+        assert report['benchmarks'] == current and report['python'] and report['generated']
+        assert load_baseline(path) == current
+    assert load_baseline(BASELINE_PATH), 'stored baseline missing'
+    print("✅ PASSED: runs are compared with the baseline p50")
+
+
+def test_quick_run():
+    assert 1024 <= len(student_program(1)) < 1400
+    results = run_benchmarks(['ast', 'facts'], scale=0.02)
+    assert sorted(results) == ['ast.parse_and_facts.16kb', 'ast.parse_and_facts.1kb', 'ast.parse_and_facts.4kb',
+                               'ast.parse_and_facts.64kb', 'facts.single_walk', 'facts.walk_per_criterion']
+    assert all(r['runs'] >= 3 and 0 <= r['p50_ms'] <= r['p99_ms'] <= r['max_ms'] for r in results.values())
+    # Timings depend on the host: how fast they are is for the baseline comparison to judge
+    assert 'vs_single_walk' in results['facts.walk_per_criterion']
+    print("✅ PASSED: benchmarks run and report percentiles")
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("🧪 BENCHMARK SUITE TESTS")
+    print("=" * 60)
+    test_percentiles()
+    test_compare_with_baseline()
+    test_quick_run()
+    print("=" * 60)
+    print("🎉 ALL BENCHMARK TESTS PASSED!")
@@ -0,0 +1,139 @@
+"""
+Test Script for Canonical Cache Keys (grader/canonical.py)
+Run with pytest, or directly: python tests/test_grading_canonical.py
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grader import cache_key, compile_rubric
+from grader.canonical import canonical_dump, raw_key, rubric_names, runs_student_code
+from scripts.create_alpro_exam import QUESTIONS
+
+# ============================================================
+# FIXTURES
+# ============================================================
+
+Q2_RUBRIC = next(q['rubric'] for q in QUESTIONS if q['id'] == 'Q2')
+
+# Same program for any declarative rubric: comments, blank lines, quotes, local names
+EQUIVALENT = [
+    "def tambah(a, b):\n    return a + b\n\nprint(tambah(3, 5))",
+    "def tambah(x, y):\n    # jumlahkan dua angka\n    return x+y\nprint(tambah(3,5))",
+    "def tambah(angka1, angka2):\n\n\n    return angka1 + angka2  # hasil\n\nprint(tambah(3, 5))",
+]
+
+# Looks alike but must NOT share a key
+DIFFERENT = [
+    "def tambah(a, b):\n    return a - b\nprint(tambah(3, 5))",
+    "def tambah(a, b):\n    return b + a\nprint(tambah(3, 5))",
+    "def tambah(a):\n    return a\nprint(tambah(3))",
+    "def jumlah(a, b):\n    return a + b\nprint(jumlah(3, 5))",
+]
+
+
+# ============================================================
+# TEST CASES
+# ============================================================
+
+def test_equivalent_answers_share_key():
+    keys = {cache_key(code, Q2_RUBRIC) for code in EQUIVALENT}
+    assert len(keys) == 1 and keys.pop().startswith('ast:')
+
+
+def test_different_answers_do_not():
+    keys = [cache_key(code, Q2_RUBRIC) for code in EQUIVALENT[:1] + DIFFERENT]
+    assert len(set(keys)) == len(keys)
+
+
+def test_strings_keep_their_value():
+    """Quote style is normalized, string contents are not"""
+    assert cache_key("print('Hello')", Q2_RUBRIC) == cache_key('print("Hello")', Q2_RUBRIC)
+    assert cache_key("print('Hello')", Q2_RUBRIC) != cache_key("print('hello')", Q2_RUBRIC)
+
+
+def test_rubric_names_are_kept():
+    """A local the rubric asks about is never renamed"""
+    spec = {"criteria": [{"name": "hasil", "points": 1, "check": {"assigns": "hasil"}},
+                         {"name": "sum", "points": 1, "check": {"not": {"calls": "sum"}}}]}
+    assert rubric_names(spec) == {'hasil', 'sum'}
+    with_name = "def f(a):\n    hasil = a\n    return hasil"
+    other_name = "def f(a):\n    x = a\n    return x"
+    assert cache_key(with_name, spec) != cache_key(other_name, spec)
+    assert 'hasil' in canonical_dump(with_name, rubric_names(spec))
+
+
+def test_functional_tests_keep_names():
+    """A rubric with "tests" runs the answer, so only formatting is normalized"""
+    spec = {"criteria": [{"name": "hasil", "points": 10,
+                          "tests": {"function": "hitung", "inputs": [[]], "expected": [1]}}]}
+    assert runs_student_code(spec) and not runs_student_code(Q2_RUBRIC)
+    assert rubric_names(spec) == {'hitung'}
+    # helper(a=1) only works while the parameter is called `a`
+    works = "def helper(a):\n    return a\ndef hitung():\n    return helper(a=1)"
+    fails = "def helper(b):\n    return b\ndef hitung():\n    return helper(a=1)"
+    assert compile_rubric(spec).has_tests
+    assert cache_key(works, spec) != cache_key(fails, spec)
+    assert cache_key(works, Q2_RUBRIC) != cache_key(fails, Q2_RUBRIC)
+    assert cache_key(works, spec) == cache_key(works.replace('return a', 'return a  # satu'), spec)
+    assert cache_key("def hitung(x):\n    return x", spec) != cache_key("def hitung(y):\n    return y", spec)
+
+
+def test_scope_rules():
+    """Only a function's own locals are renamed; globals and defaults are left alone"""
+    dump = canonical_dump("a = 1\ndef f(x, y=a):\n    global g\n    g = x\n    return len(x) + y")
+    assert "Name('a', Load())" in dump and "Name('g', Store())" in dump and "'len'" in dump
+    assert "arg('x')" not in dump and "arg('_l0')" in dump
+
+    # Nested functions see the same renaming; dynamic lookups disable it
+    nested = canonical_dump("def f(n):\n    def g():\n        return n\n    return g()")
+    assert "Name('n'" not in nested
+    assert "arg('x')" in canonical_dump("def f(x):\n    return eval('x')")
+
+
+def test_fallback_to_raw_hash():
+    """Free-form validation, syntax errors and placeholder-like names use the raw hash"""
+    code = EQUIVALENT[0]
+    assert cache_key(code) == raw_key(code)
+    assert cache_key("def (:", Q2_RUBRIC) == raw_key("def (:")
+    # A global that looks like a placeholder switches renaming off for the whole answer
+    shadowing = "_l0 = 1\ndef f(a):\n    return _l0"
+    assert "arg('a')" in canonical_dump(shadowing)
+    assert cache_key(shadowing, Q2_RUBRIC) != cache_key("_l0 = 1\ndef f(a):\n    return a", Q2_RUBRIC)
+
+
+def test_same_key_same_grade():
+    """For every Alpro rubric, answers sharing a key get identical grades"""
+    answers = EQUIVALENT + DIFFERENT + [
+        "def luas_persegi_panjang(p, l):\n    return p * l",
+        "def luas_persegi_panjang(panjang, lebar):\n    # luas\n    return panjang * lebar",
+        "def nilai_minimum(d):\n    m = d[0]\n    for x in d:\n        if x < m:\n            m = x\n    return m",
+        "def nilai_minimum(data):\n    kecil = data[0]\n    for v in data:\n        if v < kecil:\n            kecil = v\n    return kecil",
+        "def nilai_minimum(data):\n    return min(data)",
+    ]
+    for question in QUESTIONS:
+        rubric = compile_rubric(question['rubric'])
+        grades = {}
+        for answer in answers:
+            grade = rubric.grade(answer)
+            previous = grades.setdefault(cache_key(answer, question['rubric']), grade)
+            assert previous == grade, (question['id'], answer)
+
+
+# ============================================================
+# RUN ALL TESTS
+# ============================================================
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith('test_') and callable(v)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ PASSED | {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  ❌ FAILED | {test.__name__}: {e}")
+    print("🎉 ALL TESTS PASSED!" if not failed else f"⚠️ {failed} TEST(S) FAILED")
@@ -5,6 +5,13 @@ Run this to verify the grading engine works correctly.
 
 import base64
 import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grader import read_frames, runtime_source
+from grader.runtime import OUTPUT_BUDGET, RUN_OUTPUT_TAIL, BoundedOutput, OutputLimitExceeded
 
 # ============================================================
 # SIMULATED GRADING ENGINE (same logic as rubricGrader.ts)
@@ -19,49 +26,76 @@ def run_grading_engine(student_code: str, validation_code: str) -> dict:
     base64_validation = base64.b64encode(validation_code.encode('utf-8')).decode('utf-8')
     
     # Build the combined script (same as rubricGrader.ts)
-    combined_code = f'''import base64
-import ast
-import json
+    combined_code = runtime_source() + f'''
+import base64
 
 # Decode student code and store in globals
 globals()['__STUDENT_CODE__'] = base64.b64decode("{base64_student}").decode('utf-8')
 globals()['__exec_error__'] = None
 
-# Execute student code in global namespace
-try:
-    exec(globals()['__STUDENT_CODE__'], globals())
-except Exception as e:
-    globals()['__exec_error__'] = str(e)
+# Execute student code in global namespace (output bounded, as in buildCombinedCode)
+globals()['__exec_error__'] = run_student_program(globals()['__STUDENT_CODE__'], globals())
 
 # Execute validation code in same global namespace
 __validation_code__ = base64.b64decode("{base64_validation}").decode('utf-8')
 exec(__validation_code__, globals())
 '''
     
-    # Execute and capture output
-    import io
+    # Execute and capture output (bounded like the sandbox's)
     import sys
     
     old_stdout = sys.stdout
-    sys.stdout = buffer = io.StringIO()
+    sys.stdout = buffer = BoundedOutput(RUN_OUTPUT_TAIL, OUTPUT_BUDGET)
     
     exec_globals = {}
     try:
         exec(combined_code, exec_globals)
         output = buffer.getvalue()
         return {"success": True, "output": output, "error": None}
-    except Exception as e:
+    except (Exception, OutputLimitExceeded) as e:
         output = buffer.getvalue()
         return {"success": False, "output": output, "error": str(e)}
     finally:
         sys.stdout = old_stdout
 
 
+def run_grading_batch(student_codes: list, validation_code: str, question_id: str = "") -> list:
+    """
+    Simulates student_batch_script() in grader/questions.py:
+    many answers to one question graded in a single execution.
+    Returns the per-student results streamed by run_students().
+    """
+    payload = json.dumps({
+        "validation": validation_code,
+        "question_id": question_id,
+        "answers": [{"key": str(i), "code": code} for i, code in enumerate(student_codes)],
+    })
+    base64_payload = base64.b64encode(payload.encode('utf-8')).decode('utf-8')
+
+    combined_code = runtime_source() + f'''
+import base64
+
+run_students(**decode_payload("{base64_payload}"))
+'''
+
+    import io
+    import sys
+
+    old_stdout = sys.stdout
+    sys.stdout = buffer = io.StringIO()
+    try:
+        exec(combined_code, {})
+    finally:
+        sys.stdout = old_stdout
+
+    return read_frames(buffer.getvalue(), "__RESULT__")
+
+
 def parse_rubric_output(output: str) -> dict:
-    """Parse __RUBRIC__ output from grading"""
+    """Parse __RUBRIC__ output from grading (the last marker line, like parseRubricOutput)"""
     marker = "__RUBRIC__"
     if marker in output:
-        json_str = output.split(marker)[1].strip().split('\n')[0]
+        json_str = output.rsplit(marker, 1)[1].strip().split('\n')[0]
         return json.loads(json_str)
     return None
 
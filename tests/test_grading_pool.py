@@ -0,0 +1,396 @@
+"""
+Test Script for the Local Grading Backend (grader/executor.py, grader/pool.py,
+grader/forkserver.py)
+Run with pytest, or directly: python tests/test_grading_pool.py
+"""
+
+import asyncio
+import base64
+import json
+import os
+import sys
+import threading
+import random
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grader.pool
+from grader import combined_source
+from grader.executor import ExecutionLimits, run_source
+from grader.forkserver import SAMPLE_ANSWER, SAMPLE_VALIDATION, ForkServer
+from grader.httpd import start_server
+from grader.pool import Faults, GradingPool, Latency, build_router
+from grader.questions import cacheable, grade_answers
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+# Closes stdout and stderr, then keeps running
+CLOSED_PIPES = "import os, time\nos.close(1)\nos.close(2)\ntime.sleep(30)"
+
+
+def start_pool_server(pool):
+    """Serve `pool` on an ephemeral port from a background event loop"""
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(start_server(build_router(pool), '127.0.0.1', 0))
+    port = server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        pool.shutdown()
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+def http_json(method, url, body=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.status, json.loads(response.read().decode('utf-8'))
+
+
+def http_status(method, url, body=None):
+    """Like http_json, but error statuses are returned instead of raised"""
+    try:
+        return http_json(method, url, body)
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read().decode('utf-8'))
+
+
+def judge0_runner(url):
+    """A grade_answers() runner that executes on a Judge0 API, like executeCode()"""
+    def run(source, stdin, limits):
+        _, body = http_json('POST', f"{url}/submissions?wait=true", {
+            "source_code": source, "stdin": stdin,
+            "cpu_time_limit": limits.cpu_time, "wall_time_limit": limits.wall_time})
+        return body
+    return run
+
+
+def slow_runner(source, stdin, limits):
+    time.sleep(0.5)
+    return run_source(source, stdin, limits)
+
+
+# ============================================================
+# TEST CASES
+# ============================================================
+
+def test_run_source_accepted():
+    result = run_source("import sys\nprint(input())\nprint('err', file=sys.stderr)", stdin="hello\n")
+    assert result['status']['id'] == 3
+    assert result['stdout'] == 'hello\n'
+    assert result['stderr'] == 'err\n'
+    assert result['memory'] > 0 and float(result['time']) >= 0
+
+
+def test_run_source_runtime_error():
+    result = run_source("raise ValueError('boom')")
+    assert result['status']['id'] == 11
+    assert 'ValueError: boom' in result['stderr']
+
+
+def test_cpu_limit():
+    """Busy loops hit RLIMIT_CPU, reported like Judge0's Time Limit Exceeded"""
+    started = time.monotonic()
+    result = run_source("while True:\n    pass", limits=ExecutionLimits(cpu_time=1, wall_time=10))
+    assert result['status']['id'] == 5
+    assert time.monotonic() - started < 5
+
+
+def test_wall_limit():
+    """Sleeping does not use CPU; the wall-clock limit kills it"""
+    started = time.monotonic()
+    result = run_source("import time\ntime.sleep(30)", limits=ExecutionLimits(wall_time=0.5))
+    assert result['status']['id'] == 5
+    assert time.monotonic() - started < 5
+
+    # Closing stdout and stderr does not get a task past the wall-clock limit
+    started = time.monotonic()
+    result = run_source(CLOSED_PIPES, limits=ExecutionLimits(wall_time=0.5))
+    assert result['status']['id'] == 5
+    assert time.monotonic() - started < 5
+
+
+def test_memory_limit():
+    result = run_source("x = bytearray(512 * 1024 * 1024)", limits=ExecutionLimits(memory_kb=128 * 1024))
+    assert result['status']['id'] != 3
+    assert 'MemoryError' in (result['stderr'] or '')
+
+
+def test_output_cap():
+    result = run_source("while True:\n    print('x' * 100)", limits=ExecutionLimits(max_output_bytes=4096))
+    assert result['status']['id'] == 8
+    assert len(result['stdout']) == 4096
+
+
+def test_limits_from_threads():
+    """Pool threads start tasks without preexec_fn: limits and the process group still apply"""
+    from concurrent.futures import ThreadPoolExecutor
+    probe = ("import os, resource\n"
+             "print(resource.getrlimit(resource.RLIMIT_CPU)[0], resource.getrlimit(resource.RLIMIT_AS)[0],"
+             " os.getsid(0) == os.getpid())")
+    limits = ExecutionLimits(cpu_time=2, memory_kb=128 * 1024)
+    with ThreadPoolExecutor(max_workers=8) as threads:
+        results = list(threads.map(lambda _: run_source(probe, limits=limits), range(16)))
+    assert all(r['stdout'] == '2 134217728 True\n' for r in results), results[0]
+
+
+def test_judge0_api_wait():
+    """POST /submissions?wait=true returns the same shape executeCode() reads"""
+    url, stop = start_pool_server(GradingPool(2, ExecutionLimits()))
+    try:
+        status, body = http_json('POST', f"{url}/submissions?base64_encoded=false&wait=true",
+                                 {"source_code": "print('__RUBRIC__' + '{}')", "language_id": 71, "stdin": ""})
+        assert status == 201
+        assert body['status'] == {'id': 3, 'description': 'Accepted'}
+        assert body['stdout'] == '__RUBRIC__{}\n'
+        assert set(body) >= {'stdout', 'stderr', 'compile_output', 'status', 'time', 'memory', 'token'}
+    finally:
+        stop()
+
+
+def test_judge0_api_tokens_and_batch():
+    url, stop = start_pool_server(GradingPool(2, ExecutionLimits()))
+    try:
+        encoded = base64.b64encode(b"print(6 * 7)").decode('ascii')
+        _, body = http_json('POST', f"{url}/submissions?base64_encoded=true",
+                            {"source_code": encoded, "language_id": 71})
+        token = body['token']
+
+        _, batch = http_json('POST', f"{url}/submissions/batch",
+                             {"submissions": [{"source_code": "print(1)"}, {"source_code": "print(2)"}]})
+        tokens = [item['token'] for item in batch]
+
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline:
+            _, single = http_json('GET', f"{url}/submissions/{token}?base64_encoded=true")
+            _, many = http_json('GET', f"{url}/submissions/batch?tokens={','.join(tokens)}&fields=stdout,status")
+            if single['status']['id'] > 2 and all(s['status']['id'] > 2 for s in many['submissions']):
+                break
+            time.sleep(0.05)
+
+        assert base64.b64decode(single['stdout']) == b'42\n'
+        assert [s['stdout'] for s in many['submissions']] == ['1\n', '2\n']
+        assert set(many['submissions'][0]) == {'stdout', 'status'}
+    finally:
+        stop()
+
+
+def test_evicted_tokens():
+    """A submission whose token is evicted before it finishes is dropped: 404, and the pool keeps counting"""
+    accepted = lambda source, stdin, limits: {'status': {'id': 3, 'description': 'Accepted'}, 'stdout': source}
+    pool = GradingPool(1, ExecutionLimits(), runner=accepted)
+    url, stop = start_pool_server(pool)
+    saved, grader.pool.MAX_STORED_RESULTS = grader.pool.MAX_STORED_RESULTS, 2
+    try:
+        _, batch = http_json('POST', f"{url}/submissions/batch",
+                             {"submissions": [{"source_code": "a"}, {"source_code": "b"}, {"source_code": "c"}]})
+        tokens = [item['token'] for item in batch]
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and pool.pending:
+            time.sleep(0.02)
+
+        assert pool.pending == 0
+        assert http_status('GET', f"{url}/submissions/{tokens[0]}")[0] == 404
+        _, many = http_json('GET', f"{url}/submissions/batch?tokens={','.join(tokens)}&fields=stdout")
+        assert many['submissions'] == [None, {'stdout': 'b'}, {'stdout': 'c'}]
+    finally:
+        grader.pool.MAX_STORED_RESULTS = saved
+        stop()
+
+
+def test_latency_and_fault_specs():
+    rng = random.Random(3)
+    assert Latency('fixed:250', rng).sample() == 250
+    assert all(10 <= Latency('uniform:10,20', rng).sample() <= 20 for _ in range(100))
+    samples = sorted(Latency('lognormal:300,0.5', rng).sample() for _ in range(2000))
+    assert 270 < samples[1000] < 330 and samples[-1] > 2 * samples[1000]
+    assert min(Latency('normal:5,50', rng).sample() for _ in range(200)) == 0
+    for bad in ('fixed', 'gamma:1,2', 'uniform:1', 'exp:fast'):
+        try:
+            Latency(bad)
+            assert False, bad
+        except ValueError:
+            pass
+
+    faults = Faults('http503=0.25,internal=0.5', random.Random(3))
+    draws = [faults.draw(Faults.RESULT) for _ in range(4000)]
+    assert 0.45 < draws.count('internal') / 4000 < 0.55 and 'http503' not in draws
+    assert Faults('').draw(Faults.HTTP) is None
+    try:
+        Faults('crash=0.1')
+        assert False, 'unknown fault accepted'
+    except ValueError:
+        pass
+
+
+def test_queue_limit():
+    """Past workers + queue_limit pending submissions, Judge0 answers 503 'queue is full'"""
+    pool = GradingPool(1, ExecutionLimits(), runner=slow_runner, queue_limit=1)
+    url, stop = start_pool_server(pool)
+    try:
+        status, _ = http_status('POST', f"{url}/submissions/batch",
+                                {"submissions": [{"source_code": "print(1)"}] * 3})
+        assert status == 503
+        tokens = [http_status('POST', f"{url}/submissions", {"source_code": "print(1)"}) for _ in range(3)]
+        assert [status for status, _ in tokens] == [201, 201, 503]
+        assert tokens[2][1] == {'error': 'queue is full'}
+
+        _, about = http_json('GET', f"{url}/about")
+        assert about['queue_limit'] == 1
+        assert about['stats']['accepted'] == 2 and about['stats']['rejected'] == 4
+        assert about['stats']['pending'] == 2 and about['stats']['queued'] == 1
+
+        deadline = time.monotonic() + 10
+        while pool.pending and time.monotonic() < deadline:
+            time.sleep(0.05)
+        status, body = http_json('POST', f"{url}/submissions?wait=true", {"source_code": "print(2)"})
+        assert status == 201 and body['stdout'] == '2\n'
+        assert pool.stats()['peak_pending'] == 2 and pool.pending == 0
+    finally:
+        stop()
+
+
+def test_injected_faults_and_latency():
+    limits = ExecutionLimits(cpu_time=0.2, wall_time=0.3)
+    pool = GradingPool(2, limits, latency=Latency('fixed:100'), faults=Faults('internal=1'))
+    url, stop = start_pool_server(pool)
+    try:
+        started = time.monotonic()
+        _, body = http_json('POST', f"{url}/submissions?wait=true", {"source_code": "print(1)"})
+        assert body['status']['id'] == 13 and body['message'] == 'injected failure'
+        assert time.monotonic() - started >= 0.1
+
+        pool.faults = Faults('timeout=1')
+        started = time.monotonic()
+        _, body = http_json('POST', f"{url}/submissions?wait=true", {"source_code": "print(1)"})
+        assert body['status']['id'] == 5 and time.monotonic() - started >= 0.4
+
+        pool.faults = Faults('http500=1')
+        assert http_status('POST', f"{url}/submissions?wait=true", {"source_code": "print(1)"})[0] == 500
+        pool.faults = Faults('http503=1')
+        assert http_status('POST', f"{url}/submissions/batch", {"submissions": [{"source_code": "x"}]})[0] == 503
+
+        # Failed requests are never admitted; reads are not subject to faults
+        _, about = http_json('GET', f"{url}/about")
+        assert about['stats']['injected'] == {'internal': 1, 'timeout': 1, 'http500': 1, 'http503': 1}
+        assert about['stats']['accepted'] == 2 and about['latency'] == 'fixed:100'
+    finally:
+        stop()
+
+
+def test_sandbox_failures_are_not_cached():
+    """An Internal Error or time limit on an assertion question is not a grade of the answer"""
+    pool = GradingPool(2, ExecutionLimits(cpu_time=1, wall_time=0.5), faults=Faults('internal=1'))
+    url, stop = start_pool_server(pool)
+    question = {"id": "A1", "points": 5, "validationCode": "assert tambah(2, 3) == 5"}
+    try:
+        grade = grade_answers([question], {"A1": "def tambah(a, b):\n    return a + b"}, runner=judge0_runner(url))
+        assert grade['A1']['status'] == 'error' and not cacheable(grade['A1'])
+
+        pool.faults = Faults('timeout=1')
+        grade = grade_answers([question], {"A1": "def tambah(a, b):\n    return a + b"}, runner=judge0_runner(url))
+        assert grade['A1']['status'] == 'timeout' and not cacheable(grade['A1'])
+
+        # A wrong answer still is a grade
+        pool.faults = None
+        grade = grade_answers([question], {"A1": "def tambah(a, b):\n    return a - b"}, runner=judge0_runner(url))
+        assert grade['A1']['score'] == 0 and cacheable(grade['A1'])
+    finally:
+        stop()
+
+
+def test_limited_grades_are_not_cached():
+    """A grade that hit a time or resource limit may differ on a less loaded machine"""
+    question = {"id": "R1", "points": 10, "gradingType": "rubric", "rubric": {"criteria": [
+        {"name": "hasil", "points": 10, "tests": {
+            "function": "tambah", "inputs": [[1, 2], [3, 4]], "expected": [3, 7], "time_limit": 0.2}},
+    ]}}
+    slow = "import time\ndef tambah(a, b):\n    time.sleep(1)\n    return a + b"
+    grade = grade_answers([question], {"R1": slow})['R1']
+    assert grade['status'] == 'graded' and grade['score'] == 0
+    assert grade['tests']['hasil']['limited'] == 2 and not cacheable(grade)
+
+    grade = grade_answers([question], {"R1": "def tambah(a, b):\n    return a - b"})['R1']
+    assert grade['score'] == 0 and 'limited' not in grade['tests']['hasil'] and cacheable(grade)
+
+    question = dict(question, stepBudget=1000)
+    grade = grade_answers([question], {"R1": "while True:\n    pass"})['R1']
+    assert 'step_budget_exceeded' in grade['errors'] and not cacheable(grade)
+    print("✅ PASSED: limited grades are not cached")
+
+
+def test_forkserver_matches_subprocess():
+    """A forked warm child produces what a fresh interpreter produces"""
+    scripts = [
+        combined_source(SAMPLE_ANSWER, SAMPLE_VALIDATION),
+        combined_source("def tambah(a):\n    return a", SAMPLE_VALIDATION),
+        combined_source("x = 1", "assert x == 2, 'wrong'"),
+        "import sys\nprint(input())\nsys.exit(3)",
+    ]
+    with ForkServer() as server:
+        for script in scripts:
+            cold = run_source(script, stdin="hi\n")
+            warm = server.run_source(script, stdin="hi\n")
+            assert warm['status'] == cold['status'], (warm, cold)
+            assert warm['stdout'] == cold['stdout']
+            assert (warm['stderr'] or '').splitlines()[-1:] == (cold['stderr'] or '').splitlines()[-1:]
+
+
+def test_forkserver_grade_and_limits():
+    """grade() reuses the zygote's compiled validation; limits still apply per task"""
+    with ForkServer() as server:
+        for _ in range(3):
+            result = server.grade(SAMPLE_ANSWER, SAMPLE_VALIDATION, 'Q2')
+            assert result['status']['id'] == 3
+            assert result['stdout'].endswith('"score": 10, "max_score": 10, "breakdown": '
+                                             '{"function": 5, "return": 5}, "errors": []}\n'), result
+
+        broken = server.grade("x = 1", "def (:")
+        assert broken['status']['id'] == 11 and 'SyntaxError' in broken['stderr']
+
+        started = time.monotonic()
+        spin = server.run_source("while True:\n    pass", limits=ExecutionLimits(cpu_time=1))
+        sleep = server.run_source("import time\ntime.sleep(30)", limits=ExecutionLimits(wall_time=0.5))
+        closed = server.run_source(CLOSED_PIPES, limits=ExecutionLimits(wall_time=0.5))
+        assert spin['status']['id'] == sleep['status']['id'] == closed['status']['id'] == 5
+        assert time.monotonic() - started < 10
+
+        capped = server.run_source("while True:\n    print('x' * 100)",
+                                   limits=ExecutionLimits(max_output_bytes=4096))
+        assert capped['status']['id'] == 8 and len(capped['stdout']) == 4096
+
+
+def test_forkserver_as_pool_runner():
+    with ForkServer() as server:
+        url, stop = start_pool_server(GradingPool(2, ExecutionLimits(), runner=server.run_source))
+        try:
+            _, body = http_json('POST', f"{url}/submissions?wait=true", {"source_code": "print(6 * 7)"})
+            assert body['stdout'] == '42\n' and body['status']['id'] == 3
+        finally:
+            stop()
+
+
+# ============================================================
+# RUN ALL TESTS
+# ============================================================
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith('test_') and callable(v)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ PASSED | {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  ❌ FAILED | {test.__name__}: {e}")
+    print("🎉 ALL TESTS PASSED!" if not failed else f"⚠️ {failed} TEST(S) FAILED")
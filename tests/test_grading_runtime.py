@@ -0,0 +1,608 @@
+"""
+Test Script for the Grading Runtime (grader/runtime.py)
+Run with pytest, or directly: python tests/test_grading_runtime.py
+"""
+
+import ast
+import base64
+import io
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grader import (
+    analyze, classify_validation, combined_source, compile_artifact, compile_rubric, load_validation,
+    prepare_validations, read_final_frame, read_frames, runtime_source,
+)
+from grader import runtime
+from grader.runtime import CompiledTests
+from test_grading_engine import run_grading_engine, run_grading_batch, parse_rubric_output
+from scripts.create_alpro_exam import QUESTIONS
+
+# ============================================================
+# FIXTURES
+# ============================================================
+
+EVEN_SUM = """
+total = 0
+for i in range(11):
+    if i % 2 == 0:
+        total += i
+print(total)
+"""
+
+ALPRO_CORRECT = {
+    "Q1": "def print_pesan(teks):\n    print(teks)\nprint_pesan('Hello')",
+    "Q2": "def tambah(a, b):\n    return a + b\nprint(tambah(3, 5))",
+    "Q3": "def tambah(a, b):\n    return a + b\nhasil = tambah(10, 20)\nprint(hasil)",
+    "Q4": "def luas_persegi_panjang(p, l):\n    return p * l",
+    "Q5": "def luas_lingkaran(r):\n    return 3.14 * r * r",
+    "Q6": "def nilai_minimum(daftar):\n    m = daftar[0]\n    for x in daftar:\n        if x < m:\n            m = x\n    return m",
+    "Q7": "def rata_rata(daftar):\n    t = 0\n    for x in daftar:\n        t += x\n    return t / len(daftar)",
+    "Q8": "def status_kelulusan(nilai):\n    if nilai >= 75:\n        return 'Lulus'\n    return 'Tidak Lulus'",
+    "Q9": "def tampilkan_identitas():\n    print('Nama: Test')\n    print('NIM: 1')",
+    "Q10": "def hitung_luas_dan_tampilkan(p, l):\n    print(p * l)",
+}
+
+
+def rubric_validation(spec):
+    """Same snippet buildRubricValidation() generates in rubricGrader.ts"""
+    namespace = ", globals()" if any('tests' in c for c in spec['criteria']) else ""
+    return f"grade_rubric({json.dumps(json.dumps(spec))}, __STUDENT_CODE__, '__RUBRIC__'{namespace})"
+
+
+def run_exam_script(jobs):
+    """Simulates buildExamCode() in rubricGrader.ts: one script, one __BATCH__ frame at the end"""
+    payload = base64.b64encode(json.dumps(jobs).encode('utf-8')).decode('utf-8')
+    script = runtime_source() + f"""
+import base64
+run_exam(decode_payload("{payload}"))
+"""
+    old_stdout = sys.stdout
+    sys.stdout = buffer = io.StringIO()
+    try:
+        exec(script, {})
+    finally:
+        sys.stdout = old_stdout
+    output = buffer.getvalue()
+    results = read_final_frame(output, '__BATCH__')
+    assert results is not None, output
+    return results
+
+
+def run_script(script):
+    """Run a full grading script (e.g. combined_source()) and return its stdout"""
+    old_stdout = sys.stdout
+    sys.stdout = buffer = io.StringIO()
+    try:
+        exec(script, {})
+    finally:
+        sys.stdout = old_stdout
+    return buffer.getvalue()
+
+
+def read_sample_validation():
+    with open(os.path.join(ROOT, 'samplequestion', 'sq-alpro.py'), encoding='utf-8') as f:
+        return f.read()
+
+
+# ============================================================
+# TEST CASES
+# ============================================================
+
+def test_fact_table():
+    """One traversal answers every structural question"""
+    facts = analyze(EVEN_SUM)
+
+    assert facts.has('For') and not facts.has('While')
+    assert facts.has_loop and facts.has_if
+    assert facts.calls_name('print') and facts.calls_name('range')
+    assert facts.has_binop('Mod')
+    assert facts.has_mod_compare(2, 'Eq', 0)
+    assert not facts.has_mod_compare(2, 'NotEq', 0)
+    assert facts.assigns_name('total') and 'total' in facts.aug_assigns
+    assert facts.count('Compare') == 1
+
+
+def test_fact_table_functions():
+    """Function arity and returns"""
+    facts = analyze("def f(a, b):\n    return a * b\n\ndef g():\n    x, y = 1, 2\n")
+
+    assert facts.has_function('f') and facts.has_function('f', params=2)
+    assert not facts.has_function('f', params=1)
+    assert facts.has_function('g', params=0)
+    assert facts.has_return and facts.returns == 1
+    assert facts.assigns_name('x') and facts.assigns_name('y')
+
+
+def test_single_walk():
+    """analyze() walks once and caches per source string"""
+    calls = []
+    original = ast.walk
+
+    def counting_walk(node):
+        calls.append(node)
+        return original(node)
+
+    ast.walk = counting_walk
+    try:
+        source = EVEN_SUM + "\n# unique"
+        first = analyze(source)
+        second = analyze(source)
+    finally:
+        ast.walk = original
+
+    assert first is second
+    assert len(calls) == 1
+
+
+def test_syntax_error_propagates():
+    try:
+        analyze("def broken(:\n")
+    except SyntaxError:
+        return
+    raise AssertionError("expected SyntaxError")
+
+
+def test_sample_validation():
+    """sq-alpro.py grades every Alpro question through compiled rubric specs"""
+    validation = read_sample_validation()
+    for qid, answer in ALPRO_CORRECT.items():
+        result = run_grading_engine(answer, f"__QUESTION_ID__ = {qid!r}\n" + validation)
+        rubric = parse_rubric_output(result['output'])
+        assert rubric is not None, (qid, result)
+        assert rubric['score'] == 10, (qid, rubric)
+
+    result = run_grading_engine("x = 1", "__QUESTION_ID__ = 'Q2'\n" + validation)
+    assert parse_rubric_output(result['output'])['score'] == 0
+
+
+def test_alpro_question_validation():
+    """Every rubric spec in create_alpro_exam.py grades through the runtime"""
+    for question in QUESTIONS:
+        validation = rubric_validation(question['rubric'])
+        correct = run_grading_engine(ALPRO_CORRECT[question['id']], validation)
+        wrong = run_grading_engine("x = 1", validation)
+        assert parse_rubric_output(correct['output'])['score'] == 10, question['id']
+        assert parse_rubric_output(wrong['output'])['score'] == 0, question['id']
+
+
+def test_rubric_partial_credit():
+    """Partial alternatives award reduced points with their own error"""
+    spec = {"criteria": [
+        {"name": "loop", "points": 3, "check": {"node": "For"}, "error": "missing_loop",
+         "partial": [{"check": {"node": "While"}, "points": 2, "error": "used_while_instead_of_for"}]},
+        {"name": "even", "points": 2, "check": {"mod_compare": [2, "Eq", 0]}},
+        {"name": "no_min", "points": 1, "check": {"not": {"calls": "min"}}},
+    ]}
+    rubric = compile_rubric(spec)
+    assert rubric.max_score == 6
+
+    result = rubric.grade("i = 0\nwhile i < 10:\n    i += 1\nprint(min(1, 2))")
+    assert result['score'] == 2
+    assert result['breakdown'] == {'loop': 2, 'even': 0, 'no_min': 0}
+    assert result['errors'] == ['used_while_instead_of_for', 'missing_even', 'missing_no_min']
+
+    assert rubric.grade(EVEN_SUM)['score'] == 6
+
+
+def test_rubric_syntax_error():
+    result = compile_rubric({"criteria": [{"name": "f", "points": 5, "check": {"loop": True}}]}).grade("def (")
+    assert result['score'] == 0 and result['breakdown'] == {'f': 0}
+    assert result['errors'][0].startswith('Syntax error')
+
+
+def test_rubric_invalid_spec():
+    """Bad specs fail when compiled, not when a student is graded"""
+    for spec in ({"criteria": []},
+                 {"criteria": [{"name": "x", "points": 1, "check": {"unknown": 1}}]},
+                 {"criteria": [{"name": "x", "points": 1, "check": {"calls": "a", "binop": "Add"}}]}):
+        try:
+            compile_rubric(spec)
+        except ValueError:
+            continue
+        raise AssertionError(f"expected ValueError for {spec}")
+
+
+def test_rubric_cache_is_bounded():
+    """Long-lived graders keep only the most recent RUBRIC_CACHE_SIZE compiled specs"""
+    spec = {"criteria": [{"name": "f", "points": 5, "check": {"function": "f"}}]}
+    assert compile_rubric(spec) is compile_rubric(json.dumps(spec, sort_keys=True))
+    for i in range(runtime.RUBRIC_CACHE_SIZE + 10):
+        compile_rubric({"criteria": [{"name": "f", "points": 5, "check": {"function": "f%d" % i}}]})
+    assert runtime._compile_rubric_json.cache_info().currsize == runtime.RUBRIC_CACHE_SIZE
+
+
+def test_functional_tests():
+    """Tests call the student's function on every case in one run and score by pass count"""
+    spec = {"criteria": [
+        {"name": "fungsi", "points": 4, "check": {"function": "rata_rata", "params": 1}},
+        {"name": "hasil", "points": 6, "tests": {
+            "function": "rata_rata",
+            "inputs": [[[10, 20, 30]], [[1, 2]], [[0.1, 0.2]], [[7]]] + [[[i, i + 1]] for i in range(200)],
+            "expected": [20, 1.5, 0.15, 7] + [i + 0.5 for i in range(200)],
+        }},
+    ]}
+    strict = json.loads(json.dumps(spec))
+    strict['criteria'][1]['tests'].update(time_limit=0.05, max_failures=2)
+    validation = rubric_validation(spec)
+    assert not classify_validation(validation)['static']
+
+    correct, skewed, hanging, missing = run_exam_script([
+        {"id": "Q7", "code": ALPRO_CORRECT['Q7'], "validation": validation},
+        {"id": "Q7", "code": "def rata_rata(daftar):\n    return sum(daftar) // len(daftar)", "validation": validation},
+        {"id": "Q7", "code": "def rata_rata(daftar):\n    while len(daftar) > 1:\n        print(daftar)",
+         "validation": rubric_validation(strict)},
+        {"id": "Q7", "code": "x = 1", "validation": validation},
+    ])
+
+    result = parse_rubric_output(correct['stdout'])
+    assert result['score'] == 10 and result['tests'] == {'hasil': {'passed': 204, 'failed': 0, 'skipped': 0, 'total': 204}}
+    result = parse_rubric_output(skewed['stdout'])
+    assert result['breakdown'] == {'fungsi': 4, 'hasil': 0}, result
+    assert result['errors'] == ['failed_hasil (2/204 passed; rata_rata([1, 2]) returned 1, expected 1.5)']
+    result = parse_rubric_output(hanging['stdout'])
+    assert result['tests']['hasil'] == {'passed': 0, 'failed': 2, 'skipped': 202, 'total': 204, 'limited': 2}, result
+    assert 'took longer than 0.05s' in result['errors'][0]
+    result = parse_rubric_output(missing['stdout'])
+    assert result['score'] == 0 and 'function rata_rata is not defined' in result['errors'][-1]
+
+    try:
+        compile_rubric(spec).grade(ALPRO_CORRECT['Q7'])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("tests without a namespace must fail")
+
+
+def test_functional_test_points():
+    """Partial credit of functional tests is rounded down: exam_submissions.score is an INTEGER"""
+    assert CompiledTests.points(10, {'passed': 2, 'total': 3}) == 6
+    assert CompiledTests.points(6, {'passed': 2, 'total': 204}) == 0
+    assert CompiledTests.points(7, {'passed': 5, 'total': 5}) == 7
+    assert all(isinstance(CompiledTests.points(10, {'passed': n, 'total': 7}), int) for n in range(8))
+
+
+def test_reference_outputs():
+    """Reference solutions fill in expected outputs once; failures name the case"""
+    tests = {"function": "rata_rata", "inputs": [[[10, 20, 30]], [[1, 2]], [[0.5]]]}
+    jobs = [
+        {"code": ALPRO_CORRECT['Q7'] + "\nprint('loaded')", "tests": [tests]},
+        {"code": "def rata_rata(daftar):\n    return sum(daftar) / (len(daftar) - 1)", "tests": [tests]},
+        {"code": "def rata_rata(daftar):\n    return set(daftar)", "tests": [tests]},
+        {"code": "def rata_rata(daftar) pass", "tests": [tests]},
+    ]
+    payload = base64.b64encode(json.dumps(jobs).encode('utf-8')).decode('utf-8')
+    script = runtime_source() + f'\nrun_references(decode_payload("{payload}"))\n'
+    computed, dividing, unserializable, broken = read_final_frame(run_script(script), '__REFERENCE__')
+
+    assert computed == {'expected': [[20.0, 1.5, 0.5]]}
+    assert dividing['error'] == 'rata_rata([0.5]) raised ZeroDivisionError: float division by zero'
+    assert 'not JSON' in unserializable['error']
+    assert broken['error'].startswith('line 1:')
+
+    spec = {"criteria": [{"name": "hasil", "points": 10, "tests": dict(tests, expected=computed['expected'][0])}]}
+    result = parse_rubric_output(run_grading_engine(ALPRO_CORRECT['Q7'], rubric_validation(spec))['output'])
+    assert result['score'] == 10
+
+
+def test_exam_batch_matches_single_runs():
+    """run_exam grades a whole exam in one script with the same results"""
+    jobs = [
+        {"id": q["id"], "code": ALPRO_CORRECT[q["id"]], "validation": rubric_validation(q["rubric"])}
+        for q in QUESTIONS
+    ]
+    outputs = run_exam_script(jobs)
+    assert [o['id'] for o in outputs] == [q['id'] for q in QUESTIONS]
+    for job, output in zip(jobs, outputs):
+        single = run_grading_engine(job['code'], job['validation'])
+        assert output['ok']
+        assert parse_rubric_output(output['stdout']) == parse_rubric_output(single['output'])
+
+
+def test_exam_batch_isolation():
+    """Each question gets a fresh namespace and its own captured output"""
+    outputs = run_exam_script([
+        {"id": "a", "code": "shared = 1\nprint('hidden')", "validation": "assert shared == 1\nprint('from a')"},
+        {"id": "b", "code": "print('hidden')", "validation": "assert 'shared' not in globals()\nprint('from b')"},
+        {"id": "c", "code": "raise SystemExit(3)", "validation": "assert __exec_error__ == '3'\nassert __QUESTION_ID__ == 'c'"},
+        {"id": "d", "code": "x = 1", "validation": "assert x == 2, 'wrong'"},
+        {"id": "e", "code": "print('still runs')", "validation": ""},
+    ])
+    assert [o['ok'] for o in outputs] == [True, True, True, False, True]
+    assert outputs[0]['stdout'] == 'from a\n' and outputs[1]['stdout'] == 'from b\n'
+    assert 'AssertionError: wrong' in outputs[3]['stderr']
+    assert outputs[4]['stdout'] == ''  # student output never reaches the results
+
+
+def test_student_batch():
+    """300 answers to one question in one execution, validation compiled once"""
+    question = QUESTIONS[1]  # Q2 tambah(a, b)
+    validation = rubric_validation(question['rubric'])
+    answers = [ALPRO_CORRECT['Q2'], "x = 1", "def tambah(a):\n    return a", "def (:"] * 75
+
+    compiled = []
+    original_compile = compile
+
+    def counting_compile(source, filename, *args, **kwargs):
+        compiled.append(filename)
+        return original_compile(source, filename, *args, **kwargs)
+
+    import builtins
+    builtins.compile = counting_compile
+    try:
+        results = run_grading_batch(answers, validation, question['id'])
+    finally:
+        builtins.compile = original_compile
+
+    assert compiled.count('<validation>') == 1
+    assert [r['key'] for r in results] == [str(i) for i in range(300)]
+    scores = [parse_rubric_output(r['stdout'])['score'] for r in results[:4]]
+    assert scores == [10, 0, 5, 0]
+    for answer, result in zip(answers[:4], results[:4]):
+        single = run_grading_engine(answer, validation)
+        assert parse_rubric_output(result['stdout']) == parse_rubric_output(single['output'])
+
+
+def test_classify_validation():
+    """Validation that only inspects the source is static"""
+    static = [
+        read_sample_validation(),
+        "facts = analyze(__STUDENT_CODE__)\nfor name in facts.functions:\n    print(name)",
+        "def check(source):\n    return [n for n in analyze(source).calls]\nprint(check(__STUDENT_CODE__))",
+        "qid = globals().get('__QUESTION_ID__', '')",
+        "def outer(a):\n    b = a\n    def inner():\n        return a + b\n    return inner()\nprint(outer(1))",
+        "def setup():\n    global total\n    total = 0\ndef add():\n    return total + 1",
+    ] + [rubric_validation(q['rubric']) for q in QUESTIONS]
+    for source in static:
+        assert classify_validation(source) == {'static': True, 'reasons': []}, source
+
+    dynamic = {
+        "assert tambah(2, 3) == 5": "reads student variable 'tambah'",
+        "if __exec_error__:\n    print('error')": "reads __exec_error__",
+        "print('tambah' in dir())": "calls dir()",
+        "print(eval('hasil'))": "calls eval()",
+        "print(globals()['hasil'])": "calls globals()",
+        "total = total + 1": "reads student variable 'total'",
+        "def f():\n    return hasil": "reads student variable 'hasil'",
+        "def (:": "syntax error",
+        # Runtime modules the batch namespace does not export come from the student's imports
+        "print(math.sqrt(4))": "reads student variable 'math'",
+        "print(sys.version)": "reads student variable 'sys'",
+        # Frame introspection reaches the program's namespace without naming a variable
+        "import inspect\nhasil = inspect.currentframe().f_back.f_globals['hasil']": "imports inspect",
+        "import sys\nprint(sys._getframe(1).f_globals['hasil'])": "uses frame introspection",
+        "from sys import _getframe\nprint(_getframe().f_locals)": "uses frame introspection",
+        "def f():\n    pass\nprint(f.__globals__['hasil'])": "uses frame introspection",
+        "print(vars()['hasil'])": "calls vars()",
+        # A local of one function does not bind the name in another
+        "def a():\n    hasil = 1\n    return hasil\ndef b():\n    return hasil": "reads student variable 'hasil'",
+        "def a(hasil):\n    return hasil\nprint(lambda: hasil)": "reads student variable 'hasil'",
+        "class C:\n    hasil = 1\n    def m(self):\n        return hasil": "reads student variable 'hasil'",
+    }
+    for source, reason in dynamic.items():
+        result = classify_validation(source)
+        assert not result['static'] and result['reasons'][0].startswith(reason), (source, result)
+
+    # Every name a static script may read is in the batch namespace
+    source = "print(base64.b64encode(json.dumps(len(__STUDENT_CODE__)).encode()).decode())"
+    assert classify_validation(source)['static']
+    result = runtime.run_question({'id': 'Q', 'code': 'x = 1', 'validation': source, 'static': True})
+    assert result['ok'] and result['stdout'].strip() == 'NQ==', result
+
+
+def test_static_grading_skips_student_code():
+    """Static validation grades loops and exits without running them"""
+    spec = QUESTIONS[1]['rubric']  # Q2 tambah(a, b)
+    looping = "def tambah(a, b):\n    return a + b\nwhile True:\n    pass"
+    exiting = "def tambah(a, b):\n    return a + b\nraise SystemExit"
+
+    outputs = run_exam_script([
+        {"id": "Q2", "code": looping, "validation": rubric_validation(spec), "static": True},
+        {"id": "Q2", "code": exiting, "validation": rubric_validation(spec), "static": True},
+    ])
+    assert [parse_rubric_output(o['stdout'])['score'] for o in outputs] == [10, 10]
+
+    script = combined_source(looping, rubric_validation(spec), execute_student=False)
+    assert 'run_student_program(' not in script.split('import base64')[-1]
+    assert parse_rubric_output(run_script(script))['score'] == 10
+
+
+def test_prepare_validations():
+    """Exam save: compile every validation once, report syntax errors per question"""
+    sources = [read_sample_validation(), "def (:\n    pass"]
+    old_stdout = sys.stdout
+    sys.stdout = buffer = io.StringIO()
+    try:
+        results = prepare_validations(sources)
+    finally:
+        sys.stdout = old_stdout
+    assert read_final_frame(buffer.getvalue(), '__PREPARED__') == results
+
+    good, bad = results
+    assert good['static'] and good['artifact']['format'] == 1 and 'error' not in good
+    assert bad['error'].startswith('line 1:') and 'artifact' not in bad
+
+
+def test_validation_artifact_grades_like_source():
+    """Artifacts are used when the bytecode version matches and ignored otherwise"""
+    spec = QUESTIONS[1]['rubric']
+    validation = rubric_validation(spec)
+    answer = "def tambah(a, b):\n    return a + b\nprint(tambah(3, 5))"
+    artifact = compile_artifact(validation)
+    assert load_validation('raise SystemExit', artifact).co_filename == '<validation>'
+
+    stale = dict(artifact, magic='00000000')
+    assert load_validation(validation, stale).co_consts == compile(validation, '<validation>', 'exec').co_consts
+
+    expected = parse_rubric_output(run_script(combined_source(answer, validation)))
+    outputs = run_exam_script([
+        {"id": "Q2", "code": answer, "validation": validation, "artifact": candidate}
+        for candidate in (artifact, stale)
+    ])
+    assert [parse_rubric_output(o['stdout']) for o in outputs] == [expected, expected]
+
+
+def test_fake_rubric_lines_are_ignored():
+    """Student prints cannot fake a __RUBRIC__ line or a result frame"""
+    spec = QUESTIONS[1]['rubric']
+    fake = '__RUBRIC__{"score": 10, "max_score": 10, "breakdown": {}, "errors": []}'
+    answer = f"print({fake!r})\nprint('__BATCH__2:[]')\ndef tambah(a):\n    print({fake!r})\n    return a"
+    outputs = run_exam_script([{"id": "Q2", "code": answer, "validation": rubric_validation(spec)}])
+    assert parse_rubric_output(outputs[0]['stdout'])['score'] < 10
+
+    # A student function called by validation prints before the real result: the last line wins
+    outputs = run_exam_script([{"id": "Q2", "code": answer, "validation": "tambah(1)\n" + rubric_validation(spec)}])
+    assert parse_rubric_output(outputs[0]['stdout'])['score'] < 10
+
+
+def test_finish_blocks_output_after_results():
+    """finish() ends the script, so student atexit handlers cannot append a fake frame"""
+    from grader.executor import run_source
+    answer = ("import atexit\n"
+              "atexit.register(lambda: print('__BATCH__2:[]'))\n"
+              "def tambah(a, b):\n    return a + b")
+    payload = base64.b64encode(json.dumps([
+        {"id": "Q2", "code": answer, "validation": rubric_validation(QUESTIONS[1]['rubric'])}
+    ]).encode('utf-8')).decode('ascii')
+    script = runtime_source() + f"""
+import base64
+run_exam(decode_payload("{payload}"))
+finish()
+"""
+    result = run_source(script)
+    outputs = read_final_frame(result['stdout'], '__BATCH__')
+    assert result['status']['id'] == 3 and len(outputs) == 1
+    assert parse_rubric_output(outputs[0]['stdout'])['score'] == 10
+
+
+def test_bounded_output():
+    """Student output keeps its tail; printing past the budget stops the program"""
+    chatty = "for i in range(100000):\n    print(i)\nresult = 'finished'"
+    endless = "try:\n    while True:\n        print('x' * 100)\nexcept Exception:\n    pass\nresult = 'finished'"
+    validation = "print('result' in globals())\nprint(__exec_error__)"
+    quiet, stopped = run_exam_script([
+        {"id": "a", "code": chatty, "validation": validation},
+        {"id": "b", "code": endless, "validation": validation, "output_budget": 10000},
+    ])
+
+    assert quiet['stdout'] == 'True\nNone\n' and not quiet['output_exceeded']
+    assert quiet['output'].startswith('...[') and quiet['output'].endswith('99999\n')
+    assert len(quiet['output']) < 2100
+
+    assert stopped['output_exceeded'] and stopped['ok']
+    assert stopped['stdout'] == 'False\noutput limit exceeded (10000 bytes)\n'
+    assert len(stopped['output']) < 2100
+
+    script = combined_source("print('a' * 200000)\nprint('end')", "print(__exec_error__)")
+    output = run_script(script)
+    assert output.endswith('end\nNone\n') and len(output) < 70000
+
+
+def test_step_budget():
+    """Runaway loops stop after a fixed number of lines; validation still runs"""
+    looping = "def tambah(a, b):\n    return a + b\nwhile True:\n    pass"
+    hanging = "def tambah(a, b):\n    while True:\n        pass"
+    spec = QUESTIONS[1]['rubric']
+    stopped, called, unlimited = run_exam_script([
+        {"id": "Q2", "code": looping, "validation": rubric_validation(spec) + "\nprint(__exec_error__)",
+         "step_budget": 5000},
+        {"id": "Q2", "code": hanging, "validation": "tambah(1, 2)", "step_budget": 5000},
+        {"id": "Q2", "code": ALPRO_CORRECT['Q2'], "validation": rubric_validation(spec), "step_budget": 5000},
+    ])
+
+    assert stopped['ok'] and stopped['step_budget_exceeded']
+    assert parse_rubric_output(stopped['stdout'])['score'] == 10
+    assert stopped['stdout'].endswith('step budget exceeded (5000 steps)\n')
+    assert not called['ok'] and called['step_budget_exceeded'] and 'step budget' in called['stderr']
+    assert unlimited['ok'] and not unlimited['step_budget_exceeded']
+    assert sys.gettrace() is None or 'StudentTracer' not in repr(sys.gettrace())
+
+
+def test_tracer_cannot_be_removed():
+    """Student code cannot switch the step budget off"""
+    validation = "print(__exec_error__)"
+    refused, caught, threaded, removed, spawned = run_exam_script([
+        {"id": "a", "code": "import sys\nsys.settrace(None)\nwhile True:\n    pass",
+         "validation": validation, "step_budget": 5000},
+        {"id": "b", "code": "import sys\ntry:\n    sys.settrace(None)\nexcept RuntimeError:\n    pass\n"
+                            "while True:\n    pass", "validation": validation, "step_budget": 5000},
+        {"id": "c", "code": "import threading\nthreading.settrace(None)", "validation": validation,
+         "step_budget": 5000},
+        # Reaching the real settrace anyway: the missing tracer is noticed at exit
+        {"id": "d", "code": "import sys\nsys.settrace.__globals__['_settrace'](None)\nx = 1",
+         "validation": validation, "step_budget": 5000},
+        {"id": "e", "code": "import threading\ndef spin():\n    try:\n        while True:\n            pass\n"
+                            "    except BaseException as e:\n        print(e)\n"
+                            "t = threading.Thread(target=spin)\nt.start()\nt.join()",
+         "validation": validation, "step_budget": 5000},
+    ])
+
+    assert 'settrace() is not available' in refused['stdout'] and not refused['step_budget_exceeded']
+    assert caught['step_budget_exceeded'] and 'step budget exceeded' in caught['stdout']
+    assert 'settrace() is not available' in threaded['stdout']
+    assert removed['step_budget_exceeded'] and 'the tracer was removed' in removed['stdout']
+    assert spawned['step_budget_exceeded'] and spawned['output'] == 'step budget exceeded (5000 steps)\n'
+    assert type(sys.settrace).__name__ == 'builtin_function_or_method'
+
+
+def test_peak_memory():
+    """The student phase's peak allocation is reported and can be capped"""
+    grow = "data = []\nfor i in range(200):\n    data.append(bytearray(10000))\nprint(len(data))"
+    small, capped, static = run_exam_script([
+        {"id": "a", "code": grow, "validation": "print(len(data))"},
+        {"id": "b", "code": grow, "validation": "print(len(data))\nprint(__exec_error__)",
+         "memory_limit": 500000},
+        {"id": "c", "code": grow, "validation": "pass", "static": True},
+    ])
+
+    assert small['stdout'] == '200\n' and small['peak_memory'] >= 2000000 and not small['memory_exceeded']
+    assert capped['memory_exceeded'] and capped['peak_memory'] < 1000000
+    assert capped['stdout'].endswith('memory limit exceeded (500000 bytes)\n')
+    assert static['peak_memory'] is None
+
+
+def test_phase_timings():
+    """Each result says where its time went; batch-wide work is shared out"""
+    validation = rubric_validation(QUESTIONS[1]['rubric'])
+    outputs = run_exam_script([
+        {"id": "Q2", "code": ALPRO_CORRECT['Q2'], "validation": validation},
+        {"id": "slow", "code": "import time\ntime.sleep(0.05)", "validation": "pass"},
+    ])
+    for output in outputs:
+        timings = output['timings']
+        assert set(timings) == {'decode', 'load', 'student', 'parse', 'validation', 'total'}
+        phases = sum(value for name, value in timings.items() if name != 'total')
+        assert abs(timings['total'] - phases) < 1.0, timings
+    assert outputs[0]['timings']['parse'] > 0
+    assert outputs[1]['timings']['student'] >= 50 and outputs[1]['timings']['parse'] == 0
+
+    results = run_grading_batch([ALPRO_CORRECT['Q2']] * 3, validation, 'Q2')
+    assert all(r['timings']['load'] > 0 and r['timings']['decode'] > 0 for r in results)
+
+
+def test_frames():
+    """Frames are only read when complete; whole-run results only at the end"""
+    text = 'noise\n__R__2:[]\n__R__5:[1]\n__R__3:{}}\n__R__x:1\n__R__1:7\n'
+    assert read_frames(text, '__R__') == [[], 7]
+    assert read_final_frame(text, '__R__') == 7
+    assert read_final_frame(text + 'after\n', '__R__') is None
+
+
+# ============================================================
+# RUN ALL TESTS
+# ============================================================
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith('test_') and callable(v)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ PASSED | {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  ❌ FAILED | {test.__name__}: {e}")
+    print("🎉 ALL TESTS PASSED!" if not failed else f"⚠️ {failed} TEST(S) FAILED")
@@ -0,0 +1,194 @@
+"""
+Test Script for the Bulk Exam Importer (scripts/import_exams.py)
+Run with pytest, or directly: python tests/test_import_exams.py
+"""
+
+import asyncio
+import copy
+import json
+import os
+import sys
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from grader.httpd import Router, start_server
+from import_exams import KeepAliveClient, load_definitions, plan, question_hash, sync
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+def exam(exam_id, *questions, title='Ujian'):
+    return {'id': exam_id, 'title': title, 'description': '', 'durationMinutes': 60, 'isPublic': True,
+            'questions': [{'id': q, 'text': 'Soal ' + q, 'points': 10, 'validationCode': 'assert True'}
+                          for q in questions]}
+
+
+def stored(definition):
+    """What the app returns for a saved exam: derived fields added."""
+    saved = copy.deepcopy(definition)
+    saved['createdAt'] = '2026-01-01T00:00:00Z'
+    for q in saved['questions']:
+        q.update(staticGrading=True, gradingHash='h-' + q['id'])
+    return saved
+
+
+class FakeAdminAPI:
+    """/api/admin/exams on an ephemeral port; `failures` POSTs answer 503 first."""
+
+    def __init__(self, exams, failures=0):
+        self.exams = {e['id']: e for e in exams}
+        self.failures = failures
+        self.posted = []
+        router = Router()
+        router.add('GET', '/api/admin/exams', self.list)
+        router.add('POST', '/api/admin/exams', self.save)
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(start_server(router, '127.0.0.1', 0))
+        self.url = 'http://127.0.0.1:%d' % self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    async def list(self, request):
+        return 200, list(self.exams.values())
+
+    async def save(self, request):
+        body = request.json()
+        if self.failures:
+            self.failures -= 1
+            return 503, {'error': 'busy'}
+        if not body['questions']:
+            return 400, {'error': 'invalid exam', 'problems': [{'questionId': '-', 'error': 'no questions'}]}
+        self.posted.append(body['id'])
+        self.exams[body['id']] = stored(body)
+        return 200, self.exams[body['id']]
+
+    async def _shutdown(self):
+        # Clients are closed first: open connections end at EOF
+        self.server.close()
+        await asyncio.gather(*[t for t in asyncio.all_tasks() if t is not asyncio.current_task()])
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.loop.close()
+
+
+# ============================================================
+# TEST CASES
+# ============================================================
+
+def test_question_hash_ignores_derived_fields():
+    question = exam('e', 'Q1')['questions'][0]
+    assert question_hash(question) == question_hash(stored(exam('e', 'Q1'))['questions'][0])
+    assert question_hash(question) != question_hash(dict(question, points=5))
+
+    # Expected outputs are computed from the reference solution on save
+    tests = {'function': 'f', 'inputs': [[1]]}
+    authored = {'id': 'Q', 'referenceSolution': 'def f(x): return x',
+                'rubric': {'criteria': [{'name': 'tests', 'points': 5, 'tests': tests}]}}
+    saved = copy.deepcopy(authored)
+    saved['rubric']['criteria'][0]['tests']['expected'] = [1]
+    assert question_hash(authored) == question_hash(saved)
+    print("✅ PASSED: question hash ignores fields the server derives")
+
+
+def test_plan():
+    definitions = [exam('same', 'Q1', 'Q2'), exam('edited', 'Q1', 'Q2'), exam('added', 'Q1')]
+    remote = [stored(exam('same', 'Q1', 'Q2')), stored(exam('edited', 'Q1', 'Q3'))]
+    remote[1]['questions'][0]['points'] = 5
+    reasons = {e['id']: reason for e, reason in plan(definitions, remote)}
+    assert reasons == {'same': None, 'edited': 'questions Q1, Q2; removed Q3', 'added': 'new'}
+    print("✅ PASSED: plan reports unchanged, changed and new exams")
+
+
+def test_load_definitions():
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, 'b.json'), 'w') as f:
+            json.dump(exam('json-exam', 'Q1'), f)
+        with open(os.path.join(directory, 'a.py'), 'w') as f:
+            f.write('EXAM = %r\n' % exam('py-exam', 'Q1'))
+        # Modules without a top-level EXAM are never run
+        marker = os.path.join(directory, 'ran')
+        with open(os.path.join(directory, 'helpers.py'), 'w') as f:
+            f.write('open(%r, "w").close()\ndef build():\n    EXAM = {}\n' % marker)
+        assert [e['id'] for e in load_definitions(directory)] == ['py-exam', 'json-exam']
+        assert not os.path.exists(marker), 'helpers.py was executed'
+
+        with open(os.path.join(directory, 'c.json'), 'w') as f:
+            json.dump(exam('json-exam', 'Q2'), f)
+        try:
+            load_definitions(directory)
+            assert False, 'duplicate id accepted'
+        except SystemExit as e:
+            assert 'json-exam' in str(e)
+
+    alpro = load_definitions(os.path.join(ROOT, 'scripts'))
+    assert [e['id'] for e in alpro] == ['alpro-functions'] and len(alpro[0]['questions']) == 10
+    print("✅ PASSED: definitions load from *.json and *.py")
+
+
+def test_sync_uploads_only_changes():
+    api = FakeAdminAPI([stored(exam('same', 'Q1')), stored(exam('edited', 'Q1'))])
+    client = KeepAliveClient(api.url, backoff=0.01)
+    try:
+        definitions = [exam('same', 'Q1'), exam('edited', 'Q1', title='Ujian Baru')] + \
+                      [exam('new-%d' % i, 'Q1', 'Q2') for i in range(6)]
+        summary = sync(definitions, client, concurrency=3)
+        assert summary['unchanged'] == ['same'] and summary['failed'] == []
+        assert sorted(summary['uploaded']) == sorted(api.posted) == sorted(['edited'] + ['new-%d' % i for i in range(6)])
+        # Keep-alive: one connection for the GET plus one per worker, not one per request
+        assert client.connections <= 1 + 3
+
+        # A second run has nothing to do
+        api.posted.clear()
+        summary = sync(definitions, client, concurrency=3)
+        assert len(summary['unchanged']) == len(definitions) and api.posted == []
+
+        definitions[0]['questions'][0]['points'] = 20
+        summary = sync(definitions, client, dry_run=True)
+        assert summary['pending'] == ['same'] and api.posted == []
+    finally:
+        client.close()
+        api.stop()
+    print("✅ PASSED: only new and changed exams are uploaded")
+
+
+def test_sync_retries_and_reports_failures():
+    api = FakeAdminAPI([], failures=2)
+    client = KeepAliveClient(api.url, retries=3, backoff=0.01)
+    try:
+        summary = sync([exam('flaky', 'Q1'), exam('broken')], client, concurrency=1)
+        assert summary['uploaded'] == ['flaky'] and summary['failed'] == ['broken']
+        assert api.posted == ['flaky']
+
+        api.failures = 5
+        client.retries = 1
+        summary = sync([exam('down', 'Q1')], client)
+        assert summary['failed'] == ['down']
+    finally:
+        client.close()
+        api.stop()
+    print("✅ PASSED: 503s are retried, rejected exams are reported")
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("🧪 BULK EXAM IMPORTER TESTS")
+    print("=" * 60)
+    test_question_hash_ignores_derived_fields()
+    test_plan()
+    test_load_definitions()
+    test_sync_uploads_only_changes()
+    test_sync_retries_and_reports_failures()
+    print("=" * 60)
+    print("🎉 ALL IMPORTER TESTS PASSED!")
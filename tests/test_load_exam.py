@@ -0,0 +1,165 @@
+"""
+Test Script for the Exam Load Generator (tests/load_exam.py)
+Run with pytest, or directly: python tests/test_load_exam.py
+"""
+
+import asyncio
+import os
+import random
+import sys
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from grader.httpd import Router, start_server
+from load_exam import Histogram, LoadTest, Target, exam_question_ids, format_report, parse_mix, pick_answers
+from reference_answers import CORRECT_ANSWERS, PARTIAL_ANSWERS
+
+QUESTION_IDS = ['Q%d' % i for i in range(1, 11)]
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+class FakeExamApp:
+    """The exam page and submit route on an ephemeral port; every `fail_every`-th submit answers 503."""
+
+    def __init__(self, delay=0.01, fail_every=0):
+        self.delay = delay
+        self.fail_every = fail_every
+        self.submits = 0
+        self.active = 0
+        self.peak = 0
+        router = Router()
+        router.add('GET', '/api/admin/exams', self.exams)
+        router.add('GET', '/exam/{id}', self.page)
+        router.add('POST', '/api/exam/submit', self.submit)
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(start_server(router, '127.0.0.1', 0))
+        self.url = 'http://127.0.0.1:%d' % self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    async def exams(self, request):
+        return 200, [{'id': 'alpro-functions', 'questions': [{'id': qid} for qid in QUESTION_IDS]}]
+
+    async def page(self, request):
+        return 200, {'id': request.params['id']}
+
+    async def submit(self, request):
+        body = request.json()
+        self.submits += 1
+        if self.fail_every and self.submits % self.fail_every == 0:
+            return 503, {'error': 'busy'}
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        details = {}
+        for qid, code in body['answers'].items():
+            score = 10 if code == CORRECT_ANSWERS.get(qid) else 5 if code == PARTIAL_ANSWERS.get(qid) else 0
+            details[qid] = {'score': score, 'maxScore': 10, 'timings': {'total': 2.5}}
+        return 200, {'success': True, 'data': {'gradeDetails': details}}
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+def load_test(app, mix='correct=0.6,wrong=0.2,partial=0.2', think=(0.0, 0.01)):
+    return LoadTest(Target(app.url, timeout=10), 'alpro-functions', QUESTION_IDS, parse_mix(mix), think)
+
+
+# ============================================================
+# TEST CASES
+# ============================================================
+
+def test_histogram():
+    histogram = Histogram()
+    for value in range(1, 1001):
+        histogram.record(float(value))
+    summary = histogram.summary()
+    assert summary['count'] == 1000 and summary['min_ms'] == 1.0 and summary['max_ms'] == 1000.0
+    # Two significant digits: every percentile within 1% of the exact value
+    for p, exact in ((50, 500), (90, 900), (99, 990), (99.9, 999)):
+        assert abs(histogram.percentile(p) - exact) <= exact * 0.01, (p, histogram.percentile(p))
+    assert summary['p999_ms'] == histogram.percentile(99.9) and abs(summary['mean_ms'] - 500.5) < 0.01
+
+    other = Histogram()
+    other.record(5000.0)
+    histogram.merge(other)
+    assert histogram.count == 1001 and histogram.percentile(100) == 5000.0
+    assert Histogram().summary()['p50_ms'] == 0.0
+    print("✅ PASSED: HDR-style histogram keeps 2 significant digits")
+
+
+def test_answer_mix():
+    assert parse_mix('correct=3,wrong=1') == {'correct': 3.0, 'wrong': 1.0}
+    _, kinds = pick_answers(QUESTION_IDS * 50, parse_mix('correct=0.5,partial=0.5'), random.Random(1))
+    assert set(kinds.values()) == {'correct', 'partial'}
+    answers, _ = pick_answers(['Q1', 'X9'], {'wrong': 1.0}, random.Random(1))
+    assert answers == {'Q1': 'x = 1', 'X9': 'x = 0'}
+    try:
+        parse_mix('perfect=1')
+        assert False, 'unknown kind accepted'
+    except SystemExit:
+        pass
+    print("✅ PASSED: answers are drawn from the mix")
+
+
+def test_closed_loop():
+    app = FakeExamApp()
+    try:
+        assert asyncio.run(exam_question_ids(Target(app.url), 'alpro-functions')) == QUESTION_IDS
+        test = load_test(app)
+        asyncio.run(test.closed_loop(students=12, iterations=2))
+        report = test.report(1.0)
+        assert report['students'] == report['completed'] == 24 and report['errors'] == {}
+        assert report['phases']['fetch']['count'] == report['phases']['submit']['count'] == 24
+        assert report['phases']['session']['p50_ms'] >= report['phases']['submit']['p50_ms']
+        assert report['questions']['Q1']['count'] == 24 and report['questions']['Q1']['p50_ms'] == 2.5
+        outcomes = report['outcomes']
+        assert sum(o['answers'] for o in outcomes.values()) == 240
+        assert outcomes['correct']['full'] == outcomes['correct']['answers']
+        assert outcomes['partial']['partial'] == outcomes['partial']['answers']
+        assert outcomes['wrong']['zero'] == outcomes['wrong']['answers']
+        assert app.peak > 1 and 'Per question' in format_report(report)
+    finally:
+        app.stop()
+    print("✅ PASSED: closed loop runs every student to completion")
+
+
+def test_open_loop_and_errors():
+    app = FakeExamApp(delay=0.6, fail_every=4)
+    try:
+        test = load_test(app, mix='correct=1')
+        asyncio.run(test.open_loop(rate=40, duration=0.5, max_in_flight=15))
+        report = test.report(1.0)
+        # Arrivals keep coming while submits take 600 ms: students pile up to the cap
+        assert report['students'] + report['dropped'] == 20 and report['peak_in_flight'] == 15
+        assert report['dropped'] > 0
+        assert report['errors'] == {'submit: HTTP 503': report['statuses']['submit 503']}
+        assert report['completed'] == report['students'] - report['errors']['submit: HTTP 503']
+        assert '❌ submit: HTTP 503' in format_report(report)
+    finally:
+        app.stop()
+    print("✅ PASSED: open loop arrives on schedule and reports failures")
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("🧪 LOAD GENERATOR TESTS")
+    print("=" * 60)
+    test_histogram()
+    test_answer_mix()
+    test_closed_loop()
+    test_open_loop_and_errors()
+    print("=" * 60)
+    print("🎉 ALL LOAD GENERATOR TESTS PASSED!")
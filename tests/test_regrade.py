@@ -0,0 +1,173 @@
+"""
+Test Script for Regrading (grader/questions.py, scripts/regrade_exam.py)
+Run with pytest, or directly: python tests/test_regrade.py
+"""
+
+import base64
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grader import runtime_source
+from grader.executor import ExecutionLimits, run_source
+from grader.questions import (grade_answers, grade_question_for_students, grading_job, parse_rubric_output,
+                              student_batch_script, validation_code)
+from scripts.create_alpro_exam import EXAM, QUESTIONS
+from scripts.regrade_exam import grade_question_task, question_tasks, regrade_submission, stale_questions, total_score
+
+# ============================================================
+# FIXTURES
+# ============================================================
+
+TAMBAH = next(q for q in QUESTIONS if q['id'] == 'Q2')
+ASSERTION = {"id": "A1", "points": 5, "validationCode": "assert tambah(2, 3) == 5"}
+NO_VALIDATION = {"id": "N1", "points": 5}
+LIMITS = ExecutionLimits(cpu_time=2, wall_time=5)
+
+CORRECT = "def tambah(a, b):\n    return a + b"
+
+
+# ============================================================
+# GRADING STORED QUESTIONS
+# ============================================================
+
+def test_validation_code_mirrors_app():
+    """Rubric questions get the grade_rubric() snippet, others their validationCode"""
+    assert validation_code(TAMBAH).startswith('grade_rubric("{')
+    assert validation_code(ASSERTION) == "assert tambah(2, 3) == 5"
+    assert grading_job(NO_VALIDATION, CORRECT) is None
+
+
+def test_grade_answers():
+    """One run grades every question like the submit route"""
+    grades = grade_answers([TAMBAH, ASSERTION, NO_VALIDATION], {"Q2": CORRECT, "A1": CORRECT}, LIMITS)
+    assert grades['Q2']['score'] == 10 and grades['Q2']['status'] == 'graded'
+    assert grades['A1'] == {**grades['A1'], 'score': 5, 'breakdown': {'all_tests': 5}, 'errors': []}
+    assert grades['N1']['errors'] == ['no_validation_code']
+
+    wrong = grade_answers([TAMBAH, ASSERTION], {"Q2": "x = 1", "A1": "def tambah(a, b):\n    return a - b"}, LIMITS)
+    assert wrong['Q2']['score'] == 0 and wrong['A1']['errors'] == ['assertion_failed']
+
+
+def backend_script(student_code, validation):
+    """gradeWithRubric() in backend/src/lib/rubricGrader.ts: plain header, no runtime"""
+    encoded = base64.b64encode(student_code.encode('utf-8')).decode('ascii')
+    return ('import base64\nimport ast\nimport json\n\n'
+            '__STUDENT_CODE__ = base64.b64decode("%s").decode(\'utf-8\')\n__exec_error__ = None\n\n'
+            'try:\n    exec(__STUDENT_CODE__)\nexcept Exception as e:\n    __exec_error__ = str(e)\n\n%s\n'
+            % (encoded, validation))
+
+
+def test_backend_grades_rubric_questions():
+    """The Express backend only reads validationCode: the Alpro exam's must grade on its own"""
+    question = next(q for q in EXAM['questions'] if q['id'] == 'Q2')
+    assert question['rubric'] and question['validationCode'].startswith(runtime_source())
+    for code in (CORRECT, "def tambah(a, b):\n    print(a + b)", ''):
+        result = run_source(backend_script(code, question['validationCode']), '', LIMITS)
+        assert result['status']['id'] == 3, result
+        # Same grade as the app's rubric grading
+        app = grade_answers([question], {'Q2': code}, LIMITS)['Q2']
+        assert parse_rubric_output(result['stdout'])['score'] == app['score'], (code, result)
+
+
+def test_grade_answers_falls_back_per_question():
+    """A run killed as a whole (time limit) is retried question by question"""
+    hanging = {"id": "H1", "points": 5, "validationCode": "pass"}
+    grades = grade_answers([hanging, ASSERTION], {"H1": "while True:\n    pass", "A1": CORRECT},
+                           ExecutionLimits(cpu_time=1, wall_time=2))
+    assert grades['H1']['score'] == 0 and grades['H1']['errors'] == ['assertion_failed']
+    assert grades['A1']['score'] == 5
+
+
+def test_grade_question_for_students():
+    """Many answers to one question per run; a run that hits the limit keeps what it graded"""
+    counting = []
+
+    def runner(source, stdin, limits):
+        counting.append(source)
+        return run_source(source, stdin, limits)
+
+    renamed = "def tambah(x, y):\n    # jumlahkan\n    return x + y\n"
+    answers = {'a': CORRECT, 'b': 'x = 1', 'c': CORRECT, 'd': 'while True:\n    pass', 'e': renamed, 'f': 'y = 2'}
+    grades = grade_question_for_students(TAMBAH, answers, ExecutionLimits(cpu_time=1, wall_time=2), runner)
+    assert {k: g['score'] for k, g in grades.items()} == {'a': 10, 'b': 0, 'c': 10, 'd': 0, 'e': 10, 'f': 0}
+    assert grades['d']['status'] == 'timeout'
+    # One run for the distinct answers (e shares a's cache key), then the loop and the answer after it
+    assert len(counting) == 3 and 'jumlahkan' not in counting[0] and grades['a'] is not grades['c']
+
+    # An answer cannot change how the next ones in its run are graded, or read them
+    probe = {"id": "P1", "points": 5, "validationCode": (
+        "import sys\nimport json\nassert sys.getrecursionlimit() >= 1000 and abs(-1) == 1\n"
+        "assert json.loads('1') == 1 and sys.modules['json'] is json\nassert tambah(2, 3) == 5")}
+    tampering = {
+        'builtins': "import builtins\nbuiltins.abs = None",
+        'module': "import json\njson.loads = None",
+        'recursion': "import sys\nsys.setrecursionlimit(100)",
+        'modules': "import sys\nsys.modules['json'] = None",
+        'runtime': "grade_rubric.__globals__['emit_rubric'] = lambda result, marker: print(marker + '{}')",
+        'payload': "import __main__\nprint(sorted(vars(__main__)))",
+    }
+    for question, points in ((probe, 5), (TAMBAH, 10)):
+        counting.clear()
+        grades = grade_question_for_students(question, dict(tampering, correct=CORRECT, wrong='x = 1'), LIMITS, runner)
+        assert len(counting) == 1, grades
+        assert grades['correct']['score'] == points and grades['wrong']['score'] == 0, (question['id'], grades)
+    assert '__batch__' not in student_batch_script(TAMBAH, [{'key': 'a', 'code': CORRECT}])
+
+    assert grade_question_for_students(NO_VALIDATION, {'a': CORRECT})['a']['errors'] == ['no_validation_code']
+    assert grade_question_for_students(ASSERTION, {1: CORRECT, 2: 'x = 1'}, LIMITS, batch_size=1)[2]['score'] == 0
+
+
+# ============================================================
+# REGRADING
+# ============================================================
+
+def test_stale_questions():
+    """Only grades of another question version (or forced questions) are redone"""
+    questions = [dict(TAMBAH, gradingHash='new'), dict(ASSERTION, gradingHash='same'), NO_VALIDATION]
+    details = {'Q2': {'score': 10, 'gradingHash': 'old'}, 'A1': {'score': 5, 'gradingHash': 'same'},
+               'N1': {'score': 0}}
+    assert [q['id'] for q in stale_questions(questions, details, set())] == ['Q2', 'N1']
+    assert [q['id'] for q in stale_questions(questions, details, {'A1'})] == ['Q2', 'A1', 'N1']
+    assert total_score(questions, details) == 15
+
+
+def test_regrade_submission():
+    """Stale answers are graded per question; regraded answers get the current hash and change the total"""
+    questions = [dict(TAMBAH, gradingHash='new'), dict(ASSERTION, gradingHash='new')]
+    submissions = []
+    for submission_id, code in ((7, CORRECT), (8, 'x = 1'), (9, CORRECT)):
+        details = {'Q2': {'score': 0, 'gradingHash': 'old'}, 'A1': {'score': 5, 'gradingHash': 'new'}}
+        submissions.append((submission_id, {'Q2': code, 'A1': code}, details, stale_questions(questions, details, set())))
+
+    tasks = question_tasks(submissions, LIMITS, answers_per_run=2)
+    assert [(task[0]['id'], sorted(task[1])) for task in tasks] == [('Q2', [7, 8]), ('Q2', [9])]
+    fresh = {}
+    for question_id, grades in map(grade_question_task, tasks):
+        for submission_id, grade in grades.items():
+            fresh.setdefault(submission_id, {})[question_id] = grade
+
+    submission_id, _, details, stale = submissions[0]
+    row = regrade_submission(submission_id, details, stale, fresh[submission_id], questions)
+    assert row['id'] == 7 and row['score'] == 15 and row['changed'] == {'Q2'}
+    assert row['grade_details']['Q2']['gradingHash'] == 'new'
+    assert row['grade_details']['A1'] is details['A1']
+    assert fresh[8]['Q2']['score'] == 0 and fresh[9]['Q2']['score'] == 10
+
+
+# ============================================================
+# RUN ALL TESTS
+# ============================================================
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith('test_') and callable(v)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ PASSED | {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  ❌ FAILED | {test.__name__}: {e}")
+    print("🎉 ALL TESTS PASSED!" if not failed else f"⚠️ {failed} TEST(S) FAILED")
@@ -0,0 +1,141 @@
+"""
+Test Script for the Pre-publish Self-test (grader/selftest.py, scripts/selftest_exam.py)
+Run with pytest, or directly: python tests/test_selftest.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+from create_alpro_exam import EXAM
+from grader.selftest import broken, format_report, question_cases, self_test
+from reference_answers import CORRECT_ANSWERS, WRONG_ANSWERS
+from selftest_exam import load_answers
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+def rubric_question(qid, *criteria, points=10, **fields):
+    spec = {'max_score': points, 'criteria': [
+        {'name': name, 'points': p, 'check': check, 'error': 'no ' + name} for name, p, check in criteria]}
+    return dict({'id': qid, 'points': points, 'gradingType': 'rubric', 'rubric': spec}, **fields)
+
+
+def by_id(results):
+    return {result['id']: result for result in results}
+
+
+# ============================================================
+# TEST CASES
+# ============================================================
+
+def test_alpro_exam_passes():
+    results = self_test(EXAM['questions'], CORRECT_ANSWERS, WRONG_ANSWERS, workers=4)
+    assert broken(results) == [], format_report(results)
+    assert [r['status'] for r in results] == ['ok'] * 10
+    for result in results:
+        labels = [(c['label'], c['score']) for c in result['cases']]
+        assert labels == [('correct', 10), ('wrong', 0), ('starter code', 0), ('empty', 0)], labels
+        assert all(c['ms'] > 0 and c['crash'] is None for c in result['cases'])
+    print("✅ PASSED: every Alpro question grades its known answers correctly")
+
+
+def test_broken_rubrics_are_reported():
+    questions = [
+        # The correct answer never earns the print points
+        rubric_question('strict', ('fungsi', 5, {'function': 'f'}), ('print', 5, {'calls': 'print'})),
+        # Anything passes
+        {'id': 'lenient', 'points': 10, 'validationCode': 'assert True'},
+        # Validation that cannot run
+        {'id': 'typo', 'points': 10, 'validationCode': 'assert hasil ==\n'},
+        rubric_question('bad-check', ('fungsi', 10, {'no_such_check': 'f'})),
+        # Rubric out of 5 for a 10-point question
+        rubric_question('points', ('fungsi', 5, {'function': 'f'}), points=10),
+        rubric_question('unknown', ('fungsi', 10, {'function': 'g'})),
+        {'id': 'no-validation', 'points': 10},
+    ]
+    questions[4]['rubric']['max_score'] = 5
+    correct = {qid: 'def f(x):\n    return x\n' for qid in ('strict', 'lenient', 'typo', 'bad-check', 'points')}
+    results = by_id(self_test(questions, correct, {'strict': 'x = 1'}, workers=4))
+
+    assert broken(list(results.values())) == ['strict', 'lenient', 'typo', 'bad-check', 'points']
+    assert results['strict']['problems'] == ["the correct answer scored 5/10 (no print)"]
+    assert results['lenient']['problems'] == ["the empty answer scored full points (10/10)"]
+    assert any('SyntaxError' in p for p in results['typo']['problems']), results['typo']['problems']
+    assert results['bad-check']['problems'][0].startswith('validation crashed on the correct answer')
+    assert results['points']['problems'][-1] == 'rubric max score 5 does not match the question points (10)'
+    assert results['unknown']['status'] == 'untested'
+    assert results['no-validation']['status'] == 'skipped' and results['no-validation']['cases'] == []
+
+    report = format_report(list(results.values()))
+    assert '❌ strict' in report and report.endswith('0 ok, 5 broken, 1 untested, 1 skipped')
+    print("✅ PASSED: broken rubrics are reported")
+
+
+def test_expected_outputs_from_reference_solution():
+    """Functional tests without `expected` get it from referenceSolution, as when the app saves the exam"""
+    tests = {'function': 'kuadrat', 'inputs': [[2], [3], [-4]]}
+    reference = 'def kuadrat(x):\n    return x * x\n'
+
+    def question(qid, **fields):
+        return dict(rubric_question(qid, ('fungsi', 4, {'function': 'kuadrat'})), **fields)
+
+    questions = [question('filled', referenceSolution=reference),
+                 question('bad-reference', referenceSolution='def kuadrat(x):\n    return 1 / 0\n'),
+                 question('no-reference')]
+    for q in questions:
+        q['rubric']['criteria'].append({'name': 'hasil', 'points': 6, 'tests': dict(tests)})
+    results = by_id(self_test(questions, {}, {'filled': 'def kuadrat(x):\n    return x + x\n'}, workers=2))
+
+    assert results['filled']['status'] == 'ok', format_report(list(results.values()))
+    # x + x is right for kuadrat(2) only: 4 points for the function, 6 * 1/3 for the tests
+    assert [(c['label'], c['score']) for c in results['filled']['cases']] == \
+        [('correct', 10), ('wrong', 6), ('empty', 0)]
+    assert results['bad-reference']['problems'] == [
+        'reference solution failed: kuadrat(2) raised ZeroDivisionError: division by zero']
+    assert results['no-reference']['problems'] == [
+        'functional tests need expected outputs or a reference solution']
+    # The authored questions are left as they were
+    assert 'expected' not in questions[0]['rubric']['criteria'][1]['tests']
+    print("✅ PASSED: expected outputs come from the reference solution")
+
+
+def test_cases_and_answers():
+    question = {'id': 'Q', 'points': 10, 'validationCode': 'assert True',
+                'initialCode': '# tulis di sini\n', 'referenceSolution': 'x = 1'}
+    labels = [(c['label'], c['kind']) for c in question_cases(question, {}, {'Q': ['a', 'b']})]
+    assert labels == [('correct', 'correct'), ('wrong', 'wrong'), ('wrong #2', 'wrong'),
+                      ('starter code', 'wrong'), ('empty', 'wrong')]
+    assert [c['code'] for c in question_cases(question, {'Q': 'y = 2'}, {})][0] == 'y = 2'
+
+    correct, wrong = load_answers()
+    assert 'Q10' in correct and wrong['Q1'] == 'x = 1'
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump({'correct': {'Q': 'x = 1'}}, f)
+    try:
+        assert load_answers(f.name) == ({'Q': 'x = 1'}, {})
+    finally:
+        os.unlink(f.name)
+    print("✅ PASSED: cases come from known answers, referenceSolution and starter code")
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("🧪 PRE-PUBLISH SELF-TEST TESTS")
+    print("=" * 60)
+    test_alpro_exam_passes()
+    test_broken_rubrics_are_reported()
+    test_expected_outputs_from_reference_solution()
+    test_cases_and_answers()
+    print("=" * 60)
+    print("🎉 ALL SELF-TEST TESTS PASSED!")
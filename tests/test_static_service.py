@@ -0,0 +1,154 @@
+"""
+Test Script for the Static Grading Service (grader/static_service.py)
+Run with pytest, or directly: python tests/test_static_service.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grader import combined_source
+from grader.executor import run_source
+from grader.forkserver import SAMPLE_ANSWER, SAMPLE_VALIDATION
+from grader.httpd import start_server
+from grader.questions import rubric_validation
+from grader.static_service import StaticGrader, build_router
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+def start_static_server(grader):
+    """Serve `grader` on an ephemeral port from a background event loop"""
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(start_server(build_router(grader), '127.0.0.1', 0))
+    port = server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        grader.shutdown()
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+def post_jobs(url, jobs):
+    request = urllib.request.Request(f"{url}/grade", data=json.dumps({'jobs': jobs}).encode('utf-8'),
+                                     method='POST', headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read().decode('utf-8'))['results']
+
+
+def post_answers(url, answers):
+    request = urllib.request.Request(f"{url}/keys", data=json.dumps({'answers': answers}).encode('utf-8'),
+                                     method='POST', headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read().decode('utf-8'))['keys']
+
+
+def rubric_line(stdout):
+    return next(line for line in stdout.splitlines() if line.startswith('__RUBRIC__'))
+
+
+# ============================================================
+# TEST CASES
+# ============================================================
+
+def test_static_grade_matches_judge0_script():
+    """Same __RUBRIC__ line as the script Judge0 would run, without running the answer"""
+    answer = SAMPLE_ANSWER + "\nimport os\nos._exit(3)"
+    url, stop = start_static_server(StaticGrader(2))
+    try:
+        results = post_jobs(url, [
+            {'id': 'Q2', 'code': answer, 'validation': SAMPLE_VALIDATION},
+            {'id': 'Q2b', 'code': 'def tambah(a):\n    pass', 'validation': SAMPLE_VALIDATION},
+        ])
+    finally:
+        stop()
+
+    expected = run_source(combined_source(answer, SAMPLE_VALIDATION, execute_student=False))
+    assert [r['id'] for r in results] == ['Q2', 'Q2b']
+    assert results[0]['ok'] and rubric_line(results[0]['stdout']) == rubric_line(expected['stdout'])
+    assert json.loads(rubric_line(results[1]['stdout'])[len('__RUBRIC__'):])['score'] == 0
+
+
+def test_static_service_refuses_dynamic_and_stuck_jobs():
+    """Jobs the service cannot grade come back with `error` so the caller uses Judge0"""
+    url, stop = start_static_server(StaticGrader(1, job_timeout=0.5))
+    try:
+        dynamic, stuck, graded = post_jobs(url, [
+            {'id': 'dyn', 'code': 'x = 1', 'validation': "print('__RUBRIC__', x)"},
+            {'id': 'loop', 'code': 'x = 1', 'validation': 'while True:\n    pass'},
+            {'id': 'ok', 'code': SAMPLE_ANSWER, 'validation': SAMPLE_VALIDATION},
+        ])
+    finally:
+        stop()
+
+    assert dynamic['error'].startswith('dynamic validation')
+    assert stuck['error'] == 'time limit exceeded'
+    assert graded['ok'] and 'error' not in graded
+
+
+def test_reformatted_answers_share_a_cache_key():
+    """/keys: answers to a declarative rubric that differ only in formatting get one grade cache key"""
+    rubric = {"criteria": [
+        {"name": "function", "points": 5, "check": {"function": "tambah", "params": 2}},
+        {"name": "return", "points": 5, "check": {"return": True}},
+    ]}
+    reformatted = "def tambah(x, y):\n    # jumlahkan\n\n    return x+y\nprint(tambah(3, 5))"
+    url, stop = start_static_server(StaticGrader(1))
+    try:
+        keys = post_answers(url, [
+            {'code': SAMPLE_ANSWER, 'rubric': rubric},
+            {'code': reformatted, 'rubric': rubric},
+            {'code': SAMPLE_ANSWER},
+            {'code': reformatted, 'rubric': None},
+        ])
+        results = post_jobs(url, [{'id': 'Q2', 'code': code, 'validation': rubric_validation(rubric)}
+                                  for code in (SAMPLE_ANSWER, reformatted)])
+    finally:
+        stop()
+
+    assert keys[0] == keys[1] and keys[0].startswith('ast:')
+    # Without a rubric the validation may read the source: raw hashes
+    assert keys[2] != keys[3] and keys[2].startswith('raw:') and keys[3].startswith('raw:')
+    # ...and sharing an entry is right: both get the same grade
+    assert rubric_line(results[0]['stdout']) == rubric_line(results[1]['stdout'])
+
+
+def test_static_service_rejects_malformed_body():
+    url, stop = start_static_server(StaticGrader(1))
+    try:
+        for post, body in ((post_jobs, [{'id': 'Q1', 'code': 1}]),
+                           (post_answers, [{'code': 'x = 1', 'rubric': 'criteria'}])):
+            try:
+                post(url, body)
+                assert False, "expected HTTP 422"
+            except urllib.error.HTTPError as e:
+                assert e.code == 422
+    finally:
+        stop()
+
+
+# ============================================================
+# RUN ALL TESTS
+# ============================================================
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith('test_') and callable(v)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  ✅ PASSED | {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"  ❌ FAILED | {test.__name__}: {e}")
+    print("🎉 ALL TESTS PASSED!" if not failed else f"⚠️ {failed} TEST(S) FAILED")
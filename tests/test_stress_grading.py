@@ -0,0 +1,112 @@
+"""
+Test Script for the Pathological Submission Stress Test (tests/stress_grading.py)
+Run with pytest, or directly: python tests/test_stress_grading.py
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from grader.executor import ExecutionLimits
+from stress_grading import (CATEGORIES, DEFAULT_MIX, build_corpus, exam_questions, format_report, parse_mix,
+                            run_isolated, run_mixed, sample, write_corpus)
+from reference_answers import CORRECT_ANSWERS
+
+LIMITS = ExecutionLimits(cpu_time=0.5, wall_time=1.0)
+
+# ============================================================
+# TEST CASES
+# ============================================================
+
+def test_corpus():
+    assert sorted(DEFAULT_MIX) == sorted(CATEGORIES) and abs(sum(DEFAULT_MIX.values()) - 1) < 1e-9
+    corpus = build_corpus(400, DEFAULT_MIX, seed=7)
+    assert corpus == build_corpus(400, DEFAULT_MIX, seed=7), 'corpus is not reproducible'
+    counts = {category: sum(1 for item in corpus if item['category'] == category) for category in CATEGORIES}
+    assert 300 < counts['normal'] < 390 and counts['infinite_loop'] > 0
+
+    rng = random.Random(1)
+    for category in CATEGORIES:
+        item = sample(category, rng, ['Q4'])
+        assert item['question'] == 'Q4'
+        if category != 'normal':
+            # The student's function is there; what follows is the problem
+            assert item['code'].startswith(CORRECT_ANSWERS['Q4'].rstrip('\n'))
+    assert sample('long_file', rng, ['Q1'])['code'].count('\n') >= 5000
+
+    assert parse_mix('normal=3,unicode=1') == {'normal': 3.0, 'unicode': 1.0}
+    for bad in ('typo=1', 'normal=0'):
+        try:
+            parse_mix(bad)
+            assert False, bad
+        except SystemExit:
+            pass
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(directory, corpus[:20])
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            manifest = json.load(f)
+        assert len(manifest) == 20 and all(os.path.exists(os.path.join(directory, m['file'])) for m in manifest)
+    print("✅ PASSED: the corpus follows the mix and is reproducible")
+
+
+def test_isolated_categories():
+    questions = exam_questions(None, None)
+    results = run_isolated(['normal', 'infinite_loop', 'huge_print', 'deep_nesting', 'unicode'],
+                           3, LIMITS, questions, seed=1)
+    assert results['normal']['sandbox_runs_per_submission'] == 1
+    assert results['normal']['sandbox_statuses'] == {'Accepted': 3}
+
+    # A runaway loop fails the exam run, then every question is regraded on its own
+    loop = results['infinite_loop']
+    assert loop['sandbox_runs_per_submission'] == 11 and loop['grade_statuses'] == {'timeout': 3}
+    assert loop['kept_full_score'] == 0 and loop['collateral_questions'] == 0
+
+    for category in ('huge_print', 'deep_nesting', 'unicode'):
+        assert results[category]['collateral_questions'] == 0, (category, results[category])
+    assert results['huge_print']['max_output_kb'] < 1100, 'student output reached the sandbox stdout'
+
+    report = format_report(results, None)
+    assert 'infinite_loop' in report and 'Time Limit Exceeded×3' in report
+    print("✅ PASSED: every category is graded and measured")
+
+
+def test_mixed_run():
+    questions = exam_questions(None, None)
+    result = run_mixed(8, {'normal': 0.75, 'infinite_loop': 0.25}, LIMITS, questions, workers=2, seed=3)
+    assert sum(result['mix'].values()) == 8 and result['mix']['infinite_loop'] > 0
+    assert result['clean']['submissions'] == result['mixed']['submissions'] == 8
+    assert result['mixed']['normal']['submissions'] == result['mix']['normal']
+    # Runaway loops take most of the sandbox time and slow everyone down
+    assert result['mixed']['sandbox_time_share']['infinite_loop'] > 0.5
+    assert result['throughput_ratio'] < 1
+    assert 'Mixed run (8 submissions, 2 workers' in format_report({}, result)
+    print("✅ PASSED: the mixed run compares against normal submissions alone")
+
+
+def test_budgets_are_applied():
+    questions = exam_questions(1000, 64 * 1024 * 1024)
+    assert all(q['stepBudget'] == 1000 and q['memoryLimit'] == 64 * 1024 * 1024 for q in questions)
+    assert 'stepBudget' not in exam_questions(None, None)[0]
+    print("✅ PASSED: --step-budget and --memory-limit-mb reach every question")
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("🧪 STRESS TEST TESTS")
+    print("=" * 60)
+    test_corpus()
+    test_isolated_categories()
+    test_mixed_run()
+    test_budgets_are_applied()
+    print("=" * 60)
+    print("🎉 ALL STRESS TEST TESTS PASSED!")